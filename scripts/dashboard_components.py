@@ -0,0 +1,319 @@
+"""Dashboard Components
+Dati, grafici e sezioni condivisi da app.py e trading_dashboard.py
+"""
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+import plotly.express as px
+from datetime import datetime
+
+from trading_artifacts import latest_version, load_artifacts
+from risk_metrics import ROLLING_WINDOWS, rolling_metrics
+from downsampling import downsample_frame
+
+# Versione dei dati dimostrativi (non cambia: nessuna ricarica)
+MOCK_VERSION = 'mock-42'
+
+# st.fragment riesegue solo la sezione quando cambia un suo widget;
+# con versioni di Streamlit senza fragment la sezione gira con il resto della pagina
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda fn: fn)
+
+PAGE_CSS = """
+<style>
+    .header { text-align: center; color: #1f77b4; }
+    .metric-box { background-color: #f0f2f6; padding: 10px; border-radius: 5px; }
+    .signal-flat { background-color: #fff3cd; color: #856404; padding: 10px; border-radius: 5px; }
+    .signal-buy { background-color: #d4edda; color: #155724; padding: 10px; border-radius: 5px; }
+    .signal-sell { background-color: #f8d7da; color: #721c24; padding: 10px; border-radius: 5px; }
+</style>
+"""
+
+# ============================================================================
+# DATI
+# ============================================================================
+
+def _mock_trading_data():
+    """Equity curve e metriche dimostrative (seed fisso)"""
+    rng = np.random.RandomState(42)
+    dates = pd.date_range(start='2023-01-01', end='2025-01-19', freq='D')
+
+    # Simula equity curve con trend positivo
+    returns = rng.normal(0.0005, 0.015, len(dates))
+    equity = 10000 * np.exp(np.cumsum(returns))
+    daily_returns = np.diff(returns) * 100  # In percentuale
+    daily_returns = np.append(daily_returns, daily_returns[-1])
+
+    equity_df = pd.DataFrame({
+        'Date': dates,
+        'Equity': equity,
+        'Daily_Return': daily_returns
+    })
+
+    total_trades = 1529
+    winning_trades = int(total_trades * 0.6625)
+
+    metrics = {
+        'Total_Trades': total_trades,
+        'Winrate': '66.25%',
+        'Total_Return': '+1,161.78%',
+        'CAGR': '17.43%',
+        'Avg_Pct_Trade': '0.1674%',
+        'Avg_Points': '37.23',
+        'Max_Drawdown': '-12.45%',
+        'Sharpe_Ratio': '1.85',
+        'Latest_Equity': f'${equity[-1]:,.2f}',
+        'Signal_Tomorrow': 'FLAT'
+    }
+
+    trade_dist = {
+        'Winning_Trades': winning_trades,
+        'Losing_Trades': total_trades - winning_trades
+    }
+
+    return equity_df, metrics, trade_dist
+
+def current_version(source):
+    """Versione dei dati da mostrare: ultimo artifact pubblicato o dati dimostrativi"""
+    return MOCK_VERSION if source == 'mock' else latest_version()
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_trading_data(version):
+    """Dati condivisi tra sessioni e rerun, uno per versione (da non modificare)"""
+    if version == MOCK_VERSION:
+        return _mock_trading_data()
+    equity_df, metrics, trade_dist, _ = load_artifacts(version)
+    return equity_df, metrics, trade_dist
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_rolling_metrics(version):
+    """Metriche rolling sull'intero storico della versione"""
+    equity_df = load_trading_data(version)[0]
+    return rolling_metrics(equity_df.set_index('Date')['Equity']).reset_index()
+
+# ============================================================================
+# GRAFICI (una figura per combinazione di versione e parametri)
+# ============================================================================
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def equity_figure(version, visible_range, show_annotations):
+    equity_df = load_trading_data(version)[0]
+    chart_df = downsample_frame(equity_df, 'Date', 'Equity', x_range=visible_range)
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=chart_df['Date'],
+        y=chart_df['Equity'],
+        mode='lines',
+        name='Equity',
+        line=dict(color='#1f77b4', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(31, 119, 180, 0.2)',
+        hovertemplate='<b>Data:</b> %{x|%Y-%m-%d}<br><b>Equity:</b> $%{y:,.2f}<extra></extra>'
+    ))
+
+    if show_annotations and len(chart_df):
+        # Picco e punto di massimo drawdown dell'intervallo visibile (su tutti i punti, non ridotti)
+        lo = equity_df['Date'].searchsorted(visible_range[0], side='left')
+        hi = equity_df['Date'].searchsorted(visible_range[1], side='right')
+        visible = equity_df.iloc[lo:hi]
+        equity = visible['Equity'].to_numpy()
+        peak_pos = int(equity.argmax())
+        drawdown = 1 - equity / np.maximum.accumulate(equity)
+        trough_pos = int(drawdown.argmax())
+
+        fig.add_annotation(x=visible['Date'].iloc[peak_pos], y=equity[peak_pos],
+                           text=f"Picco ${equity[peak_pos]:,.0f}", showarrow=True, arrowhead=2)
+        if drawdown[trough_pos] > 0:
+            fig.add_annotation(x=visible['Date'].iloc[trough_pos], y=equity[trough_pos],
+                               text=f"Max DD -{drawdown[trough_pos]*100:.2f}%",
+                               showarrow=True, arrowhead=2, ay=40, font=dict(color='#e74c3c'))
+
+    fig.update_layout(
+        title="Equity Curve Over Time",
+        xaxis_title="Date",
+        yaxis_title="Equity ($)",
+        hovermode='x unified',
+        template='plotly_white',
+        height=500,
+        showlegend=True
+    )
+    return fig
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def rolling_figures(version, visible_range):
+    rolling = load_rolling_metrics(version)
+    rolling = downsample_frame(rolling, 'Date', [c for c in rolling.columns if c != 'Date'],
+                               x_range=visible_range, method='minmax')
+
+    fig_sharpe = go.Figure()
+    for window in ROLLING_WINDOWS:
+        fig_sharpe.add_trace(go.Scatter(
+            x=rolling['Date'], y=rolling[f'Sharpe_{window}'], mode='lines', name=f'{window}d'
+        ))
+    fig_sharpe.update_layout(title="Rolling Sharpe Ratio (annualizzato)", height=350,
+                             template='plotly_white', hovermode='x unified')
+
+    fig_dd = go.Figure()
+    fig_dd.add_trace(go.Scatter(
+        x=rolling['Date'], y=-rolling['Drawdown'] * 100, mode='lines', name='Drawdown',
+        line=dict(color='#e74c3c'), fill='tozeroy', fillcolor='rgba(231, 76, 60, 0.2)'
+    ))
+    fig_dd.add_trace(go.Scatter(
+        x=rolling['Date'], y=-rolling[f'Drawdown_{ROLLING_WINDOWS[1]}'] * 100, mode='lines',
+        name=f'Drawdown {ROLLING_WINDOWS[1]}d', line=dict(color='#f39c12', dash='dot')
+    ))
+    fig_dd.update_layout(title="Drawdown (%)", height=350, template='plotly_white',
+                         hovermode='x unified')
+    return fig_sharpe, fig_dd
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def returns_figure(version):
+    equity_df = load_trading_data(version)[0]
+    fig = px.histogram(
+        x=equity_df['Daily_Return'],
+        nbins=30,
+        title="Distribution of Daily Returns (%)",
+        labels={'x': 'Daily Return (%)', 'y': 'Frequency'},
+        color_discrete_sequence=['#2ecc71']
+    )
+    fig.update_layout(height=400, template='plotly_white')
+    return fig
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def trade_figure(version):
+    trade_dist = load_trading_data(version)[2]
+    fig = go.Figure(data=[
+        go.Pie(
+            labels=['Winning Trades', 'Losing Trades'],
+            values=[int(trade_dist['Winning_Trades']), int(trade_dist['Losing_Trades'])],
+            marker=dict(colors=['#2ecc71', '#e74c3c']),
+            hole=0.3,
+            textinfo='label+percent+value'
+        )
+    ])
+    fig.update_layout(height=400, template='plotly_white')
+    return fig
+
+# ============================================================================
+# SEZIONI
+# ============================================================================
+
+@fragment
+def equity_section(version, visible_range):
+    st.subheader("📊 Equity Curve")
+    # Il toggle riesegue solo questa sezione: le altre figure non vengono ricostruite né reinviate
+    show_annotations = st.toggle("Mostra Annotazioni", value=True)
+    st.plotly_chart(equity_figure(version, visible_range, show_annotations), use_container_width=True)
+
+def render_dashboard(source='artifacts'):
+    """Pagina completa della dashboard.
+
+    Args:
+        source: 'artifacts' (ultimo export pubblicato da trading_artifacts.py)
+                o 'mock' (dati dimostrativi)
+    """
+    st.set_page_config(
+        page_title="Trading System Dashboard",
+        page_icon="📈",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(PAGE_CSS, unsafe_allow_html=True)
+
+    # Titolo
+    st.markdown('<h1 class="header">📈 Trading System Dashboard</h1>', unsafe_allow_html=True)
+    st.markdown('<p style="text-align: center; color: gray;">Real-time Equity Curve & Performance Metrics</p>', unsafe_allow_html=True)
+
+    # Sidebar
+    st.sidebar.title("⚙️ Configurazione")
+
+    version = current_version(source)
+    if version is None:
+        st.info("Nessun dato pubblicato. Avvia il job di refresh: `python scripts/trading_artifacts.py --once`")
+        st.stop()
+
+    equity_df, metrics, trade_dist = load_trading_data(version)
+
+    # Zoom: intervallo visualizzato; i grafici ricevono al massimo target_points() punti
+    date_min, date_max = equity_df['Date'].min().date(), equity_df['Date'].max().date()
+    date_range = st.sidebar.slider("Intervallo date", min_value=date_min, max_value=date_max,
+                                   value=(date_min, date_max), format="YYYY-MM-DD")
+    visible_range = (pd.Timestamp(date_range[0]),
+                     pd.Timestamp(date_range[1]) + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1))
+
+    # Layout principale con colonne
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(label="Total Trades", value=f"{metrics['Total_Trades']:,}", delta="+5.2%")
+    col2.metric(label="Win Rate", value=metrics['Winrate'], delta="+1.3%")
+    col3.metric(label="Total Return", value=metrics['Total_Return'], delta="+45.2%")
+    col4.metric(label="CAGR", value=metrics['CAGR'], delta="+2.1%")
+
+    st.divider()
+
+    equity_section(version, visible_range)
+
+    # Sezione Rolling Risk
+    st.subheader("📉 Rolling Risk")
+    fig_sharpe, fig_dd = rolling_figures(version, visible_range)
+    col1, col2 = st.columns(2)
+    col1.plotly_chart(fig_sharpe, use_container_width=True)
+    col2.plotly_chart(fig_dd, use_container_width=True)
+
+    # Sezione Daily Returns Distribution
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("📈 Daily Returns Distribution")
+        st.plotly_chart(returns_figure(version), use_container_width=True)
+    with col2:
+        st.subheader("🎯 Trade Win/Loss Distribution")
+        st.plotly_chart(trade_figure(version), use_container_width=True)
+
+    st.divider()
+
+    # Sezione Metriche Dettagliate
+    st.subheader("📋 Detailed Metrics")
+    labels = [
+        ('Avg_Pct_Trade', 'Average % per Trade'),
+        ('Avg_Points', 'Average Points'),
+        ('Max_Drawdown', 'Max Drawdown'),
+        ('Sharpe_Ratio', 'Sharpe Ratio'),
+        ('Sortino_Ratio', 'Sortino Ratio'),
+        ('Volatility', 'Volatility (annualizzata)'),
+        ('Latest_Equity', 'Latest Equity'),
+    ]
+    metrics_df = pd.DataFrame([
+        {'Metric': label, 'Value': metrics[key]} for key, label in labels if key in metrics
+    ])
+    st.dataframe(metrics_df, use_container_width=True, hide_index=True)
+
+    st.divider()
+
+    # Sezione Segnale
+    st.subheader("🔔 Signal for Tomorrow")
+    signal = metrics['Signal_Tomorrow']
+
+    if signal == "FLAT":
+        st.markdown(
+            f'<div class="signal-flat"><h3>🔴 {signal}</h3><p>No trading signal for tomorrow. Market conditions neutral.</p></div>',
+            unsafe_allow_html=True
+        )
+    elif signal == "BUY":
+        st.markdown(
+            f'<div class="signal-buy"><h3>🟢 {signal}</h3><p>Buy signal detected for tomorrow!</p></div>',
+            unsafe_allow_html=True
+        )
+    elif signal == "SELL":
+        st.markdown(
+            f'<div class="signal-sell"><h3>🔴 {signal}</h3><p>Sell signal detected for tomorrow!</p></div>',
+            unsafe_allow_html=True
+        )
+
+    st.divider()
+
+    # Footer
+    st.markdown(
+        f"<p style='text-align: center; color: gray; font-size: 12px;'>Data version: {version} - Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>",
+        unsafe_allow_html=True
+    )
@@ -0,0 +1,143 @@
+"""Downsampling
+Riduzione dei punti delle serie temporali per i grafici (LTTB e min/max)
+"""
+
+import numpy as np
+
+# Larghezza tipica di un grafico a tutta pagina e punti utili per pixel
+CHART_WIDTH_PX = 1400
+POINTS_PER_PX = 2
+
+def target_points(width_px=CHART_WIDTH_PX, points_per_px=POINTS_PER_PX):
+    """Numero di punti oltre il quale il grafico non guadagna dettaglio visibile"""
+    return int(width_px * points_per_px)
+
+def _as_float(x):
+    """Asse x numerico (date in nanosecondi) per il calcolo delle aree"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+def _bucket_edges(n, n_buckets):
+    """Estremi dei bucket interni (primo e ultimo punto esclusi)"""
+    return np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+def lttb_indices(x, y, n_out):
+    """Indici scelti da Largest-Triangle-Three-Buckets.
+
+    Primo e ultimo punto sono sempre inclusi; per ogni bucket interno si
+    sceglie il punto che forma il triangolo di area massima con il punto
+    scelto nel bucket precedente e la media del bucket successivo. Le medie
+    e le coordinate dei bucket sono calcolate una sola volta in forma
+    vettoriale; il ciclo sui bucket fa solo un argmax per bucket.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    n_buckets = n_out - 2
+    edges = _bucket_edges(n, n_buckets)
+    starts, ends = edges[:-1], edges[1:]
+    sizes = ends - starts
+
+    # Medie dei bucket con somme cumulate; per l'ultimo bucket il "successivo" è l'ultimo punto
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    mean_x = (cx[ends] - cx[starts]) / sizes
+    mean_y = (cy[ends] - cy[starts]) / sizes
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    # Bucket come righe di una matrice (padding con -inf nelle aree)
+    width = sizes.max()
+    offsets = np.arange(width)
+    idx = starts[:, None] + offsets[None, :]
+    valid = offsets[None, :] < sizes[:, None]
+    idx = np.where(valid, idx, starts[:, None])
+    bx, by = x[idx], y[idx]
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    ax, ay = x[0], y[0]
+    for b in range(n_buckets):
+        area = np.abs((ax - next_x[b]) * (by[b] - ay) - (ax - bx[b]) * (next_y[b] - ay))
+        area[~valid[b]] = -np.inf
+        j = idx[b, area.argmax()]
+        selected[b + 1] = j
+        ax, ay = x[j], y[j]
+
+    return selected
+
+def minmax_indices(x, y, n_out):
+    """Indici di minimo e massimo per bucket (picchi e drawdown sempre visibili).
+
+    Completamente vettoriale: ogni bucket contribuisce al più 2 punti.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    n_buckets = (n_out - 2) // 2
+    edges = _bucket_edges(n, n_buckets)
+    starts = edges[:-1]
+    lows = np.minimum.reduceat(y[1:-1], starts - 1)
+    highs = np.maximum.reduceat(y[1:-1], starts - 1)
+
+    # Posizione di min/max nel bucket: primo punto che raggiunge il valore
+    bucket_of = np.repeat(np.arange(n_buckets), np.diff(edges))
+    inner = np.arange(1, n - 1)
+    is_low = y[1:-1] == lows[bucket_of]
+    is_high = y[1:-1] == highs[bucket_of]
+    first_low = inner[is_low][np.unique(bucket_of[is_low], return_index=True)[1]]
+    first_high = inner[is_high][np.unique(bucket_of[is_high], return_index=True)[1]]
+
+    return np.unique(np.concatenate(([0, n - 1], first_low, first_high)))
+
+METHODS = {
+    'lttb': lttb_indices,
+    'minmax': minmax_indices,
+}
+
+def downsample(x, y, n_out=None, method='lttb'):
+    """Restituisce (x, y) ridotti a circa n_out punti"""
+    n_out = n_out or target_points()
+    indices = METHODS[method](x, y, n_out)
+    return np.asarray(x)[indices], np.asarray(y)[indices]
+
+def downsample_frame(df, x_col, y_cols, n_out=None, x_range=None, method='lttb'):
+    """Ritaglia il DataFrame all'intervallo visibile e lo riduce a n_out punti.
+
+    Con più colonne (es. bande di percentili) si uniscono gli indici scelti
+    per ciascuna, così nessuna serie perde i propri estremi.
+
+    Args:
+        df: DataFrame ordinato per x_col
+        x_col: Colonna dell'asse x
+        y_cols: Colonna o lista di colonne da preservare
+        n_out: Punti per serie (default: target_points())
+        x_range: (inizio, fine) dell'intervallo visibile, estremi inclusi
+        method: 'lttb' o 'minmax'
+    """
+    n_out = n_out or target_points()
+    if isinstance(y_cols, str):
+        y_cols = [y_cols]
+
+    x = df[x_col].to_numpy()
+    if x_range is not None:
+        start, end = np.asarray(x_range, dtype=x.dtype)
+        lo = np.searchsorted(x, start, side='left')
+        hi = np.searchsorted(x, end, side='right')
+        df = df.iloc[lo:hi]
+        x = x[lo:hi]
+
+    if len(df) <= n_out:
+        return df
+
+    indices = np.unique(np.concatenate([
+        METHODS[method](x, df[col].to_numpy(), n_out) for col in y_cols
+    ]))
+    return df.iloc[indices]
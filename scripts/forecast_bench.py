@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# Forecast Benchmark
+# Backtest rolling-origin dei modelli di forecast: accuratezza, tempi e memoria
+
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ga4_data_store import GA4DataStore
+from ga4_forecast_models import (FORECAST_METRICS, MODELS, align_daily_series, fit_model,
+                                 get_model, report_daily_series, split_by_history)
+
+DEFAULT_SIZES = (10, 100, 10_000)
+
+def synthetic_series(n_series: int, n_days: int = 180, seed: int = 0) -> np.ndarray:
+    """
+    Serie giornaliere sintetiche simili a quelle GA4: livello, trend,
+    stagionalità settimanale e rumore di Poisson.
+
+    Returns:
+        Matrice (n_series, n_days) di conteggi
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_days)
+    level = rng.uniform(20, 2000, size=(n_series, 1))
+    trend = rng.normal(0, 0.002, size=(n_series, 1)) * level
+    amplitude = rng.uniform(0.05, 0.4, size=(n_series, 1)) * level
+    phase = rng.uniform(0, 2 * np.pi, size=(n_series, 1))
+    expected = level + trend * t + amplitude * np.sin(2 * np.pi * t / 7 + phase)
+    return rng.poisson(np.maximum(expected, 0)).astype(np.float64)
+
+def stored_series(data_dir: str, days: int = 180) -> pd.DataFrame:
+    """
+    Serie giornaliere reali dall'archivio GA4DataStore, una riga per
+    (property, metrica), allineate su un calendario comune (NaN fuori
+    dall'intervallo di ciascuna serie).
+    """
+    store = GA4DataStore(data_dir)
+    series = {}
+    for property_dir in sorted(p for p in Path(data_dir).iterdir() if p.is_dir()):
+        pid = property_dir.name
+        reports = {
+            report_name: store.load(pid, report_name, days=days)
+            for report_name, _ in FORECAST_METRICS.values()
+        }
+        for metric, daily in report_daily_series(reports).items():
+            series[(pid, metric)] = daily
+    return align_daily_series(series)
+
+def backtest(y: np.ndarray, model_name: str, horizon: int = 1, origins: int = 14,
+             first_weekday: int = 0, **params) -> dict:
+    """
+    Backtest rolling-origin: per ciascuna delle ultime origins origini il
+    modello viene stimato sui dati precedenti e confrontato con i successivi
+    horizon giorni.
+
+    Args:
+        y: Matrice (serie x giorni)
+        model_name: Nome del modello in MODELS
+        horizon: Giorni previsti ad ogni origine
+        origins: Numero di origini
+        first_weekday: Giorno della settimana della prima colonna (0 = lunedì)
+
+    Returns:
+        MAE, MAPE, tempi cumulati di fit/predict e picco di memoria di un'origine
+    """
+    n_days = y.shape[1]
+    cutoffs = [n_days - horizon - i for i in reversed(range(origins))]
+    cutoffs = [c for c in cutoffs if c >= get_model(model_name, **params).min_history]
+    if not cutoffs:
+        raise ValueError(f"Storico insufficiente per {model_name}: {n_days} giorni")
+
+    abs_errors = []
+    pct_errors = []
+    fit_seconds = 0.0
+    predict_seconds = 0.0
+
+    for cutoff in cutoffs:
+        model = get_model(model_name, **params)
+
+        start = time.perf_counter()
+        fit_model(model, y[:, :cutoff], first_weekday)
+        fit_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        forecast = model.predict(horizon)
+        predict_seconds += time.perf_counter() - start
+
+        actual = y[:, cutoff:cutoff + horizon]
+        error = np.abs(forecast.mean - actual)
+        abs_errors.append(error.ravel())
+        # MAPE solo sui giorni con valore reale > 0
+        nonzero = actual > 0
+        pct_errors.append((error[nonzero] / actual[nonzero]).ravel())
+
+    # Memoria misurata a parte: tracemalloc altererebbe i tempi
+    tracemalloc.start()
+    fit_model(get_model(model_name, **params), y[:, :cutoffs[-1]], first_weekday).predict(horizon)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pct_errors = np.concatenate(pct_errors)
+    return {
+        "mae": round(float(np.concatenate(abs_errors).mean()), 4),
+        "mape": round(float(pct_errors.mean() * 100), 4) if len(pct_errors) else None,
+        "fit_seconds": round(fit_seconds, 6),
+        "predict_seconds": round(predict_seconds, 6),
+        "peak_mb": round(peak / 1024 ** 2, 3),
+        "origins": len(cutoffs),
+    }
+
+def run_benchmark(sizes=DEFAULT_SIZES, models=None, days: int = 180, horizon: int = 1,
+                  origins: int = 14, seed: int = 0, data_dir: str = None) -> dict:
+    """
+    Esegue il backtest di ogni modello per ogni numero di serie.
+
+    Con data_dir usa le serie archiviate (sizes viene ignorato), una misura
+    per intervallo di storia, altrimenti serie sintetiche riproducibili da seed.
+
+    Returns:
+        Dizionario serializzabile in JSON con metadati e risultati per
+        "<numero serie>" -> modello
+    """
+    models = models or sorted(MODELS)
+
+    if data_dir:
+        blocks = split_by_history(stored_series(data_dir, days))
+        if not blocks:
+            raise ValueError(f"Nessuna serie archiviata in {data_dir}")
+        # Un dataset per intervallo di storia: le serie non vengono troncate né riempite
+        datasets = {
+            f"{len(block)} ({block.columns[0].date()}..{block.columns[-1].date()})":
+                (block.to_numpy(dtype=float), block.columns[0].weekday())
+            for block in blocks
+        }
+    else:
+        datasets = {str(n): (synthetic_series(n, days, seed), 0) for n in sizes}
+
+    results = {}
+    for size, (y, first_weekday) in datasets.items():
+        results[size] = {
+            name: backtest(y, name, horizon, origins, first_weekday)
+            for name in models
+        }
+
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "source": data_dir or "synthetic",
+        "params": {"days": days, "horizon": horizon, "origins": origins, "seed": seed},
+        "environment": {"python": platform.python_version(), "numpy": np.__version__},
+        "results": results,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest e benchmark dei modelli di forecast")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Numero di serie sintetiche per ogni misura")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS))
+    parser.add_argument("--days", type=int, default=180, help="Giorni di storico")
+    parser.add_argument("--horizon", type=int, default=1, help="Giorni previsti per origine")
+    parser.add_argument("--origins", type=int, default=14, help="Origini del backtest")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", help="Archivio GA4DataStore da usare al posto dei dati sintetici")
+    parser.add_argument("--output", default="forecast_bench.json", help="File JSON dei risultati")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.sizes, args.models, args.days, args.horizon,
+                           args.origins, args.seed, args.data_dir)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nBacktest ({report['source']}) - risultati in {args.output}")
+    print(f"{'serie':>8} {'modello':<16}{'MAE':>10}{'MAPE %':>9}{'fit s':>10}{'predict s':>11}{'MB':>9}")
+    for size, by_model in report["results"].items():
+        for name, r in by_model.items():
+            mape = f"{r['mape']:.2f}" if r["mape"] is not None else "-"
+            print(f"{size:>8} {name:<16}{r['mae']:>10.2f}{mape:>9}"
+                  f"{r['fit_seconds']:>10.4f}{r['predict_seconds']:>11.5f}{r['peak_mb']:>9.2f}")
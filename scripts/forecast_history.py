@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# Forecast History
+# Storico append-only dei forecast su SQLite, indicizzato per property e data
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecast_runs (
+    run_id INTEGER PRIMARY KEY,
+    property_id TEXT NOT NULL,
+    forecast_date TEXT NOT NULL,
+    generated_at TEXT NOT NULL,
+    generated_ts REAL NOT NULL,
+    model TEXT,
+    interval REAL,
+    confidence_level TEXT,
+    data_points_used INTEGER
+);
+CREATE TABLE IF NOT EXISTS forecast_values (
+    run_id INTEGER NOT NULL REFERENCES forecast_runs (run_id) ON DELETE CASCADE,
+    metric TEXT NOT NULL,
+    predicted REAL NOT NULL,
+    lower REAL,
+    upper REAL,
+    confidence_level TEXT,
+    PRIMARY KEY (run_id, metric)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_runs_property_date_ts
+    ON forecast_runs (property_id, forecast_date, generated_ts);
+CREATE INDEX IF NOT EXISTS idx_runs_property_ts
+    ON forecast_runs (property_id, generated_ts);
+CREATE INDEX IF NOT EXISTS idx_runs_generated_ts
+    ON forecast_runs (generated_ts);
+"""
+
+# PRAGMA user_version dopo l'import dei vecchi forecast_*.json
+LEGACY_IMPORTED = 1
+
+class ForecastHistory:
+    def __init__(self, db_path: str = "forecasts/forecast_history.sqlite",
+                 retention_days: Optional[int] = 730, max_runs: Optional[int] = None):
+        """
+        Inizializza lo storico dei forecast.
+
+        Ogni run salva una riga in forecast_runs e una riga per metrica in
+        forecast_values. generated_at resta come stringa ISO originale;
+        ordinamenti e retention usano generated_ts (secondi epoch), così run
+        con offset UTC diversi si confrontano correttamente. Gli indici su
+        (property_id, forecast_date) e generated_ts mantengono ricerche e
+        pulizia logaritmiche nel numero di run.
+
+        Args:
+            db_path: File SQLite dello storico
+            retention_days: Giorni di run da mantenere (None = nessun limite)
+            max_runs: Run da mantenere per ogni property (None = nessun limite)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.retention_days = retention_days
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def import_legacy_json(self, property_id: str, directory: Optional[str] = None) -> int:
+        """
+        Importa una sola volta i forecast_*.json scritti prima dello storico SQLite.
+
+        I file restano al loro posto; l'import avviene in un'unica
+        transazione che segna lo storico (PRAGMA user_version), quindi le
+        chiamate successive non fanno nulla.
+
+        Args:
+            property_id: Property a cui attribuire i forecast (i file non la riportano)
+            directory: Directory dei file JSON (default: quella del database)
+
+        Returns:
+            Numero di forecast importati
+        """
+        with self._lock:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] >= LEGACY_IMPORTED:
+                return 0
+        forecasts = []
+        for path in sorted(Path(directory or self.db_path.parent).glob("forecast_*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                forecasts.append(json.load(f))
+
+        with self._lock, self._conn:
+            for forecast in forecasts:
+                self._insert(property_id, forecast)
+            self._conn.execute(f"PRAGMA user_version = {LEGACY_IMPORTED}")
+        return len(forecasts)
+
+    def append(self, property_id: str, forecast: dict) -> int:
+        """
+        Aggiunge un forecast prodotto da GA4ForecastScheduler.
+
+        Le metriche sono le chiavi predicted_<metrica>, con l'intervallo in
+        <metrica>_interval e la confidenza in confidence_by_metric.
+
+        Returns:
+            run_id del forecast salvato
+        """
+        with self._lock, self._conn:
+            return self._insert(property_id, forecast)
+
+    def _insert(self, property_id: str, forecast: dict) -> int:
+        """
+        Inserisce run e valori di un forecast; lock e transazione sono del chiamante.
+        """
+        by_metric = forecast.get("confidence_by_metric", {})
+        values = []
+        for key, predicted in forecast.items():
+            if not key.startswith("predicted_"):
+                continue
+            metric = key[len("predicted_"):]
+            lower, upper = forecast.get(f"{metric}_interval") or (None, None)
+            values.append((metric, predicted, lower, upper, by_metric.get(metric)))
+
+        cursor = self._conn.execute(
+            "INSERT INTO forecast_runs (property_id, forecast_date, generated_at, generated_ts, "
+            "model, interval, confidence_level, data_points_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(property_id), forecast["forecast_date"], forecast["generated_at"],
+             _epoch(forecast["generated_at"]), forecast.get("model"), forecast.get("interval"),
+             forecast.get("confidence_level"), forecast.get("data_points_used")),
+        )
+        run_id = cursor.lastrowid
+        self._conn.executemany(
+            "INSERT INTO forecast_values (run_id, metric, predicted, lower, upper, "
+            "confidence_level) VALUES (?, ?, ?, ?, ?, ?)",
+            [(run_id, *value) for value in values],
+        )
+        return run_id
+
+    def query(self, property_id: str, start_date: Optional[str] = None,
+              end_date: Optional[str] = None, latest_only: bool = True) -> pd.DataFrame:
+        """
+        Forecast della property con forecast_date in [start_date, end_date].
+
+        Args:
+            property_id: ID della property GA4
+            start_date: Prima data prevista (ISO, inclusa)
+            end_date: Ultima data prevista (ISO, inclusa)
+            latest_only: Solo l'ultimo run per ogni data prevista
+
+        Returns:
+            DataFrame con una riga per (run, metrica)
+        """
+        where = ["r.property_id = ?"]
+        params = [str(property_id)]
+        if start_date:
+            where.append("r.forecast_date >= ?")
+            params.append(str(start_date))
+        if end_date:
+            where.append("r.forecast_date <= ?")
+            params.append(str(end_date))
+        if latest_only:
+            # Per ogni data, il run più recente (risolto sull'indice composto)
+            where.append(
+                "r.generated_ts = (SELECT MAX(generated_ts) FROM forecast_runs "
+                "WHERE property_id = r.property_id AND forecast_date = r.forecast_date)"
+            )
+
+        sql = (
+            "SELECT r.run_id, r.property_id, r.forecast_date, r.generated_at, r.model, "
+            "v.metric, v.predicted, v.lower, v.upper, v.confidence_level "
+            "FROM forecast_runs r JOIN forecast_values v ON v.run_id = r.run_id "
+            f"WHERE {' AND '.join(where)} ORDER BY r.forecast_date, r.generated_ts, v.metric"
+        )
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=params)
+        df["forecast_date"] = pd.to_datetime(df["forecast_date"])
+        return df
+
+    def latest(self, property_id: str) -> Optional[dict]:
+        """
+        Ultimo forecast salvato per la property, nel formato di append.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, forecast_date, generated_at, model, interval, confidence_level, "
+                "data_points_used FROM forecast_runs WHERE property_id = ? "
+                "ORDER BY forecast_date DESC, generated_ts DESC LIMIT 1",
+                (str(property_id),),
+            ).fetchone()
+            if row is None:
+                return None
+            values = self._conn.execute(
+                "SELECT metric, predicted, lower, upper, confidence_level "
+                "FROM forecast_values WHERE run_id = ?",
+                (row[0],),
+            ).fetchall()
+
+        forecast = dict(zip(
+            ("run_id", "forecast_date", "generated_at", "model", "interval",
+             "confidence_level", "data_points_used"),
+            row,
+        ))
+        forecast["confidence_by_metric"] = {}
+        for metric, predicted, lower, upper, confidence in values:
+            forecast[f"predicted_{metric}"] = predicted
+            forecast[f"{metric}_interval"] = [lower, upper]
+            forecast["confidence_by_metric"][metric] = confidence
+        return forecast
+
+    def forecast_vs_actual(self, property_id: str, actuals: Dict[str, pd.Series],
+                           days: int = 30, end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        Confronta gli ultimi days giorni previsti con i valori reali.
+
+        Args:
+            property_id: ID della property GA4
+            actuals: Metrica -> serie giornaliera reale indicizzata per data
+                     (es. ga4_forecast_models.report_daily_series)
+            days: Giorni da confrontare, terminando in end_date
+            end_date: Ultimo giorno confrontato (default: ieri)
+
+        Returns:
+            DataFrame con forecast_date, metric, predicted, lower, upper, actual,
+            error, abs_pct_error e within_interval
+        """
+        end = pd.Timestamp(end_date) if end_date else pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+        start = end - pd.Timedelta(days=days - 1)
+        forecasts = self.query(property_id, start.date().isoformat(), end.date().isoformat())
+
+        actual_frames = [
+            pd.DataFrame({"forecast_date": pd.to_datetime(s.index), "metric": metric,
+                          "actual": s.to_numpy(dtype=float)})
+            for metric, s in actuals.items()
+        ]
+        columns = ["forecast_date", "metric", "actual"]
+        actual_df = pd.concat(actual_frames, ignore_index=True) if actual_frames else pd.DataFrame(columns=columns)
+
+        merged = forecasts.merge(actual_df, on=["forecast_date", "metric"], how="inner")
+        merged["error"] = merged["predicted"] - merged["actual"]
+        merged["abs_pct_error"] = (merged["error"].abs() / merged["actual"]).where(merged["actual"] > 0)
+        merged["within_interval"] = merged["actual"].between(merged["lower"], merged["upper"])
+        return merged[["forecast_date", "metric", "predicted", "lower", "upper", "actual",
+                       "error", "abs_pct_error", "within_interval"]]
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """
+        Applica la retention per età (retention_days) e per numero di run
+        di ogni property (max_runs).
+
+        Le soglie si trovano sugli indici di generated_ts: la cancellazione
+        tocca solo i run rimossi.
+
+        Returns:
+            Numero di run rimossi
+        """
+        removed = 0
+        with self._lock, self._conn:
+            if self.retention_days is not None:
+                now = now or datetime.now().astimezone()
+                cutoff = (now - timedelta(days=self.retention_days)).timestamp()
+                removed += self._conn.execute(
+                    "DELETE FROM forecast_runs WHERE generated_ts < ?", (cutoff,)
+                ).rowcount
+
+            if self.max_runs is not None:
+                # Ultimi max_runs run di ogni property, numerati sull'indice (property_id, generated_ts)
+                removed += self._conn.execute(
+                    "DELETE FROM forecast_runs WHERE run_id IN (SELECT run_id FROM ("
+                    "SELECT run_id, ROW_NUMBER() OVER (PARTITION BY property_id "
+                    "ORDER BY generated_ts DESC, run_id DESC) AS position FROM forecast_runs) "
+                    "WHERE position > ?)", (self.max_runs,)
+                ).rowcount
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _epoch(generated_at: str) -> float:
+    """
+    Secondi epoch di un timestamp ISO; senza offset vale l'ora locale.
+    """
+    return datetime.fromisoformat(generated_at).timestamp()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# GA4 Alert Delivery Benchmark
+# Throughput di AlertDispatcher contro un server SMTP locale (aiosmtpd)
+
+import argparse
+import smtplib
+import socket
+import threading
+import time
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    print("\n[!] ERRORE: aiosmtpd non è installato")
+    print("Installa con: pip install aiosmtpd")
+    raise SystemExit(1)
+
+from ga4_alert_delivery import AlertDispatcher, AlertMessage
+
+class CountingHandler:
+    """
+    Handler aiosmtpd che conta i messaggi ricevuti senza salvarli.
+    """
+    def __init__(self):
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            self.messages += 1
+        return '250 Message accepted for delivery'
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def local_sink():
+    """
+    Avvia un server SMTP locale; restituisce (controller, handler).
+    """
+    handler = CountingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    return controller, handler
+
+def _alerts(n_alerts: int, n_recipients: int):
+    for i in range(n_alerts):
+        yield (f"admin{i % n_recipients}@example.com",
+               f"[GA4 Alert] Traffic Drop Alert #{i} - HIGH",
+               f"<h2>Traffic Drop Alert</h2><p>Property prop_{i}</p>")
+
+def bench_connect_per_message(host: str, port: int, n_alerts: int, n_recipients: int) -> float:
+    """
+    Baseline: una connessione SMTP per ogni alert, invio sincrono.
+    """
+    dispatcher = AlertDispatcher(host, port, window_seconds=0)
+    start = time.perf_counter()
+    for recipient, subject, html in _alerts(n_alerts, n_recipients):
+        msg = dispatcher.build_message([AlertMessage(recipient, subject, html)])
+        with smtplib.SMTP(host, port) as smtp:
+            smtp.send_message(msg)
+    elapsed = time.perf_counter() - start
+    dispatcher.close()
+    return elapsed
+
+def bench_dispatcher(host: str, port: int, n_alerts: int, n_recipients: int,
+                     digest: bool, window_seconds: float = 0.0) -> dict:
+    """
+    AlertDispatcher con connessione persistente, con o senza digest.
+    """
+    dispatcher = AlertDispatcher(host, port, window_seconds=window_seconds, digest=digest)
+    start = time.perf_counter()
+    for recipient, subject, html in _alerts(n_alerts, n_recipients):
+        dispatcher.submit([recipient], subject, html=html, severity='HIGH')
+    submit_seconds = time.perf_counter() - start
+    dispatcher.flush()
+    elapsed = time.perf_counter() - start
+    dispatcher.close()
+    return {
+        "seconds": elapsed,
+        "submit_seconds": submit_seconds,
+        "messages": dispatcher.stats["sent_messages"],
+        "connections": dispatcher.connection.connects,
+    }
+
+def run_benchmark(n_alerts: int = 500, n_recipients: int = 5, window_seconds: float = 0.5) -> dict:
+    controller, handler = local_sink()
+    host, port = controller.hostname, controller.port
+    try:
+        results = {}
+
+        seconds = bench_connect_per_message(host, port, n_alerts, n_recipients)
+        results["connect_per_message"] = {"seconds": seconds, "messages": n_alerts,
+                                          "connections": n_alerts}
+
+        results["persistent"] = bench_dispatcher(host, port, n_alerts, n_recipients, digest=False)
+        results["persistent_digest"] = bench_dispatcher(host, port, n_alerts, n_recipients,
+                                                        digest=True, window_seconds=window_seconds)
+        results["sink_received"] = handler.messages
+        return results
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dell'invio alert via SMTP locale")
+    parser.add_argument("--alerts", type=int, default=500)
+    parser.add_argument("--recipients", type=int, default=5)
+    parser.add_argument("--window", type=float, default=0.5,
+                        help="Finestra di raggruppamento (secondi) per il digest")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.alerts, args.recipients, args.window)
+    received = results.pop("sink_received")
+    print(f"\n{args.alerts} alert verso {args.recipients} destinatari")
+    for mode, values in results.items():
+        rate = args.alerts / values["seconds"]
+        print(f"  {mode:20s} {values['seconds']:7.3f}s  {rate:8.0f} alert/s  "
+              f"email: {values['messages']:5d}  connessioni: {values['connections']}")
+    print(f"  Email ricevute dal server locale: {received}")
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# GA4 Alert Delivery
+# Coda di invio email in background con connessione SMTP persistente e digest per destinatario
+
+import atexit
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formatdate, make_msgid
+from html import escape
+from typing import List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SENDER = 'ga4-alerts@artax-studio.it'
+SEVERITY_ORDER = ['LOW', 'MEDIUM', 'HIGH']
+
+# Sentinella per l'arresto del worker
+_STOP = object()
+
+# Dispatcher condiviso dal processo (vedi shared_dispatcher)
+_shared = None
+_shared_lock = threading.Lock()
+
+@dataclass
+class AlertMessage:
+    recipient: str
+    subject: str
+    html: Optional[str] = None  # Frammento HTML (senza <html>/<body>)
+    text: Optional[str] = None
+    severity: Optional[str] = None
+
+    def html_body(self) -> str:
+        """
+        Corpo HTML del messaggio (il testo semplice viene preformattato).
+        """
+        return self.html if self.html is not None else f"<pre>{escape(self.text or '')}</pre>"
+
+class SMTPConnection:
+    def __init__(self, host: str, port: int = 25, username: Optional[str] = None,
+                 password: Optional[str] = None, starttls: bool = False,
+                 timeout: float = 30.0, idle_timeout: float = 60.0):
+        """
+        Connessione SMTP riutilizzata tra più messaggi.
+
+        La connessione viene aperta al primo invio, riaperta se il server
+        l'ha chiusa e chiusa dopo idle_timeout secondi di inattività (i
+        server SMTP chiudono le sessioni inattive).
+
+        Args:
+            host: Server SMTP
+            port: Porta SMTP
+            username: Utente per l'autenticazione (opzionale)
+            password: Password per l'autenticazione
+            starttls: Usa STARTTLS dopo la connessione
+            timeout: Timeout di rete in secondi
+            idle_timeout: Secondi di inattività dopo cui riconnettersi
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.connects = 0
+        self._smtp = None
+        self._last_used = 0.0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or '')
+        self.connects += 1
+        return smtp
+
+    def send(self, msg) -> None:
+        """
+        Invia il messaggio; se la connessione è caduta riconnette e ritenta una volta.
+        """
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(msg)
+                self._last_used = time.monotonic()
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._smtp = None
+                if attempt:
+                    raise
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+class AlertDispatcher:
+    def __init__(self, host: str, port: int = 25, sender: str = DEFAULT_SENDER,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = False, window_seconds: float = 2.0,
+                 max_queue: int = 10000, persistent: bool = True, digest: bool = True):
+        """
+        Invio asincrono degli alert via email.
+
+        submit() accoda e ritorna subito: un thread in background raccoglie
+        gli alert arrivati entro window_seconds dal primo, li raggruppa in un
+        unico digest per destinatario e li invia su una sola connessione SMTP.
+
+        Args:
+            host: Server SMTP
+            port: Porta SMTP
+            sender: Mittente delle email
+            username: Utente SMTP (opzionale)
+            password: Password SMTP
+            starttls: Usa STARTTLS
+            window_seconds: Finestra di raggruppamento degli alert
+            max_queue: Alert in attesa oltre i quali i nuovi vengono scartati
+            persistent: Riutilizza la connessione (False: una connessione per messaggio)
+            digest: Raggruppa gli alert per destinatario (False: un'email per alert)
+        """
+        self.sender = sender
+        self.window_seconds = window_seconds
+        self.persistent = persistent
+        self.digest = digest
+        self.connection = SMTPConnection(host, port, username, password, starttls)
+        self.stats = {'queued': 0, 'dropped': 0, 'sent_messages': 0,
+                      'sent_alerts': 0, 'failed_alerts': 0}
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='alert-delivery', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> Optional['AlertDispatcher']:
+        """
+        Crea il dispatcher dalle variabili SMTP_*; None se SMTP_HOST non è impostato.
+        """
+        host = os.getenv('SMTP_HOST')
+        if not host:
+            return None
+        return cls(
+            host=host,
+            port=int(os.getenv('SMTP_PORT', '587')),
+            sender=os.getenv('ALERT_SENDER', DEFAULT_SENDER),
+            username=os.getenv('SMTP_USER'),
+            password=os.getenv('SMTP_PASSWORD'),
+            starttls=os.getenv('SMTP_STARTTLS', '1') == '1',
+            **kwargs,
+        )
+
+    def submit(self, recipients: Sequence[str], subject: str, html: Optional[str] = None,
+               text: Optional[str] = None, severity: Optional[str] = None) -> bool:
+        """
+        Accoda un alert per ogni destinatario senza mai bloccare il chiamante.
+
+        Returns:
+            False se la coda è piena e l'alert è stato scartato
+        """
+        messages = [AlertMessage(r, subject, html, text, severity) for r in recipients]
+        with self._pending_cond:
+            self._pending += len(messages)
+        for i, message in enumerate(messages):
+            try:
+                self._queue.put_nowait(message)
+            except queue.Full:
+                dropped = len(messages) - i
+                with self._pending_cond:
+                    self.stats['queued'] += i
+                    self.stats['dropped'] += dropped
+                self._done(dropped)
+                logger.warning(f"[ALERT_DROPPED] Coda piena, scartato: {subject}")
+                return False
+        with self._pending_cond:
+            self.stats['queued'] += len(messages)
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attende l'invio di tutti gli alert accodati.
+
+        Returns:
+            True se la coda si è svuotata entro timeout
+        """
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: float = 30.0) -> None:
+        """
+        Invia gli alert rimasti, ferma il worker e chiude la connessione.
+        """
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _done(self, count: int) -> None:
+        with self._pending_cond:
+            self._pending -= count
+            self._pending_cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.connection.idle_timeout)
+            except queue.Empty:
+                self.connection.close()
+                continue
+            if item is _STOP:
+                break
+
+            batch, stop = self._collect(item)
+            try:
+                self._deliver(batch)
+            finally:
+                self._done(len(batch))
+            if stop:
+                break
+
+        self.connection.close()
+
+    def _collect(self, first: AlertMessage):
+        """
+        Raccoglie gli alert arrivati entro la finestra dal primo.
+        """
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while True:
+            try:
+                remaining = deadline - time.monotonic()
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch, False
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+    def _deliver(self, batch: List[AlertMessage]) -> None:
+        if self.digest:
+            by_recipient = defaultdict(list)
+            for message in batch:
+                by_recipient[message.recipient].append(message)
+            groups = list(by_recipient.values())
+        else:
+            groups = [[message] for message in batch]
+
+        for group in groups:
+            try:
+                self.connection.send(self.build_message(group))
+                self.stats['sent_messages'] += 1
+                self.stats['sent_alerts'] += len(group)
+            except (smtplib.SMTPException, OSError) as e:
+                self.stats['failed_alerts'] += len(group)
+                logger.warning(f"[ALERT_FAILED] Invio a {group[0].recipient} fallito: {e}")
+            finally:
+                if not self.persistent:
+                    self.connection.close()
+
+    def build_message(self, group: List[AlertMessage]) -> MIMEMultipart:
+        """
+        Email per un destinatario: l'alert stesso se è uno solo, altrimenti un digest.
+        """
+        first = group[0]
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.sender
+        msg['To'] = first.recipient
+        msg['Date'] = formatdate(localtime=True)
+        msg['Message-ID'] = make_msgid(domain=self.sender.split('@')[-1])
+
+        if len(group) == 1:
+            msg['Subject'] = first.subject
+            if first.html is None:
+                msg.attach(MIMEText(first.text or '', 'plain', 'utf-8'))
+            else:
+                msg.attach(MIMEText(f"<html><body>\n{first.html}\n</body></html>", 'html', 'utf-8'))
+            return msg
+
+        severities = [m.severity for m in group if m.severity in SEVERITY_ORDER]
+        worst = max(severities, key=SEVERITY_ORDER.index) if severities else None
+        msg['Subject'] = f"[GA4 Alert] Digest: {len(group)} alert" + (f" - {worst}" if worst else '')
+        sections = "\n<hr>\n".join(
+            f"<h3>{escape(m.subject)}</h3>\n{m.html_body()}" for m in group
+        )
+        msg.attach(MIMEText(f"<html><body>\n{sections}\n</body></html>", 'html', 'utf-8'))
+        return msg
+
+def shared_dispatcher(**kwargs) -> Optional[AlertDispatcher]:
+    """
+    Dispatcher unico del processo, creato da from_env al primo utilizzo.
+
+    Tutti i chiamanti condividono thread e connessione SMTP; all'uscita
+    del processo gli alert ancora in coda vengono inviati prima di chiudere.
+    None se SMTP_HOST non è impostato.
+
+    Args:
+        **kwargs: Opzioni di AlertDispatcher, usate solo alla creazione
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = AlertDispatcher.from_env(**kwargs)
+            if _shared is not None:
+                atexit.register(_shared.close)
+        return _shared
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# GA4 Alert Rules
+# Compila le condizioni degli alert in valutatori vettoriali su metriche giornaliere
+
+import argparse
+import operator
+import re
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Nomi usati nelle condizioni -> colonne del DataFrame di metriche giornaliere
+METRIC_ALIASES = {
+    "sessions_daily": "sessions",
+    "daily_sessions": "sessions",
+    "daily_conversions": "conversions",
+    "conversions_daily": "conversions",
+}
+
+# Medie di riferimento: giorni precedenti (escluso il giorno valutato)
+BASELINE_WINDOWS = {
+    "avg_weekly": 7,
+    "avg_daily": 28,
+    "avg_monthly": 30,
+}
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# metrica op (numero | baseline | (baseline * fattore)) [for N+ days]
+CONDITION_RE = re.compile(
+    r"^\s*(?P<metric>\w+)\s*(?P<op><=|>=|==|!=|<|>)\s*"
+    r"(?:(?P<number>-?\d+(?:\.\d+)?)"
+    r"|\(?\s*(?P<baseline>avg_\w+)\s*(?:\*\s*(?P<factor>\d+(?:\.\d+)?))?\s*\)?)"
+    r"\s*(?:for\s+(?P<days>\d+)\+?\s+days?)?\s*$"
+)
+
+@dataclass(frozen=True)
+class CompiledCondition:
+    """
+    Condizione compilata: colonna, operatore, soglia fissa o relativa a una media mobile.
+    """
+    expression: str
+    column: str
+    op: str
+    threshold: Optional[float] = None
+    baseline_window: Optional[int] = None
+    factor: float = 1.0
+    min_days: int = 1
+
+    def evaluate(self, values: np.ndarray, group_start: np.ndarray):
+        """
+        Valuta la condizione su tutte le righe.
+
+        Args:
+            values: Valori della metrica, ordinati per property e data
+            group_start: Per ogni riga, indice della prima riga della sua property
+
+        Returns:
+            (righe attivate, soglia effettiva per riga)
+        """
+        if self.baseline_window is None:
+            limit = np.full(len(values), self.threshold, dtype=np.float64)
+        else:
+            limit = _trailing_mean(values, group_start, self.baseline_window) * self.factor
+
+        with np.errstate(invalid="ignore"):
+            hit = OPERATORS[self.op](values, limit) & ~np.isnan(limit)
+
+        if self.min_days > 1:
+            hit = _run_length(hit, group_start) >= self.min_days
+        return hit, limit
+
+@lru_cache(maxsize=256)
+def compile_condition(expression: str) -> CompiledCondition:
+    """
+    Compila una condizione testuale (una sola volta per espressione).
+
+    Esempi: 'bounce_rate > 60', 'sessions_daily < (avg_weekly * 0.70)',
+    'daily_conversions == 0 for 2+ days'.
+
+    Raises:
+        ValueError: Se l'espressione non è riconosciuta
+    """
+    match = CONDITION_RE.match(expression)
+    if not match:
+        raise ValueError(f"Condizione non valida: {expression!r}")
+
+    baseline = match.group("baseline")
+    if baseline is not None and baseline not in BASELINE_WINDOWS:
+        raise ValueError(f"Media sconosciuta in {expression!r}: {baseline}. "
+                         f"Disponibili: {', '.join(BASELINE_WINDOWS)}")
+
+    metric = match.group("metric")
+    return CompiledCondition(
+        expression=expression,
+        column=METRIC_ALIASES.get(metric, metric),
+        op=match.group("op"),
+        threshold=float(match.group("number")) if match.group("number") is not None else None,
+        baseline_window=BASELINE_WINDOWS.get(baseline),
+        factor=float(match.group("factor") or 1.0),
+        min_days=int(match.group("days") or 1),
+    )
+
+class AlertRuleEngine:
+    def __init__(self, alerts: List[Dict]):
+        """
+        Compila gli alert abilitati (formato di GA4GoalsManager.setup_alerts).
+
+        Args:
+            alerts: Dizionari con almeno 'name' e 'condition'; opzionali
+                    'severity' ed 'enabled'
+        """
+        self.rules = [
+            (alert, compile_condition(alert["condition"]))
+            for alert in alerts if alert.get("enabled", True)
+        ]
+
+    def evaluate(self, daily_metrics: pd.DataFrame, latest_only: bool = False) -> pd.DataFrame:
+        """
+        Valuta tutte le regole su metriche giornaliere di più property.
+
+        Il DataFrame deve avere una riga per property e giorno (giorni mancanti
+        già riempiti), colonne property_id, date e le metriche usate dalle regole.
+
+        Args:
+            daily_metrics: Metriche giornaliere
+            latest_only: Solo l'ultimo giorno di ogni property
+
+        Returns:
+            DataFrame con property_id, date, alert, severity, value, limit, message
+        """
+        # Property come codici interi: ordinamento e confini dei gruppi senza confronti tra stringhe
+        codes, property_ids = pd.factorize(daily_metrics["property_id"])
+        dates = daily_metrics["date"].to_numpy()
+        order = np.lexsort((dates, codes))
+        codes, dates = codes[order], dates[order]
+        n = len(order)
+
+        # Inizio del gruppo di ogni riga (le righe della stessa property sono contigue)
+        first = np.ones(n, dtype=bool)
+        first[1:] = codes[1:] != codes[:-1]
+        group_start = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+        last = np.ones(n, dtype=bool)
+        last[:-1] = first[1:]
+
+        rule_of, rows_of, values_of, limits_of = [], [], [], []
+        for i, (alert, condition) in enumerate(self.rules):
+            values = daily_metrics[condition.column].to_numpy(dtype=np.float64)[order]
+            hit, limit = condition.evaluate(values, group_start)
+            if latest_only:
+                hit &= last
+            rows = np.flatnonzero(hit)
+            rule_of.append(np.full(len(rows), i))
+            rows_of.append(rows)
+            values_of.append(values[rows])
+            limits_of.append(limit[rows])
+
+        rule = np.concatenate(rule_of or [np.empty(0, dtype=np.int64)])
+        rows = np.concatenate(rows_of or [np.empty(0, dtype=np.int64)])
+        alerts = [alert for alert, _ in self.rules]
+
+        def per_rule(values):
+            # Categoriche: poche stringhe distinte ripetute su molte righe
+            categories, inverse = np.unique(values, return_inverse=True)
+            return pd.Categorical.from_codes(inverse[rule], categories=categories)
+
+        return pd.DataFrame({
+            "property_id": property_ids.take(codes[rows]),
+            "date": dates[rows],
+            "alert": per_rule([a["name"] for a in alerts]),
+            "severity": per_rule([a.get("severity", "MEDIUM") for a in alerts]),
+            "value": np.concatenate(values_of or [np.empty(0)]),
+            "limit": np.concatenate(limits_of or [np.empty(0)]),
+            "message": per_rule([c.expression for _, c in self.rules]),
+        })
+
+def _trailing_mean(values: np.ndarray, group_start: np.ndarray, window: int) -> np.ndarray:
+    """
+    Media dei window giorni precedenti della stessa property (NaN senza storico completo).
+
+    I giorni senza valore (NaN) sono esclusi dalla media: somme e conteggi
+    cumulativi sui soli valori validi, così un NaN non si propaga alle righe
+    successive né alle altre property.
+    """
+    n = len(values)
+    valid = ~np.isnan(values)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    ccount = np.concatenate(([0], np.cumsum(valid)))
+    pos = np.arange(n)
+    begin = pos - window
+    start = np.maximum(begin, 0)
+    count = ccount[pos] - ccount[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (csum[pos] - csum[start]) / count
+    return np.where((begin >= group_start) & (count > 0), mean, np.nan)
+
+def _run_length(hit: np.ndarray, group_start: np.ndarray) -> np.ndarray:
+    """
+    Giorni consecutivi (fino alla riga inclusa) in cui la condizione è vera.
+    """
+    pos = np.arange(len(hit))
+    # Ultima riga falsa prima di ogni posizione; l'inizio della property azzera il conteggio
+    last_false = np.maximum.accumulate(np.where(hit, group_start - 1, pos))
+    return np.where(hit, pos - last_false, 0)
+
+def synthetic_daily_metrics(n_properties: int, days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Metriche giornaliere sintetiche per il benchmark.
+    """
+    rng = np.random.default_rng(seed)
+    n = n_properties * days
+    return pd.DataFrame({
+        "property_id": np.repeat([f"prop_{i}" for i in range(n_properties)], days),
+        "date": np.tile(pd.date_range(end=pd.Timestamp.today().normalize(), periods=days), n_properties),
+        "sessions": rng.poisson(500, n).astype(float),
+        "conversions": rng.poisson(2, n).astype(float),
+        "bounce_rate": rng.uniform(20, 80, n),
+    })
+
+if __name__ == "__main__":
+    from ga4_goals_automation import DEFAULT_ALERTS
+
+    parser = argparse.ArgumentParser(description="Benchmark del motore di regole degli alert")
+    parser.add_argument("--properties", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    df = synthetic_daily_metrics(args.properties, args.days)
+    engine = AlertRuleEngine(DEFAULT_ALERTS)
+    engine.evaluate(df)
+
+    start = time.perf_counter()
+    triggered = engine.evaluate(df)
+    elapsed = time.perf_counter() - start
+
+    print(f"\n{len(df):,} property-giorno, {len(engine.rules)} regole: {elapsed * 1000:.1f} ms "
+          f"({len(df) / (elapsed * 1000):,.0f} property-giorno/ms)")
+    print(triggered.groupby("alert").size().to_string())
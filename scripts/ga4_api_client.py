@@ -2,32 +2,90 @@
 # GA4 Analytics API Client
 # Interagisce direttamente con l'API di Google Analytics 4
 
+import asyncio
 import json
 import os
-from google.analytics.data_v1beta import BetaAnalyticsDataClient
+from typing import Dict, Iterator, List, Optional, Tuple
+from google.analytics.data_v1beta import BetaAnalyticsDataAsyncClient, BetaAnalyticsDataClient
 from google.analytics.data_v1beta.types import (
+    BatchRunReportsRequest,
     DateRange,
     Dimension,
     Metric,
     RunReportRequest,
     Filter,
     FilterExpression,
+    MetricType,
     OrderBy,
 )
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+from ga4_rate_limit import RetryPolicy
+from ga4_segments import Segment, SegmentCatalog, combined_filter, label_reports, load_segments
+
+# Numero massimo di report accettati da una singola chiamata batchRunReports
+MAX_BATCH_SIZE = 5
+
+# Limiti dell'API per singola richiesta
+MAX_DIMENSIONS = 9
+MAX_METRICS = 10
+
+# Righe per pagina nelle richieste paginate (l'API ne accetta al massimo 250.000)
+DEFAULT_PAGE_SIZE = 100000
+
+# Richieste contemporanee di default per AsyncGA4Client
+DEFAULT_MAX_CONCURRENCY = 10
+
+# Dimensioni del report segmenti
+SEGMENT_DIMENSIONS = ["country", "city"]
+
+# Report standard estratti dallo scheduler
+REPORT_NAMES = ("conversions", "traffic", "segments")
+
+# Dimensioni a bassa cardinalità convertite in dtype category
+CATEGORICAL_DIMENSIONS = {"source", "medium", "country", "deviceCategory"}
+
+class ReportFetchError(Exception):
+    """
+    Uno o più report non sono stati scaricati nemmeno dopo i retry.
+    
+    Attributes:
+        errors: Dizionario nome report -> eccezione
+        partial_results: Report scaricati con successo, nome -> DataFrame
+    """
+    
+    def __init__(self, errors: Dict[str, Exception], partial_results: Dict[str, pd.DataFrame]):
+        super().__init__(f"Report non scaricati: {', '.join(errors)}")
+        self.errors = errors
+        self.partial_results = partial_results
 
 class GA4Client:
-    def __init__(self, property_id: str, credentials_path: str = None):
+    def __init__(self, property_id: str, credentials_path: str = None, client=None,
+                 cache=None, retry_policy: RetryPolicy = None, rate_limiter=None,
+                 segments: SegmentCatalog = None):
         """
         Inizializza il client GA4.
         
         Args:
             property_id: ID della property GA4
             credentials_path: Path al file JSON di credenziali Google
+            client: Data client alternativo (es. FakeDataClient per test offline)
+            cache: Cache dei report con metodi get(request)/put(request, df),
+                   es. ReportCache; None per interrogare sempre l'API
+            retry_policy: Politica di retry per chiamata (default: RetryPolicy())
+            rate_limiter: TokenBucketRateLimiter della property; se presente le
+                          richieste chiedono la quota residua (return_property_quota)
+            segments: Segmenti compilati (default: config/utm_and_segments.json)
         """
         self.property_id = property_id
-        self.client = BetaAnalyticsDataClient()
+        self.client = client if client is not None else BetaAnalyticsDataClient()
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.segments = segments or load_segments()
         
     def get_conversion_report(self, days_back: int = 7) -> pd.DataFrame:
         """
@@ -39,10 +97,266 @@ class GA4Client:
         Returns:
             DataFrame con dati di conversione
         """
+        return self.fetch_report(self.build_conversion_request(days_back))
+    
+    def get_traffic_by_source(self, days_back: int = 7) -> pd.DataFrame:
+        """
+        Recupera traffico raggruppato per fonte.
+        """
+        return self.fetch_report(self.build_traffic_request(days_back))
+    
+    def get_user_segments_data(self, segment_name: str, days_back: int = 7) -> pd.DataFrame:
+        """
+        Recupera dati per un segmento utente specifico.
+        """
+        return self.fetch_report(self.build_segment_request(segment_name, days_back))
+    
+    def get_segments_data(self, segment_names: List[str], days_back: int = 7) -> pd.DataFrame:
+        """
+        Recupera più segmenti con il minimo di report (vedi build_segment_requests).
+        
+        Returns:
+            DataFrame con la colonna "segment" (vedi label_reports)
+        """
+        segments = self.segments.resolve(segment_names)
+        requests = self.build_segment_requests(segment_names, days_back)
+        return label_reports(
+            [(self.fetch_report(request), group) for request, group in requests],
+            segments, SEGMENT_DIMENSIONS,
+        )
+    
+    def fetch_report(self, request: RunReportRequest, chunked: bool = False,
+                     page_size: int = DEFAULT_PAGE_SIZE):
+        """
+        Esegue un report completo, pagina per pagina.
+        
+        Args:
+            request: Richiesta del report
+            chunked: Se True restituisce un generatore di DataFrame, uno per pagina
+            page_size: Righe richieste per ogni pagina
+            
+        Returns:
+            DataFrame con tutte le righe, oppure generatore di DataFrame se chunked
+        """
+        chunks = (
+            self._convert_to_dataframe(page)
+            for page in self._iter_pages(request, page_size)
+        )
+        if chunked:
+            return chunks
+        
+        if self.cache is not None:
+            cached = self.cache.get(request)
+            if cached is not None:
+                return cached
+        
+        df = self._concat_chunks(list(chunks))
+        if self.cache is not None:
+            self.cache.put(request, df)
+        return df
+    
+    def iter_report_rows(self, request: RunReportRequest,
+                         page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[Dict[str, str]]:
+        """
+        Itera le righe di un report una alla volta, scaricando una pagina per volta.
+        
+        Args:
+            request: Richiesta del report
+            page_size: Righe richieste per ogni pagina
+            
+        Yields:
+            Dizionario nome colonna -> valore per ogni riga
+        """
+        for page in self._iter_pages(request, page_size):
+            names = [h.name for h in page.dimension_headers] + [h.name for h in page.metric_headers]
+            for row in page.rows:
+                values = [v.value for v in row.dimension_values] + [v.value for v in row.metric_values]
+                yield dict(zip(names, values))
+    
+    def run_reports_batch(self, requests: Dict[str, RunReportRequest],
+                          page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, pd.DataFrame]:
+        """
+        Esegue più report con il minor numero di chiamate batchRunReports.
+        
+        I report vengono raggruppati a blocchi di MAX_BATCH_SIZE: fino a
+        cinque report costano un solo round-trip verso l'API. I report già
+        presenti in cache non vengono richiesti. Se un batch fallisce anche
+        dopo i retry, i suoi report vengono ritentati singolarmente.
+        
+        Args:
+            requests: Dizionario nome report -> RunReportRequest
+            page_size: Righe per pagina; i report troncati proseguono con runReport
+            
+        Returns:
+            Dizionario nome report -> DataFrame, nello stesso ordine
+            
+        Raises:
+            ReportFetchError: Se almeno un report fallisce; contiene i report riusciti
+        """
+        results = {}
+        names = []
+        for name, request in requests.items():
+            cached = self.cache.get(request) if self.cache is not None else None
+            if cached is not None:
+                results[name] = cached
+            else:
+                names.append(name)
+        
+        errors = {}
+        for start in range(0, len(names), MAX_BATCH_SIZE):
+            chunk = names[start:start + MAX_BATCH_SIZE]
+            batch_request = BatchRunReportsRequest(
+                property=f"properties/{self.property_id}",
+                requests=[
+                    self._page_request(requests[name], self._page_limit(requests[name], page_size, 0), 0)
+                    for name in chunk
+                ],
+            )
+            try:
+                response = self._call_api(self.client.batch_run_reports, batch_request)
+            except Exception:
+                # Il batch è atomico: si ripiega su un report alla volta,
+                # così un solo report in errore non fa perdere gli altri
+                for name in chunk:
+                    try:
+                        results[name] = self.fetch_report(requests[name], page_size=page_size)
+                    except Exception as e:
+                        errors[name] = e
+                continue
+            
+            for name, report in zip(chunk, response.reports):
+                # La prima pagina arriva dal batch, le successive con runReport
+                pages = [self._convert_to_dataframe(report)]
+                if report.row_count > len(report.rows):
+                    pages.extend(
+                        self._convert_to_dataframe(page)
+                        for page in self._iter_pages(requests[name], page_size, len(report.rows))
+                    )
+                results[name] = self._concat_chunks(pages)
+                if self.cache is not None:
+                    self.cache.put(requests[name], results[name])
+        
+        if errors:
+            raise ReportFetchError(errors, results)
+        return {name: results[name] for name in requests}
+    
+    def _call_api(self, method, request):
+        """
+        Esegue una chiamata API con rate limiting e retry con backoff.
+        """
+        def attempt():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            return method(request)
+        
+        response = self.retry_policy.call(attempt)
+        self._record_quota(response)
+        return response
+    
+    def _record_quota(self, response):
+        """
+        Passa al rate limiter la quota residua riportata dalla risposta.
+        """
+        if self.rate_limiter is None:
+            return
+        for report in getattr(response, "reports", None) or [response]:
+            if "property_quota" in report:
+                self.rate_limiter.update_from_quota(report.property_quota)
+    
+    def _iter_pages(self, request: RunReportRequest, page_size: int, offset: int = 0):
+        """
+        Scarica le pagine del report con limit/offset fino a esaurire row_count.
+        
+        Un eventuale limit già presente nella richiesta è trattato come tetto
+        massimo di righe complessive.
+        """
+        while True:
+            limit = self._page_limit(request, page_size, offset)
+            if limit <= 0:
+                return
+            
+            response = self._call_api(self.client.run_report, self._page_request(request, limit, offset))
+            yield response
+            
+            offset += len(response.rows)
+            if not self._has_more_pages(request, response, offset):
+                return
+    
+    def _page_limit(self, request: RunReportRequest, page_size: int, offset: int) -> int:
+        """
+        Righe da chiedere nella prossima pagina, rispettando l'eventuale limit della richiesta.
+        """
+        if not request.limit:
+            return page_size
+        return min(page_size, request.limit - offset)
+    
+    def _has_more_pages(self, request: RunReportRequest, response, offset: int) -> bool:
+        total = response.row_count if not request.limit else min(response.row_count, request.limit)
+        return bool(response.rows) and offset < total
+    
+    def _page_request(self, request: RunReportRequest, limit: int, offset: int) -> RunReportRequest:
+        """
+        Copia la richiesta impostando la finestra limit/offset.
+        """
+        page_request = RunReportRequest(request)
+        page_request.limit = limit
+        page_request.offset = offset
+        page_request.return_property_quota = self.rate_limiter is not None
+        return page_request
+    
+    def _concat_chunks(self, chunks) -> pd.DataFrame:
+        """
+        Unisce i DataFrame delle singole pagine.
+        """
+        chunks = [c for c in chunks if not c.empty] or chunks[:1]
+        if not chunks:
+            return pd.DataFrame()
+        if len(chunks) == 1:
+            return chunks[0]
+        
+        # Allinea le categorie delle pagine, altrimenti concat ricade su object
+        for name in CATEGORICAL_DIMENSIONS.intersection(chunks[0].columns):
+            categories = union_categoricals([c[name] for c in chunks]).categories
+            chunks = [c.assign(**{name: c[name].cat.set_categories(categories)}) for c in chunks]
+        
+        return pd.concat(chunks, ignore_index=True)
+    
+    def build_report_request(self, report_name: str, days_back: int = 7) -> RunReportRequest:
+        """
+        Costruisce la richiesta di uno dei report standard per nome.
+        
+        Args:
+            report_name: Uno tra REPORT_NAMES
+            days_back: Numero di giorni nel passato
+        """
+        if report_name == "conversions":
+            return self.build_conversion_request(days_back)
+        if report_name == "traffic":
+            return self.build_traffic_request(days_back)
+        if report_name == "segments":
+            return self.build_segment_request("all", days_back)
+        raise ValueError(f"Report sconosciuto: {report_name}")
+    
+    def build_daily_request(self, report_name: str, start_date: date, end_date: date) -> RunReportRequest:
+        """
+        Versione giornaliera di un report standard: aggiunge la dimensione
+        "date" e usa il periodo esplicito [start_date, end_date].
+        """
+        request = self.build_report_request(report_name)
+        request.date_ranges = [
+            DateRange(start_date=start_date.isoformat(), end_date=end_date.isoformat())
+        ]
+        request.dimensions = [Dimension(name="date")] + list(request.dimensions)
+        return request
+    
+    def build_conversion_request(self, days_back: int = 7) -> RunReportRequest:
+        """
+        Costruisce la richiesta del report conversioni.
+        """
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days_back)
         
-        request = RunReportRequest(
+        return RunReportRequest(
             property=f"properties/{self.property_id}",
             date_ranges=[
                 DateRange(
@@ -62,18 +376,15 @@ class GA4Client:
                 )
             ),
         )
-        
-        response = self.client.run_report(request)
-        return self._convert_to_dataframe(response)
     
-    def get_traffic_by_source(self, days_back: int = 7) -> pd.DataFrame:
+    def build_traffic_request(self, days_back: int = 7) -> RunReportRequest:
         """
-        Recupera traffico raggruppato per fonte.
+        Costruisce la richiesta del traffico per fonte.
         """
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days_back)
         
-        request = RunReportRequest(
+        return RunReportRequest(
             property=f"properties/{self.property_id}",
             date_ranges=[
                 DateRange(
@@ -85,79 +396,319 @@ class GA4Client:
             metrics=[Metric(name="sessions"), Metric(name="users")],
             order_bys=[OrderBy(metric={"metric_name": "sessions"})],
         )
-        
-        response = self.client.run_report(request)
-        return self._convert_to_dataframe(response)
     
-    def get_user_segments_data(self, segment_name: str, days_back: int = 7) -> pd.DataFrame:
+    def build_segment_request(self, segment_name: str, days_back: int = 7) -> RunReportRequest:
         """
-        Recupera dati per un segmento utente specifico.
+        Costruisce la richiesta per un segmento utente specifico.
+        
+        Args:
+            segment_name: Chiave del segmento in config/utm_and_segments.json
+                          (o storica); "all" per nessun filtro
         """
         end_date = datetime.now().date()
         start_date = end_date - timedelta(days=days_back)
         
-        # Mapping segment conditions (semplificato)
-        filters = self._get_segment_filter(segment_name)
+        segment = self.segments.get(segment_name)
+        metrics = ["users", "sessions"]
+        if segment is not None:
+            metrics += [m for m in segment.metrics if m not in metrics]
         
-        request = RunReportRequest(
+        return RunReportRequest(
             property=f"properties/{self.property_id}",
             date_ranges=[DateRange(start_date=start_date.isoformat(), end_date=end_date.isoformat())],
-            dimensions=[Dimension(name="country"), Dimension(name="city")],
-            metrics=[Metric(name="users"), Metric(name="sessions")],
-            dimension_filter=filters,
+            dimensions=[Dimension(name=name) for name in SEGMENT_DIMENSIONS],
+            metrics=[Metric(name=name) for name in metrics],
+            dimension_filter=segment.dimension_filter if segment is not None else None,
+            metric_filter=segment.metric_filter if segment is not None else None,
         )
-        
-        response = self.client.run_report(request)
-        return self._convert_to_dataframe(response)
     
-    def _get_segment_filter(self, segment_name: str) -> FilterExpression:
+    def build_segment_requests(self, segment_names: List[str],
+                               days_back: int = 7) -> List[Tuple[RunReportRequest, List[Segment]]]:
         """
-        Costruisce il filtro per il segmento.
+        Richieste per più segmenti, con le stesse righe dei report per segmento.
+        
+        Un segmento condivide la richiesta comune solo se filtra su dimensioni
+        di sessione (SESSION_SCOPED_DIMENSIONS) e le metriche del report si
+        possono sommare sulle dimensioni aggiunte (summable): le righe vengono
+        etichettate localmente e riaggregate sulle dimensioni del report
+        (label_reports). Gli altri segmenti (condizioni su metriche o su
+        dimensioni di evento, metriche non additive come users) hanno una
+        richiesta propria con i filtri applicati dall'API.
+        
+        Returns:
+            Lista di (richiesta, segmenti che ne ricavano le righe)
+            
+        Raises:
+            ValueError: Se la richiesta condivisa supera MAX_DIMENSIONS dimensioni
         """
-        filters_map = {
-            "high_value_leads": self._high_value_leads_filter(),
-            "mobile_users": self._mobile_users_filter(),
-            "local_traffic": self._local_traffic_filter(),
-        }
-        return filters_map.get(segment_name, None)
+        # Import locale: ga4_query_planner importa da questo modulo
+        from ga4_query_planner import SESSION_SCOPED_DIMENSIONS, summable
+        
+        segments = self.segments.resolve(segment_names)
+        request = self.build_segment_request("all", days_back)
+        base = [d.name for d in request.dimensions]
+        metrics = [m.name for m in request.metrics]
+        
+        dimensions = list(base)
+        shared = []
+        own = []
+        for segment in segments:
+            merged = dimensions + [d for d in segment.dimensions if d not in dimensions]
+            if (not segment.metrics and set(segment.dimensions) <= SESSION_SCOPED_DIMENSIONS
+                    and summable(metrics, set(merged) - set(base))):
+                dimensions = merged
+                shared.append(segment)
+            else:
+                own.append(segment)
+        
+        requests = []
+        if shared:
+            if len(dimensions) > MAX_DIMENSIONS:
+                raise ValueError(
+                    f"Segmenti {', '.join(s.key for s in shared)}: {len(dimensions)} dimensioni, "
+                    f"l'API ne accetta al massimo {MAX_DIMENSIONS}"
+                )
+            request.dimensions = [Dimension(name=name) for name in dimensions]
+            request.dimension_filter = combined_filter(shared)
+            requests.append((request, shared))
+        
+        for segment in own:
+            requests.append((self.build_segment_request(segment.key, days_back), [segment]))
+        return requests
     
-    def _high_value_leads_filter(self) -> FilterExpression:
-        return FilterExpression(
-            filter=Filter(
-                field_name="eventName",
-                string_filter={"match_type": 1, "value": "form_contact_submitted"},
+    def _convert_to_dataframe(self, response) -> pd.DataFrame:
+        """
+        Converte risposta API in DataFrame, colonna per colonna.
+        
+        Le metriche vengono convertite nel dtype numerico indicato da
+        metric_headers[].type (int64 per TYPE_INTEGER, float64 altrimenti),
+        le dimensioni in CATEGORICAL_DIMENSIONS in dtype category.
+        """
+        # Lavora sul messaggio protobuf grezzo: evita i wrapper proto-plus per cella
+        pb = type(response).pb(response)
+        rows = pb.rows
+        columns = {}
+        
+        for i, header in enumerate(pb.dimension_headers):
+            values = [row.dimension_values[i].value for row in rows]
+            if header.name in CATEGORICAL_DIMENSIONS:
+                columns[header.name] = pd.Categorical(values)
+            else:
+                columns[header.name] = np.array(values, dtype=object)
+        
+        for i, header in enumerate(pb.metric_headers):
+            dtype = np.int64 if header.type_ == MetricType.TYPE_INTEGER else np.float64
+            columns[header.name] = np.array(
+                [row.metric_values[i].value for row in rows], dtype=dtype
             )
+        
+        return pd.DataFrame(columns)
+
+class AsyncGA4Client(GA4Client):
+    """
+    Variante asincrona di GA4Client basata su BetaAnalyticsDataAsyncClient.
+    
+    Costruzione delle richieste e conversione delle risposte sono ereditate;
+    i metodi che parlano con l'API sono coroutine. Ogni round-trip passa da
+    un semaforo, condivisibile tra più client per limitare la concorrenza
+    complessiva quando si interrogano molte property.
+    """
+    
+    def __init__(self, property_id: str, credentials_path: str = None, client=None,
+                 cache=None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 semaphore: asyncio.Semaphore = None, retry_policy: RetryPolicy = None,
+                 rate_limiter=None, segments: SegmentCatalog = None):
+        """
+        Inizializza il client asincrono.
+        
+        Args:
+            property_id: ID della property GA4
+            credentials_path: Path al file JSON di credenziali Google
+            client: Data client asincrono alternativo (es. AsyncFakeDataClient)
+            cache: Cache dei report con metodi get(request)/put(request, df)
+            max_concurrency: Richieste contemporanee massime (se semaphore è None)
+            semaphore: Semaforo condiviso tra più client
+            retry_policy: Politica di retry per chiamata (default: RetryPolicy())
+            rate_limiter: TokenBucketRateLimiter della property
+            segments: Segmenti compilati (default: config/utm_and_segments.json)
+        """
+        super().__init__(
+            property_id, credentials_path,
+            client=client if client is not None else BetaAnalyticsDataAsyncClient(),
+            cache=cache, retry_policy=retry_policy, rate_limiter=rate_limiter, segments=segments,
         )
+        self.semaphore = semaphore or asyncio.Semaphore(max_concurrency)
     
-    def _mobile_users_filter(self) -> FilterExpression:
-        return FilterExpression(
-            filter=Filter(
-                field_name="deviceCategory",
-                string_filter={"match_type": 1, "value": "mobile"},
-            )
+    async def get_conversion_report(self, days_back: int = 7) -> pd.DataFrame:
+        return await self.fetch_report(self.build_conversion_request(days_back))
+    
+    async def get_traffic_by_source(self, days_back: int = 7) -> pd.DataFrame:
+        return await self.fetch_report(self.build_traffic_request(days_back))
+    
+    async def get_user_segments_data(self, segment_name: str, days_back: int = 7) -> pd.DataFrame:
+        return await self.fetch_report(self.build_segment_request(segment_name, days_back))
+    
+    async def get_segments_data(self, segment_names: List[str], days_back: int = 7) -> pd.DataFrame:
+        segments = self.segments.resolve(segment_names)
+        requests = self.build_segment_requests(segment_names, days_back)
+        frames = await asyncio.gather(*(self.fetch_report(request) for request, _ in requests))
+        return label_reports(list(zip(frames, (group for _, group in requests))),
+                             segments, SEGMENT_DIMENSIONS)
+    
+    async def fetch_report(self, request: RunReportRequest,
+                           page_size: int = DEFAULT_PAGE_SIZE) -> pd.DataFrame:
+        """
+        Esegue un report completo, pagina per pagina.
+        """
+        cached = await self._cache_get_async(request)
+        if cached is not None:
+            return cached
+        
+        chunks = [
+            self._convert_to_dataframe(page)
+            async for page in self._iter_pages_async(request, page_size)
+        ]
+        df = self._concat_chunks(chunks)
+        await self._cache_put_async(request, df)
+        return df
+    
+    async def iter_report_rows(self, request: RunReportRequest,
+                               page_size: int = DEFAULT_PAGE_SIZE):
+        """
+        Itera in modo asincrono le righe di un report, una pagina per volta.
+        """
+        async for page in self._iter_pages_async(request, page_size):
+            names = [h.name for h in page.dimension_headers] + [h.name for h in page.metric_headers]
+            for row in page.rows:
+                values = [v.value for v in row.dimension_values] + [v.value for v in row.metric_values]
+                yield dict(zip(names, values))
+    
+    async def gather_reports(self, requests: Dict[str, RunReportRequest],
+                             page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, pd.DataFrame]:
+        """
+        Esegue tutti i report in parallelo, un runReport per report.
+        
+        La concorrenza effettiva è limitata dal semaforo.
+        
+        Returns:
+            Dizionario nome report -> DataFrame
+        """
+        frames = await asyncio.gather(
+            *(self.fetch_report(request, page_size) for request in requests.values())
         )
+        return dict(zip(requests, frames))
     
-    def _local_traffic_filter(self) -> FilterExpression:
-        return FilterExpression(
-            filter=Filter(
-                field_name="country",
-                string_filter={"match_type": 1, "value": "Italy"},
-            )
+    async def run_reports_batch(self, requests: Dict[str, RunReportRequest],
+                                page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, pd.DataFrame]:
+        """
+        Versione asincrona di GA4Client.run_reports_batch: i blocchi da
+        MAX_BATCH_SIZE report vengono inviati in parallelo.
+        
+        Raises:
+            ReportFetchError: Se almeno un report fallisce; contiene i report riusciti
+        """
+        results = {}
+        names = []
+        for name, request in requests.items():
+            cached = await self._cache_get_async(request)
+            if cached is not None:
+                results[name] = cached
+            else:
+                names.append(name)
+        
+        chunks = [names[i:i + MAX_BATCH_SIZE] for i in range(0, len(names), MAX_BATCH_SIZE)]
+        batches = await asyncio.gather(
+            *(self._run_batch_chunk(requests, chunk, page_size) for chunk in chunks)
         )
+        errors = {}
+        for batch_results, batch_errors in batches:
+            results.update(batch_results)
+            errors.update(batch_errors)
+        
+        if errors:
+            raise ReportFetchError(errors, results)
+        return {name: results[name] for name in requests}
     
-    def _convert_to_dataframe(self, response) -> pd.DataFrame:
+    async def _run_batch_chunk(self, requests: Dict[str, RunReportRequest], chunk,
+                               page_size: int) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Exception]]:
+        batch_request = BatchRunReportsRequest(
+            property=f"properties/{self.property_id}",
+            requests=[
+                self._page_request(requests[name], self._page_limit(requests[name], page_size, 0), 0)
+                for name in chunk
+            ],
+        )
+        results = {}
+        errors = {}
+        try:
+            response = await self._call_api_async(self.client.batch_run_reports, batch_request)
+        except Exception:
+            # Come nella versione sincrona: un report alla volta
+            frames = await asyncio.gather(
+                *(self.fetch_report(requests[name], page_size) for name in chunk),
+                return_exceptions=True,
+            )
+            for name, frame in zip(chunk, frames):
+                if isinstance(frame, Exception):
+                    errors[name] = frame
+                else:
+                    results[name] = frame
+            return results, errors
+        
+        for name, report in zip(chunk, response.reports):
+            pages = [self._convert_to_dataframe(report)]
+            if report.row_count > len(report.rows):
+                pages.extend([
+                    self._convert_to_dataframe(page)
+                    async for page in self._iter_pages_async(requests[name], page_size, len(report.rows))
+                ])
+            results[name] = self._concat_chunks(pages)
+            await self._cache_put_async(requests[name], results[name])
+        return results, errors
+    
+    async def _cache_get_async(self, request: RunReportRequest) -> Optional[pd.DataFrame]:
         """
-        Converte risposta API in DataFrame.
-        """
-        data = []
-        for row in response.rows:
-            row_data = {}
-            for i, header in enumerate(response.dimension_headers):
-                row_data[header.name] = row.dimension_values[i].value
-            for i, header in enumerate(response.metric_headers):
-                row_data[header.name] = row.metric_values[i].value
-            data.append(row_data)
-        return pd.DataFrame(data)
+        Lettura dalla cache in un thread: il Parquet non blocca l'event loop.
+        """
+        if self.cache is None:
+            return None
+        return await asyncio.to_thread(self.cache.get, request)
+    
+    async def _cache_put_async(self, request: RunReportRequest, df: pd.DataFrame):
+        """
+        Scrittura in cache in un thread, come _cache_get_async.
+        """
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, request, df)
+    
+    async def _call_api_async(self, method, request):
+        """
+        Chiamata API asincrona con semaforo, rate limiting e retry con backoff.
+        """
+        async def attempt():
+            async with self.semaphore:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire_async()
+                return await method(request)
+        
+        response = await self.retry_policy.call_async(attempt)
+        self._record_quota(response)
+        return response
+    
+    async def _iter_pages_async(self, request: RunReportRequest, page_size: int, offset: int = 0):
+        while True:
+            limit = self._page_limit(request, page_size, offset)
+            if limit <= 0:
+                return
+            
+            response = await self._call_api_async(
+                self.client.run_report, self._page_request(request, limit, offset)
+            )
+            yield response
+            
+            offset += len(response.rows)
+            if not self._has_more_pages(request, response, offset):
+                return
 
 if __name__ == "__main__":
     # Esempio di utilizzo
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# GA4 Client Benchmark
+# Misura offline le prestazioni di GA4Client usando FakeDataClient
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+import pandas as pd
+from google.analytics.data_v1beta.types import Dimension, Metric, MetricType, RunReportResponse
+
+from ga4_api_client import AsyncGA4Client, GA4Client
+from ga4_fake_client import AsyncFakeDataClient, FakeDataClient
+from ga4_query_planner import run_planned
+
+# Colonne del report sintetico usato dal benchmark di conversione
+SYNTHETIC_DIMENSIONS = ["source", "medium", "country", "deviceCategory", "city"]
+SYNTHETIC_METRICS = [
+    ("sessions", MetricType.TYPE_INTEGER),
+    ("totalUsers", MetricType.TYPE_INTEGER),
+    ("bounceRate", MetricType.TYPE_FLOAT),
+]
+
+def bench_batch(latency_seconds: float = 0.2, rows: int = 100) -> dict:
+    """
+    Confronta il fetch seriale (3 x runReport) con run_reports_batch.
+
+    Args:
+        latency_seconds: Latenza simulata per round-trip
+        rows: Righe per report
+
+    Returns:
+        Dizionario con tempi e numero di round-trip per modalità
+    """
+    serial_fake = FakeDataClient(rows_per_report=rows, latency_seconds=latency_seconds)
+    client = GA4Client("bench", client=serial_fake)
+
+    start = time.perf_counter()
+    client.get_conversion_report(days_back=7)
+    client.get_traffic_by_source(days_back=7)
+    client.get_user_segments_data("all", days_back=7)
+    serial_time = time.perf_counter() - start
+
+    batch_fake = FakeDataClient(rows_per_report=rows, latency_seconds=latency_seconds)
+    client = GA4Client("bench", client=batch_fake)
+
+    start = time.perf_counter()
+    client.run_reports_batch({
+        "conversions": client.build_conversion_request(days_back=7),
+        "traffic": client.build_traffic_request(days_back=7),
+        "segments": client.build_segment_request("all", days_back=7),
+    })
+    batch_time = time.perf_counter() - start
+
+    return {
+        "serial": {"seconds": serial_time, "round_trips": serial_fake.round_trips},
+        "batch": {"seconds": batch_time, "round_trips": batch_fake.round_trips},
+    }
+
+def legacy_convert_to_dataframe(response) -> pd.DataFrame:
+    """
+    Convertitore riga per riga originale, usato come riferimento.
+    """
+    data = []
+    for row in response.rows:
+        row_data = {}
+        for i, header in enumerate(response.dimension_headers):
+            row_data[header.name] = row.dimension_values[i].value
+        for i, header in enumerate(response.metric_headers):
+            row_data[header.name] = row.metric_values[i].value
+        data.append(row_data)
+    return pd.DataFrame(data)
+
+def build_synthetic_response(n_rows: int) -> RunReportResponse:
+    """
+    Costruisce una risposta runReport sintetica con n_rows righe.
+    """
+    pb = RunReportResponse.pb(RunReportResponse())
+    for name in SYNTHETIC_DIMENSIONS:
+        pb.dimension_headers.add(name=name)
+    for name, metric_type in SYNTHETIC_METRICS:
+        pb.metric_headers.add(name=name, type_=metric_type)
+
+    for i in range(n_rows):
+        row = pb.rows.add()
+        row.dimension_values.add(value=f"source_{i % 12}")
+        row.dimension_values.add(value=f"medium_{i % 5}")
+        row.dimension_values.add(value=f"country_{i % 40}")
+        row.dimension_values.add(value=("mobile", "desktop", "tablet")[i % 3])
+        row.dimension_values.add(value=f"city_{i}")
+        row.metric_values.add(value=str(i % 1000))
+        row.metric_values.add(value=str(i % 700))
+        row.metric_values.add(value=str((i % 100) / 100))
+
+    return RunReportResponse.wrap(pb)
+
+def _measure(convert, response) -> dict:
+    """
+    Misura tempo (senza tracemalloc) e picco di memoria (con tracemalloc).
+    """
+    start = time.perf_counter()
+    convert(response)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    convert(response)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"seconds": round(seconds, 4), "peak_mb": round(peak / 1024 ** 2, 2)}
+
+def bench_convert(sizes=(10_000, 100_000, 1_000_000)) -> dict:
+    """
+    Confronta il convertitore colonnare con quello riga per riga.
+
+    Args:
+        sizes: Numero di righe sintetiche per ogni misura
+
+    Returns:
+        Dizionario "<righe>" -> tempi e picco di memoria per convertitore
+    """
+    client = GA4Client("bench", client=FakeDataClient())
+    results = {}
+
+    for n_rows in sizes:
+        response = build_synthetic_response(n_rows)
+        results[str(n_rows)] = {
+            "legacy": _measure(legacy_convert_to_dataframe, response),
+            "columnar": _measure(client._convert_to_dataframe, response),
+        }
+
+    return results
+
+def bench_async(n_properties: int = 24, latency_seconds: float = 0.2,
+                max_concurrency: int = 8) -> dict:
+    """
+    Confronta il fetch seriale di molte property con il fan-out di AsyncGA4Client.
+
+    Ogni property scarica i tre report standard con una chiamata batch.
+
+    Returns:
+        Dizionario con tempi e concorrenza massima osservata per modalità
+    """
+    serial_fake = FakeDataClient(latency_seconds=latency_seconds)
+    start = time.perf_counter()
+    for i in range(n_properties):
+        client = GA4Client(f"prop_{i}", client=serial_fake)
+        client.run_reports_batch({
+            name: client.build_report_request(name) for name in ("conversions", "traffic", "segments")
+        })
+    serial_time = time.perf_counter() - start
+
+    async_fake = AsyncFakeDataClient(latency_seconds=latency_seconds)
+
+    async def fan_out():
+        semaphore = asyncio.Semaphore(max_concurrency)
+        clients = [
+            AsyncGA4Client(f"prop_{i}", client=async_fake, semaphore=semaphore)
+            for i in range(n_properties)
+        ]
+        await asyncio.gather(*(
+            client.run_reports_batch({
+                name: client.build_report_request(name) for name in ("conversions", "traffic", "segments")
+            })
+            for client in clients
+        ))
+
+    start = time.perf_counter()
+    asyncio.run(fan_out())
+    async_time = time.perf_counter() - start
+
+    return {
+        "serial": {"seconds": serial_time, "round_trips": serial_fake.round_trips},
+        "async": {"seconds": async_time, "round_trips": async_fake.round_trips,
+                  "max_in_flight": async_fake.max_in_flight},
+    }
+
+def planner_requests(client: GA4Client) -> dict:
+    """
+    Report logici sovrapposti sullo stesso periodo usati dal benchmark plan.
+    """
+    def request(dimensions, metrics):
+        req = client.build_traffic_request(days_back=7)
+        req.dimensions = [Dimension(name=name) for name in dimensions]
+        req.metrics = [Metric(name=name) for name in metrics]
+        del req.order_bys[:]
+        return req
+
+    return {
+        "conversions": client.build_conversion_request(days_back=7),
+        "events": request(["eventName"], ["eventCount"]),
+        "sessions_by_source": request(["source", "medium"], ["sessions"]),
+        "sessions_by_city": request(["country", "city"], ["sessions"]),
+        "sessions_by_device": request(["deviceCategory"], ["sessions", "screenPageViews"]),
+        "users_by_device": request(["deviceCategory"], ["totalUsers"]),
+        "bounce_by_device": request(["deviceCategory"], ["bounceRate"]),
+    }
+
+def bench_plan(latency_seconds: float = 0.2, rows: int = 100) -> dict:
+    """
+    Confronta un batch dei report logici con le richieste unite dal planner.
+    """
+    batch_fake = FakeDataClient(rows_per_report=rows, latency_seconds=latency_seconds)
+    client = GA4Client("bench", client=batch_fake)
+    requests = planner_requests(client)
+
+    start = time.perf_counter()
+    client.run_reports_batch(requests)
+    batch_time = time.perf_counter() - start
+
+    planned_fake = FakeDataClient(rows_per_report=rows, latency_seconds=latency_seconds)
+    client = GA4Client("bench", client=planned_fake)
+
+    start = time.perf_counter()
+    _, plan = run_planned(client, planner_requests(client))
+    planned_time = time.perf_counter() - start
+
+    return {
+        "batch": {"seconds": batch_time, "round_trips": batch_fake.round_trips,
+                  "reports": batch_fake.reports_served},
+        "planned": {"seconds": planned_time, "round_trips": planned_fake.round_trips,
+                    "reports": planned_fake.reports_served, **plan.summary()},
+    }
+
+BENCHMARKS = {
+    "async": bench_async,
+    "batch": bench_batch,
+    "convert": bench_convert,
+    "plan": bench_plan,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline di GA4Client")
+    parser.add_argument("benchmark", nargs="?", choices=sorted(BENCHMARKS), default="batch")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        help="Numero di righe per il benchmark convert")
+    args = parser.parse_args()
+
+    kwargs = {"sizes": args.sizes} if args.benchmark == "convert" and args.sizes else {}
+    results = BENCHMARKS[args.benchmark](**kwargs)
+    print(f"\nBenchmark: {args.benchmark}")
+    for mode, values in results.items():
+        print(f"  {mode}: {values}")
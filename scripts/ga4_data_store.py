@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# GA4 Data Store
+# Archivio locale dei report GA4 partizionato per giorno (un file per giorno per report)
+
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from ga4_api_client import ReportFetchError
+
+class GA4DataStore:
+    def __init__(self, data_dir: str = "data/ga4", retention_days: int = 180,
+                 mutable_days: int = 2):
+        """
+        Inizializza l'archivio partizionato.
+
+        Layout: <data_dir>/<property_id>/<report>/<YYYY-MM-DD>.parquet
+
+        Args:
+            data_dir: Directory radice dell'archivio
+            retention_days: Giorni di storico da mantenere
+            mutable_days: Ultimi giorni completi che GA4 può ancora rielaborare,
+                          riscaricati ad ogni sincronizzazione
+        """
+        self.data_dir = Path(data_dir)
+        self.retention_days = retention_days
+        self.mutable_days = mutable_days
+
+    def partition_path(self, property_id: str, report_name: str, day: date) -> Path:
+        """
+        Path del file di un singolo giorno.
+        """
+        return self.data_dir / str(property_id) / report_name / f"{day.isoformat()}.parquet"
+
+    def stored_days(self, property_id: str, report_name: str) -> set:
+        """
+        Giorni già presenti in archivio per il report.
+        """
+        report_dir = self.data_dir / str(property_id) / report_name
+        if not report_dir.exists():
+            return set()
+        return {date.fromisoformat(p.stem) for p in report_dir.glob("*.parquet")}
+
+    def days_to_fetch(self, property_id: str, report_name: str,
+                      end_date: Optional[date] = None) -> List[date]:
+        """
+        Giorni da scaricare: quelli mancanti nella finestra di retention più
+        gli ultimi mutable_days, che GA4 può ancora modificare.
+        """
+        end_date = end_date or _yesterday()
+        window = [end_date - timedelta(days=i) for i in range(self.retention_days)]
+        stored = self.stored_days(property_id, report_name)
+        mutable = set(window[:self.mutable_days])
+        return sorted(day for day in window if day not in stored or day in mutable)
+
+    def sync(self, client, report_names: Iterable[str],
+             end_date: Optional[date] = None) -> Dict[str, int]:
+        """
+        Allinea l'archivio scaricando solo i giorni mancanti o modificabili.
+
+        Tutti i periodi da scaricare, per tutti i report, vengono richiesti
+        con run_reports_batch; a regime è un'unica chiamata per gli ultimi giorni.
+
+        Args:
+            client: GA4Client della property da sincronizzare
+            report_names: Nomi dei report standard (vedi REPORT_NAMES)
+            end_date: Ultimo giorno da archiviare (default: ieri, l'ultimo giorno completo)
+
+        Returns:
+            Dizionario report -> numero di giorni scritti
+        """
+        end_date = end_date or _yesterday()
+        requests, runs = self._plan_sync(client, report_names, end_date)
+        try:
+            results = client.run_reports_batch(requests) if requests else {}
+        except ReportFetchError as e:
+            # Salva comunque i report riusciti: al prossimo tentativo non verranno riscaricati
+            self._apply_sync(client.property_id, report_names, runs, e.partial_results, end_date)
+            raise
+        return self._apply_sync(client.property_id, report_names, runs, results, end_date)
+
+    async def sync_async(self, client, report_names: Iterable[str],
+                         end_date: Optional[date] = None) -> Dict[str, int]:
+        """
+        Come sync, ma con un AsyncGA4Client: permette di sincronizzare più
+        property contemporaneamente con asyncio.gather.
+        """
+        end_date = end_date or _yesterday()
+        requests, runs = self._plan_sync(client, report_names, end_date)
+        try:
+            results = await client.run_reports_batch(requests) if requests else {}
+        except ReportFetchError as e:
+            self._apply_sync(client.property_id, report_names, runs, e.partial_results, end_date)
+            raise
+        return self._apply_sync(client.property_id, report_names, runs, results, end_date)
+
+    def load(self, property_id: str, report_name: str, days: Optional[int] = None,
+             end_date: Optional[date] = None) -> pd.DataFrame:
+        """
+        Legge lo storico del report dal disco.
+
+        Args:
+            property_id: ID della property GA4
+            report_name: Nome del report
+            days: Giorni di storico da leggere (default: retention_days)
+            end_date: Ultimo giorno incluso (default: ieri)
+
+        Returns:
+            DataFrame con colonna "date" di tipo datetime, ordinato per data
+        """
+        end_date = end_date or _yesterday()
+        first_day = end_date - timedelta(days=(days or self.retention_days) - 1)
+        paths = [
+            self.partition_path(property_id, report_name, day)
+            for day in sorted(self.stored_days(property_id, report_name))
+            if first_day <= day <= end_date
+        ]
+        if not paths:
+            return pd.DataFrame()
+
+        df = pd.concat([pd.read_parquet(p) for p in paths], ignore_index=True)
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"], format="%Y%m%d")
+        return df
+
+    def prune(self, property_id: str, report_name: str, end_date: Optional[date] = None) -> int:
+        """
+        Rimuove i giorni fuori dalla finestra di retention.
+
+        Returns:
+            Numero di file rimossi
+        """
+        end_date = end_date or _yesterday()
+        first_day = end_date - timedelta(days=self.retention_days - 1)
+        removed = 0
+        for day in self.stored_days(property_id, report_name):
+            if day < first_day:
+                self.partition_path(property_id, report_name, day).unlink()
+                removed += 1
+        return removed
+
+    def _plan_sync(self, client, report_names: Iterable[str], end_date: date):
+        """
+        Prepara una richiesta giornaliera per ogni intervallo contiguo da scaricare.
+
+        Returns:
+            (richieste per chiave, intervallo (report, inizio, fine) per chiave)
+        """
+        requests = {}
+        runs = {}
+        for report_name in report_names:
+            days = self.days_to_fetch(client.property_id, report_name, end_date)
+            for start, end in _contiguous_runs(days):
+                key = f"{report_name}|{start.isoformat()}|{end.isoformat()}"
+                requests[key] = client.build_daily_request(report_name, start, end)
+                runs[key] = (report_name, start, end)
+        return requests, runs
+
+    def _apply_sync(self, property_id: str, report_names: Iterable[str], runs: dict,
+                    results: Dict[str, pd.DataFrame], end_date: date) -> Dict[str, int]:
+        """
+        Scrive i risultati scaricati e applica la retention.
+        """
+        written = {report_name: 0 for report_name in report_names}
+        for key, df in results.items():
+            report_name, start, end = runs[key]
+            written[report_name] += self._write_run(property_id, report_name, start, end, df)
+
+        for report_name in report_names:
+            self.prune(property_id, report_name, end_date)
+
+        return written
+
+    def _write_run(self, property_id: str, report_name: str, start: date, end: date,
+                   df: pd.DataFrame) -> int:
+        """
+        Divide il risultato di un periodo per giorno e scrive un file per giorno.
+
+        Anche i giorni senza righe vengono scritti (file vuoto), così non
+        vengono riscaricati alla sincronizzazione successiva.
+        """
+        by_day = dict(tuple(df.groupby("date", observed=True))) if "date" in df.columns else {}
+        empty = df.iloc[0:0]
+        day = start
+        count = 0
+
+        while day <= end:
+            day_df = by_day.get(day.strftime("%Y%m%d"), empty)
+            self._write_day(property_id, report_name, day, day_df)
+            day += timedelta(days=1)
+            count += 1
+
+        return count
+
+    def _write_day(self, property_id: str, report_name: str, day: date, df: pd.DataFrame):
+        path = self.partition_path(property_id, report_name, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+def _yesterday() -> date:
+    return date.today() - timedelta(days=1)
+
+def _contiguous_runs(days: List[date]) -> List[Tuple[date, date]]:
+    """
+    Raggruppa giorni ordinati in intervalli contigui [inizio, fine].
+    """
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+# GA4 Data API Emulator
+# Emula runReport/batchRunReports aggregando in locale un dataset sintetico di eventi
+
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from google.api_core.exceptions import InvalidArgument, ResourceExhausted
+from google.analytics.data_v1beta.types import (
+    Filter,
+    FilterExpression,
+    MetricType,
+    PropertyQuota,
+    QuotaStatus,
+    RunReportRequest,
+    RunReportResponse,
+)
+
+from ga4_fake_client import API_DEFAULT_LIMIT, AsyncFakeDataClient, FakeDataClient
+
+EVENTS_CONFIG_PATH = "config/ga4_events.json"
+
+# Limiti dell'API
+MAX_DIMENSIONS = 9
+MAX_METRICS = 10
+MAX_LIMIT = 250000
+
+NOT_SET = "(not set)"
+
+# Eventi conteggiati come conversioni (key event) in ga4_goals.json
+KEY_EVENTS = ("form_contact_submitted", "phone_call_initiated", "cta_download")
+
+# Probabilità per sessione degli eventi della configurazione (default 0.05)
+EVENT_RATES = {
+    "service_page_view": 0.35,
+    "blog_engagement": 0.20,
+    "cta_download": 0.04,
+    "phone_call_initiated": 0.015,
+    "form_contact_submitted": 0.02,
+}
+
+SOURCE_MEDIUM = [
+    (("google", "organic"), 0.45),
+    (("(direct)", "(none)"), 0.20),
+    (("google", "cpc"), 0.08),
+    (("linkedin", "social"), 0.08),
+    (("newsletter", "email"), 0.05),
+    (("partner_site", "referral"), 0.05),
+    (("legal_directory", "directory"), 0.05),
+    (("bing", "organic"), 0.04),
+]
+
+GEO = [
+    (("Italy", "Torino"), 0.30),
+    (("Italy", "Milano"), 0.20),
+    (("Italy", "Roma"), 0.10),
+    (("Italy", "Bologna"), 0.07),
+    (("Italy", "Genova"), 0.05),
+    (("Italy", "Alessandria"), 0.03),
+    (("Italy", "Novara"), 0.03),
+    (("Italy", "Asti"), 0.02),
+    (("Switzerland", "Lugano"), 0.06),
+    (("France", "Paris"), 0.04),
+    (("Germany", "Berlin"), 0.03),
+    ((NOT_SET, NOT_SET), 0.07),
+]
+
+DEVICES = [("desktop", 0.45), ("mobile", 0.50), ("tablet", 0.05)]
+
+PAGE_PATHS = [
+    ("/", 0.35), ("/servizi", 0.20), ("/blog", 0.15), ("/contatti", 0.10),
+    ("/chi-siamo", 0.08), ("/blog/articolo", 0.12),
+]
+
+# Parametri degli eventi automatici (misurazione avanzata)
+BUILTIN_PARAMETERS = {"scroll": {"percent_scrolled": {"enum": ["90"]}}}
+
+# Volume relativo per giorno della settimana (lunedì = 0)
+WEEKDAY_FACTORS = np.array([1.10, 1.15, 1.10, 1.05, 0.95, 0.60, 0.55])
+
+# Nomi alternativi accettati nelle richieste
+DIMENSION_ALIASES = {"sessionSource": "source", "sessionMedium": "medium"}
+METRIC_ALIASES = {"users": "totalUsers", "userCount": "totalUsers", "activeUsers": "totalUsers",
+                  "keyEvents": "conversions"}
+
+INTEGER_METRICS = {"eventCount", "conversions", "screenPageViews", "sessions", "engagedSessions",
+                   "totalUsers", "newUsers"}
+METRIC_TYPES = {
+    "bounceRate": MetricType.TYPE_FLOAT,
+    "engagementRate": MetricType.TYPE_FLOAT,
+    "averageSessionDuration": MetricType.TYPE_SECONDS,
+    "screenPageViewsPerSession": MetricType.TYPE_FLOAT,
+    "sessionsPerUser": MetricType.TYPE_FLOAT,
+}
+SUPPORTED_METRICS = INTEGER_METRICS | set(METRIC_TYPES)
+
+# Token di quota: costo base più uno ogni TOKEN_EVENTS eventi letti
+TOKEN_EVENTS = 100000
+
+@dataclass
+class EventDataset:
+    """
+    Eventi in forma colonnare, ordinati per giorno.
+
+    Ogni dimensione è un array di codici per evento con le relative
+    categorie; gli attributi di sessione sono indicizzati per sessione.
+    """
+    day: np.ndarray            # Giorno dell'evento (0 = start_date)
+    session: np.ndarray        # Sessione dell'evento
+    codes: Dict[str, np.ndarray]
+    categories: Dict[str, np.ndarray]
+    session_user: np.ndarray
+    session_engaged: np.ndarray
+    session_duration: np.ndarray
+    session_new: np.ndarray
+    start_date: date
+    day_offsets: np.ndarray    # Primo evento di ogni giorno (lunghezza days + 1)
+
+    @property
+    def n_events(self) -> int:
+        return len(self.day)
+
+    @property
+    def n_sessions(self) -> int:
+        return len(self.session_user)
+
+def _choice(rng, table, n):
+    values, weights = zip(*table)
+    p = np.asarray(weights, dtype=np.float64)
+    return rng.choice(len(values), size=n, p=p / p.sum()), values
+
+def _encode(values) -> np.ndarray:
+    return np.asarray(values, dtype=object)
+
+def _component(pairs, index: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Codice di ogni coppia per l'elemento index e categorie senza duplicati.
+    """
+    categories, remap = np.unique([pair[index] for pair in pairs], return_inverse=True)
+    return remap.ravel().astype(np.int16), _encode(categories)
+
+def load_events_config(path: str = EVENTS_CONFIG_PATH) -> Dict:
+    """
+    Eventi personalizzati di ga4_events.json (vuoto se il file non esiste).
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("events", {})
+    except FileNotFoundError:
+        return {}
+
+def generate_events(events_config: Dict, n_events: int = 1_000_000, days: int = 400,
+                    end_date: Optional[date] = None, seed: int = 0) -> EventDataset:
+    """
+    Genera un dataset sintetico con stagionalità settimanale e trend.
+
+    Ogni sessione ha session_start, una o più page_view, user_engagement
+    (se ingaggiata), scroll e gli eventi della configurazione con le
+    probabilità di EVENT_RATES; i parametri enum/number diventano
+    dimensioni customEvent:<parametro>.
+    """
+    rng = np.random.default_rng(seed)
+    end_date = end_date or datetime.now().date()
+    start_date = end_date - timedelta(days=days - 1)
+
+    custom = list(events_config)
+    rates = np.array([EVENT_RATES.get(name, 0.05) for name in custom])
+    events_per_session = 1 + 2.0 + 0.5 + 0.5 + rates.sum()
+    n_sessions = max(int(n_events / events_per_session), 1)
+
+    # Sessioni: giorno con trend e stagionalità settimanale, utenti con distribuzione asimmetrica
+    day_index = np.arange(days)
+    weekday = np.array([(start_date + timedelta(days=int(d))).weekday() for d in range(min(days, 7))])
+    weights = (1 + 0.5 * day_index / days) * WEEKDAY_FACTORS[weekday[day_index % len(weekday)]]
+    session_day = np.sort(rng.choice(days, size=n_sessions, p=weights / weights.sum()))
+    n_users = max(int(n_sessions * 0.6), 1)
+    session_user = (n_users * rng.random(n_sessions) ** 2).astype(np.int64)
+
+    source_medium, sm_values = _choice(rng, SOURCE_MEDIUM, n_sessions)
+    geo, geo_values = _choice(rng, GEO, n_sessions)
+    device, device_values = _choice(rng, DEVICES, n_sessions)
+
+    page_views = 1 + rng.poisson(1.0, n_sessions)
+    duration = rng.exponential(60.0, n_sessions) * page_views
+    engaged = (page_views >= 3) | (duration > 90)
+
+    # Prima sessione di ogni utente (le sessioni sono già in ordine di giorno)
+    session_new = np.zeros(n_sessions, dtype=bool)
+    session_new[np.unique(session_user, return_index=True)[1]] = True
+
+    # Eventi: conteggio per tipo e per sessione
+    builtin = ["session_start", "page_view", "user_engagement", "scroll"]
+    names = builtin + custom
+    counts = [
+        np.ones(n_sessions, dtype=np.int64),
+        page_views,
+        engaged.astype(np.int64),
+        (rng.random(n_sessions) < 0.5).astype(np.int64),
+    ]
+    device_names = np.asarray(device_values, dtype=object)[device]
+    for name, rate in zip(custom, rates):
+        p = np.full(n_sessions, rate)
+        if name == "phone_call_initiated":
+            p[device_names == "mobile"] *= 2
+        counts.append((rng.random(n_sessions) < p).astype(np.int64))
+
+    session = np.concatenate([np.repeat(np.arange(n_sessions), c) for c in counts])
+    event_name = np.concatenate([np.full(c.sum(), i, dtype=np.int16) for i, c in enumerate(counts)])
+    order = np.argsort(session, kind="stable")
+    session, event_name = session[order], event_name[order]
+    n = len(session)
+
+    codes = {
+        "eventName": event_name,
+        "date": session_day[session].astype(np.int16),
+        "deviceCategory": device[session].astype(np.int16),
+        "newVsReturning": (~session_new[session]).astype(np.int16),
+    }
+    categories = {
+        "eventName": _encode(names),
+        "date": _encode([(start_date + timedelta(days=d)).strftime("%Y%m%d") for d in range(days)]),
+        "deviceCategory": _encode(device_values),
+        "newVsReturning": _encode(["new", "returning"]),
+    }
+    # Ogni elemento delle coppie ha codici propri: "google" resta una sola categoria di source
+    for pair_codes, pairs, fields in ((source_medium, sm_values, ("source", "medium")),
+                                      (geo, geo_values, ("country", "city"))):
+        for index, name in enumerate(fields):
+            component_codes, categories[name] = _component(pairs, index)
+            codes[name] = component_codes[pair_codes][session]
+
+    path_codes, path_values = _choice(rng, PAGE_PATHS, n)
+    page_path = list(path_values)
+
+    # Parametri degli eventi ("(not set)" sugli altri eventi)
+    parameters = dict(BUILTIN_PARAMETERS)
+    parameters.update({name: spec.get("parameters", {}) for name, spec in events_config.items()})
+    for event_index, name in enumerate(names):
+        rows = np.flatnonzero(event_name == event_index)
+        for param, spec in parameters.get(name, {}).items():
+            key = f"customEvent:{param}"
+            if key not in codes:
+                codes[key] = np.zeros(n, dtype=np.int16)
+                categories[key] = [NOT_SET]
+            values = categories[key]
+            if "enum" in spec:
+                options = [str(v) for v in spec["enum"]]
+            else:
+                options = [str(v) for v in range(5, 305, 5)]
+            for option in options:
+                if option not in values:
+                    values.append(option)
+            picks = rng.integers(len(options), size=len(rows))
+            codes[key][rows] = np.array([values.index(o) for o in options], dtype=np.int16)[picks]
+            if param == "service_name":
+                for option in options:
+                    if f"/servizi/{option}" not in page_path:
+                        page_path.append(f"/servizi/{option}")
+                path_codes[rows] = np.array(
+                    [page_path.index(f"/servizi/{o}") for o in options]
+                )[picks]
+    for key in list(categories):
+        categories[key] = _encode(categories[key])
+    codes["pagePath"] = path_codes.astype(np.int16)
+    categories["pagePath"] = _encode(page_path)
+
+    day = codes["date"]
+    return EventDataset(
+        day=day,
+        session=session,
+        codes=codes,
+        categories=categories,
+        session_user=session_user,
+        session_engaged=engaged,
+        session_duration=duration,
+        session_new=session_new,
+        start_date=start_date,
+        day_offsets=np.searchsorted(day, np.arange(days + 1)),
+    )
+
+def _parse_date(value: str, today: date) -> date:
+    if value == "today":
+        return today
+    if value == "yesterday":
+        return today - timedelta(days=1)
+    match = re.fullmatch(r"(\d+)daysAgo", value)
+    if match:
+        return today - timedelta(days=int(match.group(1)))
+    return date.fromisoformat(value)
+
+def _string_mask(values: np.ndarray, string_filter) -> np.ndarray:
+    """
+    Valuta un filtro stringa sulle categorie (una volta per valore distinto).
+    """
+    target = string_filter.value
+    case_sensitive = string_filter.case_sensitive
+    texts = [v if case_sensitive else v.lower() for v in values]
+    if not case_sensitive:
+        target = target.lower()
+    match_type = Filter.StringFilter.MatchType
+    if string_filter.match_type == match_type.BEGINS_WITH:
+        return np.array([t.startswith(target) for t in texts])
+    if string_filter.match_type == match_type.ENDS_WITH:
+        return np.array([t.endswith(target) for t in texts])
+    if string_filter.match_type == match_type.CONTAINS:
+        return np.array([target in t for t in texts])
+    if string_filter.match_type in (match_type.FULL_REGEXP, match_type.PARTIAL_REGEXP):
+        pattern = re.compile(string_filter.value, 0 if case_sensitive else re.IGNORECASE)
+        search = pattern.fullmatch if string_filter.match_type == match_type.FULL_REGEXP else pattern.search
+        return np.array([bool(search(v)) for v in values])
+    return np.array([t == target for t in texts])
+
+def _numeric_value(value) -> float:
+    return value.double_value if "double_value" in value else float(value.int64_value)
+
+def _numeric_mask(values: np.ndarray, numeric_filter=None, between_filter=None) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        if between_filter is not None:
+            return ((values >= _numeric_value(between_filter.from_value))
+                    & (values <= _numeric_value(between_filter.to_value)))
+        operation = Filter.NumericFilter.Operation
+        number = _numeric_value(numeric_filter.value)
+        return {
+            operation.EQUAL: values == number,
+            operation.LESS_THAN: values < number,
+            operation.LESS_THAN_OR_EQUAL: values <= number,
+            operation.GREATER_THAN: values > number,
+            operation.GREATER_THAN_OR_EQUAL: values >= number,
+        }.get(numeric_filter.operation, np.zeros(len(values), dtype=bool))
+
+def _filter_mask(expression: FilterExpression, lookup) -> np.ndarray:
+    """
+    Valuta un'espressione di filtro; lookup(field) -> (valori confrontabili, codici o None).
+
+    Per le dimensioni il filtro si valuta sulle categorie e si espande con i
+    codici degli eventi; per le metriche direttamente sui valori delle righe.
+    """
+    kind = FilterExpression.pb(expression).WhichOneof("expr")
+    if kind == "and_group":
+        return np.logical_and.reduce([_filter_mask(e, lookup) for e in expression.and_group.expressions])
+    if kind == "or_group":
+        return np.logical_or.reduce([_filter_mask(e, lookup) for e in expression.or_group.expressions])
+    if kind == "not_expression":
+        return ~_filter_mask(expression.not_expression, lookup)
+
+    f = expression.filter
+    values, codes = lookup(f.field_name)
+    which = Filter.pb(f).WhichOneof("one_filter")
+    if which == "string_filter":
+        mask = _string_mask([str(v) for v in values], f.string_filter)
+    elif which == "in_list_filter":
+        options = set(f.in_list_filter.values)
+        if not f.in_list_filter.case_sensitive:
+            options = {o.lower() for o in options}
+            mask = np.array([str(v).lower() in options for v in values])
+        else:
+            mask = np.array([str(v) in options for v in values])
+    elif which == "numeric_filter":
+        mask = _numeric_mask(_to_float(values), numeric_filter=f.numeric_filter)
+    elif which == "between_filter":
+        mask = _numeric_mask(_to_float(values), between_filter=f.between_filter)
+    else:
+        raise InvalidArgument(f"Filtro non supportato: {which}")
+    return mask[codes] if codes is not None else mask
+
+def _to_float(values) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    for i, v in enumerate(values):
+        try:
+            out[i] = float(v)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+def _group_ids(code_arrays: List[np.ndarray], cardinalities: List[int]):
+    """
+    Identificativo denso del gruppo per ogni evento e primo evento di ogni gruppo.
+    """
+    n = len(code_arrays[0]) if code_arrays else 0
+    key = np.zeros(n, dtype=np.int64)
+    span = 1
+    for codes, cardinality in zip(code_arrays, cardinalities):
+        if span * cardinality >= 2 ** 62:
+            # Ricompatta la chiave prima che vada in overflow
+            _, key = np.unique(key, return_inverse=True)
+            span = int(key.max()) + 1 if n else 1
+        key = key * cardinality + codes
+        span *= cardinality
+    if span > 4 * n + 1024:
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        return inverse.ravel(), first
+    # Spazio delle chiavi contenuto: rinumerazione per conteggio, senza ordinamento
+    present = np.zeros(span, dtype=bool)
+    present[key] = True
+    dense = np.cumsum(present) - 1
+    inverse = dense[key]
+    first = np.empty(int(present.sum()), dtype=np.int64)
+    first[inverse[::-1]] = np.arange(n - 1, -1, -1)
+    return inverse, first
+
+def _distinct_pairs(group: np.ndarray, ids: np.ndarray, n_ids: int):
+    """
+    Coppie (gruppo, id) distinte: base dei conteggi di sessioni e utenti.
+    """
+    pairs = group.astype(np.int64) * n_ids + ids
+    # Gli eventi di una sessione sono contigui: i duplicati consecutivi si scartano prima del sort
+    if len(pairs):
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+        pairs.sort()
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+    return pairs // n_ids, pairs % n_ids
+
+class EmulatedDataClient(FakeDataClient):
+    def __init__(self, events_config_path: str = EVENTS_CONFIG_PATH, n_events: int = 1_000_000,
+                 days: int = 400, seed: int = 0, latency_seconds: float = 0.0,
+                 transient_failures: int = 0, tokens_per_hour: int = 200000,
+                 end_date: Optional[date] = None):
+        """
+        Sostituto locale di BetaAnalyticsDataClient basato su eventi sintetici.
+
+        Ogni property ha un proprio dataset (seed derivato dall'ID),
+        generato al primo utilizzo. Le richieste vengono risolte con
+        aggregazioni numpy: filtri su dimensioni valutati per categoria,
+        group-by su codici interi, conteggi distinti di sessioni e utenti.
+
+        Args:
+            events_config_path: Definizione degli eventi personalizzati
+            n_events: Eventi circa generati per property
+            days: Giorni di storico fino a end_date
+            seed: Seed di base dei dataset
+            latency_seconds: Latenza simulata per ogni round-trip
+            transient_failures: Chiamate iniziali che falliscono con ServiceUnavailable
+            tokens_per_hour: Quota oraria per property; esaurita -> ResourceExhausted
+            end_date: Ultimo giorno del dataset (default: oggi)
+        """
+        super().__init__(rows_per_report=0, latency_seconds=latency_seconds,
+                         transient_failures=transient_failures, tokens_per_hour=tokens_per_hour)
+        self.events_config = load_events_config(events_config_path)
+        self.n_events = n_events
+        self.days = days
+        self.seed = seed
+        self.end_date = end_date
+        self.tokens_per_hour = tokens_per_hour
+        self.events_scanned = 0
+        self._datasets: Dict[str, EventDataset] = {}
+        self._quota: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def dataset(self, property_name: str) -> EventDataset:
+        """
+        Dataset della property, generato una sola volta.
+        """
+        with self._lock:
+            if property_name not in self._datasets:
+                seed = self.seed + zlib.crc32(property_name.encode())
+                self._datasets[property_name] = generate_events(
+                    self.events_config, self.n_events, self.days, self.end_date, seed
+                )
+            return self._datasets[property_name]
+
+    def _consume_quota(self, property_name: str, tokens: int) -> int:
+        """
+        Scala i token della property; rinnova la quota ogni ora.
+        """
+        with self._lock:
+            window_start, remaining = self._quota.get(property_name, (time.monotonic(), self.tokens_per_hour))
+            if time.monotonic() - window_start >= 3600:
+                window_start, remaining = time.monotonic(), self.tokens_per_hour
+            if remaining < tokens:
+                raise ResourceExhausted(f"Quota oraria esaurita per {property_name}")
+            remaining -= tokens
+            self._quota[property_name] = [window_start, remaining]
+            self.tokens_remaining = remaining
+            return remaining
+
+    def _build_response(self, request: RunReportRequest) -> RunReportResponse:
+        """
+        Risolve la richiesta sul dataset della property.
+        """
+        dimensions = [d.name for d in request.dimensions]
+        metrics = [m.name for m in request.metrics]
+        if len(dimensions) > MAX_DIMENSIONS or len(metrics) > MAX_METRICS:
+            raise InvalidArgument("Troppe dimensioni o metriche nella richiesta")
+        if not metrics and not dimensions:
+            raise InvalidArgument("La richiesta non contiene dimensioni né metriche")
+
+        ds = self.dataset(request.property)
+        for name in dimensions:
+            if DIMENSION_ALIASES.get(name, name) not in ds.codes:
+                raise InvalidArgument(f"Dimensione non supportata: {name}")
+        for name in metrics:
+            if METRIC_ALIASES.get(name, name) not in SUPPORTED_METRICS:
+                raise InvalidArgument(f"Metrica non supportata: {name}")
+
+        today = self.end_date or datetime.now().date()
+        ranges = list(request.date_ranges) or [None]
+        tables = []
+        scanned = 0
+        for i, date_range in enumerate(ranges):
+            lo, hi = self._event_slice(ds, date_range, today)
+            scanned += hi - lo
+            table = self._aggregate(ds, lo, hi, request, dimensions, metrics)
+            if len(ranges) > 1:
+                label = date_range.name or f"date_range_{i}"
+                table["dateRange"] = np.full(len(table[metrics[0] if metrics else dimensions[0]]), label, dtype=object)
+            tables.append(table)
+
+        columns = dimensions + (["dateRange"] if len(ranges) > 1 else []) + metrics
+        table = {c: np.concatenate([t[c] for t in tables]) for c in columns}
+        n_rows = len(table[columns[0]]) if columns else 0
+
+        if "metric_filter" in request and n_rows:
+            keep = _filter_mask(request.metric_filter, lambda name: (table[name], None))
+            table = {c: v[keep] for c, v in table.items()}
+            n_rows = int(keep.sum())
+
+        order = self._order(table, request, n_rows)
+        limit = min(request.limit or API_DEFAULT_LIMIT, MAX_LIMIT)
+        window = order[request.offset:request.offset + limit]
+
+        self.reports_served += 1
+        self.events_scanned += scanned
+        remaining = self._consume_quota(request.property, 1 + scanned // TOKEN_EVENTS)
+        return self._response(table, dimensions + (["dateRange"] if len(ranges) > 1 else []),
+                              metrics, window, n_rows, request, remaining)
+
+    def _event_slice(self, ds: EventDataset, date_range, today: date):
+        """
+        Eventi del periodo: gli eventi sono ordinati per giorno, basta una fetta.
+        """
+        if date_range is None:
+            return 0, ds.n_events
+        start = (_parse_date(date_range.start_date, today) - ds.start_date).days
+        end = (_parse_date(date_range.end_date, today) - ds.start_date).days
+        days = len(ds.day_offsets) - 1
+        start, end = min(max(start, 0), days), min(max(end + 1, 0), days)
+        return int(ds.day_offsets[start]), int(ds.day_offsets[max(end, start)])
+
+    def _aggregate(self, ds: EventDataset, lo: int, hi: int, request: RunReportRequest,
+                   dimensions: List[str], metrics: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Group-by delle dimensioni richieste sugli eventi [lo, hi) che passano il filtro.
+        """
+        def dimension_lookup(name):
+            key = DIMENSION_ALIASES.get(name, name)
+            if key not in ds.codes:
+                raise InvalidArgument(f"Dimensione non supportata nel filtro: {name}")
+            return ds.categories[key], ds.codes[key][lo:hi]
+
+        if "dimension_filter" in request and hi > lo:
+            idx = lo + np.flatnonzero(_filter_mask(request.dimension_filter, dimension_lookup))
+        else:
+            idx = np.arange(lo, hi)
+
+        keys = [DIMENSION_ALIASES.get(d, d) for d in dimensions]
+        group, first = _group_ids([ds.codes[k][idx] for k in keys],
+                                  [len(ds.categories[k]) for k in keys])
+        if not dimensions:
+            # Senza dimensioni l'API restituisce una riga di totali (nessuna se non ci sono eventi)
+            group = np.zeros(len(idx), dtype=np.int64)
+            first = np.zeros(1 if len(idx) else 0, dtype=np.int64)
+        n_groups = len(first)
+
+        table = {d: ds.categories[k][ds.codes[k][idx[first]]] for d, k in zip(dimensions, keys)}
+        computed = {}
+
+        def event_count(mask=None):
+            return np.bincount(group, weights=mask, minlength=n_groups)
+
+        def session_pairs():
+            if "pairs" not in computed:
+                computed["pairs"] = _distinct_pairs(group, ds.session[idx], ds.n_sessions)
+            return computed["pairs"]
+
+        def per_session(weights=None):
+            g, s = session_pairs()
+            return np.bincount(g, weights=None if weights is None else weights[s], minlength=n_groups)
+
+        def users():
+            user_group, _ = _distinct_pairs(group, ds.session_user[ds.session[idx]], int(ds.session_user.max()) + 1)
+            return np.bincount(user_group, minlength=n_groups)
+
+        names = ds.categories["eventName"]
+        event_codes = ds.codes["eventName"][idx]
+        is_key = np.isin(names, KEY_EVENTS)[event_codes].astype(np.float64)
+        is_view = (names == "page_view")[event_codes].astype(np.float64)
+
+        def ratio(a, b):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(b > 0, a / np.maximum(b, 1), 0.0)
+
+        for name in metrics:
+            metric = METRIC_ALIASES.get(name, name)
+            if metric == "eventCount":
+                value = event_count()
+            elif metric == "conversions":
+                value = event_count(is_key)
+            elif metric == "screenPageViews":
+                value = event_count(is_view)
+            elif metric == "sessions":
+                value = per_session()
+            elif metric == "engagedSessions":
+                value = per_session(ds.session_engaged.astype(np.float64))
+            elif metric == "newUsers":
+                value = per_session(ds.session_new.astype(np.float64))
+            elif metric == "totalUsers":
+                value = users()
+            elif metric == "bounceRate":
+                value = 1 - ratio(per_session(ds.session_engaged.astype(np.float64)), per_session())
+            elif metric == "engagementRate":
+                value = ratio(per_session(ds.session_engaged.astype(np.float64)), per_session())
+            elif metric == "averageSessionDuration":
+                value = ratio(per_session(ds.session_duration), per_session())
+            elif metric == "screenPageViewsPerSession":
+                value = ratio(event_count(is_view), per_session())
+            else:  # sessionsPerUser
+                value = ratio(per_session(), users())
+            table[name] = value.astype(np.int64) if metric in INTEGER_METRICS else value
+        return table
+
+    def _order(self, table, request: RunReportRequest, n_rows: int) -> np.ndarray:
+        """
+        Indici delle righe secondo order_bys (l'ultimo criterio ha priorità minore).
+        """
+        order = np.arange(n_rows)
+        for order_by in reversed(list(request.order_bys)):
+            kind = type(order_by).pb(order_by).WhichOneof("one_order_by")
+            if kind == "metric":
+                values = table[order_by.metric.metric_name][order]
+            elif kind == "dimension":
+                values = table[order_by.dimension.dimension_name][order].astype(str)
+            else:
+                raise InvalidArgument(f"Ordinamento non supportato: {kind}")
+            ranks = np.argsort(values, kind="stable")
+            if order_by.desc:
+                # Decrescente mantenendo stabile l'ordine dei pari merito
+                ranks = np.argsort(-np.unique(values, return_inverse=True)[1].ravel(), kind="stable")
+            order = order[ranks]
+        return order
+
+    def _response(self, table, dimensions, metrics, rows, n_rows, request, remaining):
+        pb = RunReportResponse.pb()()
+        for name in dimensions:
+            pb.dimension_headers.add(name=name)
+        for name in metrics:
+            metric = METRIC_ALIASES.get(name, name)
+            pb.metric_headers.add(
+                name=name,
+                type_=METRIC_TYPES.get(metric, MetricType.TYPE_INTEGER),
+            )
+
+        dimension_columns = [table[d][rows] for d in dimensions]
+        metric_columns = [
+            table[m][rows].astype(str) if table[m].dtype.kind == "i" else np.char.mod("%.6g", table[m][rows])
+            for m in metrics
+        ]
+        for i in range(len(rows)):
+            row = pb.rows.add()
+            for column in dimension_columns:
+                row.dimension_values.add(value=str(column[i]))
+            for column in metric_columns:
+                row.metric_values.add(value=column[i])
+        pb.row_count = n_rows
+
+        response = RunReportResponse.wrap(pb)
+        if request.return_property_quota:
+            response.property_quota = PropertyQuota(
+                tokens_per_hour=QuotaStatus(consumed=self.tokens_per_hour - remaining, remaining=remaining)
+            )
+        return response
+
+class AsyncEmulatedDataClient(EmulatedDataClient, AsyncFakeDataClient):
+    """
+    Variante asincrona dell'emulatore, compatibile con AsyncGA4Client.
+    """
+
+if __name__ == "__main__":
+    from ga4_api_client import GA4Client, REPORT_NAMES
+
+    parser = argparse.ArgumentParser(description="Prova di carico dell'emulatore GA4")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=400)
+    parser.add_argument("--days-back", type=int, default=180)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    emulator = EmulatedDataClient(n_events=args.events, days=args.days)
+    ds = emulator.dataset("properties/bench")
+    print(f"\nDataset: {ds.n_events:,} eventi, {ds.n_sessions:,} sessioni "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    client = GA4Client("bench", client=emulator)
+    end = datetime.now().date()
+    for name in REPORT_NAMES:
+        request = client.build_daily_request(name, end - timedelta(days=args.days_back), end)
+        start = time.perf_counter()
+        df = client.fetch_report(request)
+        print(f"  {name:12s} {len(df):7,} righe in {(time.perf_counter() - start) * 1000:7.1f} ms")
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# GA4 Fake Data Client
+# Sostituto in-process di BetaAnalyticsDataClient per test e benchmark offline
+
+import asyncio
+import time
+from datetime import date, timedelta
+from google.api_core.exceptions import ServiceUnavailable
+from google.analytics.data_v1beta.types import (
+    BatchRunReportsRequest,
+    BatchRunReportsResponse,
+    DimensionHeader,
+    DimensionValue,
+    MetricHeader,
+    MetricType,
+    MetricValue,
+    PropertyQuota,
+    QuotaStatus,
+    Row,
+    RunReportRequest,
+    RunReportResponse,
+)
+
+# Limite di righe applicato dall'API quando la richiesta non specifica limit
+API_DEFAULT_LIMIT = 10000
+
+# Token di quota consumati da ogni report simulato
+TOKENS_PER_REPORT = 10
+
+class FakeDataClient:
+    def __init__(self, rows_per_report: int = 10, latency_seconds: float = 0.0,
+                 transient_failures: int = 0, tokens_per_hour: int = 40000):
+        """
+        Inizializza il client fittizio.
+
+        Args:
+            rows_per_report: Numero totale di righe di ogni report (paginato con limit/offset)
+            latency_seconds: Latenza simulata per ogni round-trip
+            transient_failures: Chiamate iniziali che falliscono con ServiceUnavailable
+            tokens_per_hour: Quota oraria simulata, riportata se return_property_quota
+        """
+        self.rows_per_report = rows_per_report
+        self.latency_seconds = latency_seconds
+        self.transient_failures = transient_failures
+        self.tokens_remaining = tokens_per_hour
+        self.failed_calls = 0
+        self.run_report_calls = 0
+        self.batch_calls = 0
+        self.reports_served = 0
+
+    @property
+    def round_trips(self) -> int:
+        """
+        Numero totale di chiamate verso la (finta) API.
+        """
+        return self.run_report_calls + self.batch_calls
+
+    def run_report(self, request: RunReportRequest) -> RunReportResponse:
+        """
+        Simula runReport: una chiamata, un report.
+        """
+        self.run_report_calls += 1
+        self._simulate_latency()
+        self._maybe_fail()
+        return self._build_response(request)
+
+    def batch_run_reports(self, request: BatchRunReportsRequest) -> BatchRunReportsResponse:
+        """
+        Simula batchRunReports: una chiamata, fino a cinque report.
+        """
+        if len(request.requests) > 5:
+            raise ValueError("batchRunReports accetta al massimo 5 richieste")
+
+        self.batch_calls += 1
+        self._simulate_latency()
+        self._maybe_fail()
+        return BatchRunReportsResponse(
+            reports=[self._build_response(r) for r in request.requests]
+        )
+
+    def _simulate_latency(self):
+        if self.latency_seconds > 0:
+            time.sleep(self.latency_seconds)
+
+    def _maybe_fail(self):
+        if self.failed_calls < self.transient_failures:
+            self.failed_calls += 1
+            raise ServiceUnavailable("Errore transitorio simulato")
+
+    def _dimension_value(self, request: RunReportRequest, name: str, i: int) -> str:
+        """
+        Valore della dimensione per la riga i; "date" cicla sui giorni del periodo.
+        """
+        if name != "date":
+            return f"{name}_{i}"
+        date_range = request.date_ranges[0]
+        start = date.fromisoformat(date_range.start_date)
+        n_days = (date.fromisoformat(date_range.end_date) - start).days + 1
+        return (start + timedelta(days=i % n_days)).strftime("%Y%m%d")
+
+    def _build_response(self, request: RunReportRequest) -> RunReportResponse:
+        """
+        Genera una risposta deterministica coerente con dimensioni e metriche richieste.
+
+        Come l'API reale, restituisce solo la finestra limit/offset richiesta
+        e riporta in row_count il totale delle righe disponibili.
+        """
+        self.reports_served += 1
+        dimensions = [d.name for d in request.dimensions]
+        metrics = [m.name for m in request.metrics]
+
+        limit = request.limit or API_DEFAULT_LIMIT
+        start = min(request.offset, self.rows_per_report)
+        stop = min(start + limit, self.rows_per_report)
+
+        rows = [
+            Row(
+                dimension_values=[
+                    DimensionValue(value=self._dimension_value(request, name, i))
+                    for name in dimensions
+                ],
+                metric_values=[MetricValue(value=str(i + 1)) for _ in metrics],
+            )
+            for i in range(start, stop)
+        ]
+
+        response = RunReportResponse(
+            dimension_headers=[DimensionHeader(name=name) for name in dimensions],
+            metric_headers=[
+                MetricHeader(name=name, type_=MetricType.TYPE_INTEGER) for name in metrics
+            ],
+            rows=rows,
+            row_count=self.rows_per_report,
+        )
+
+        self.tokens_remaining = max(self.tokens_remaining - TOKENS_PER_REPORT, 0)
+        if request.return_property_quota:
+            response.property_quota = PropertyQuota(
+                tokens_per_hour=QuotaStatus(
+                    consumed=TOKENS_PER_REPORT, remaining=self.tokens_remaining
+                )
+            )
+        return response
+
+class AsyncFakeDataClient(FakeDataClient):
+    """
+    Variante asincrona di FakeDataClient, compatibile con AsyncGA4Client.
+
+    La latenza è simulata con asyncio.sleep; max_in_flight registra il
+    numero massimo di richieste contemporanee osservate.
+    """
+
+    def __init__(self, rows_per_report: int = 10, latency_seconds: float = 0.0,
+                 transient_failures: int = 0, tokens_per_hour: int = 40000):
+        super().__init__(rows_per_report, latency_seconds, transient_failures, tokens_per_hour)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def run_report(self, request: RunReportRequest) -> RunReportResponse:
+        self.run_report_calls += 1
+        await self._simulate_latency_async()
+        self._maybe_fail()
+        return self._build_response(request)
+
+    async def batch_run_reports(self, request: BatchRunReportsRequest) -> BatchRunReportsResponse:
+        if len(request.requests) > 5:
+            raise ValueError("batchRunReports accetta al massimo 5 richieste")
+
+        self.batch_calls += 1
+        await self._simulate_latency_async()
+        self._maybe_fail()
+        return BatchRunReportsResponse(
+            reports=[self._build_response(r) for r in request.requests]
+        )
+
+    async def _simulate_latency_async(self):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency_seconds)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# GA4 Forecast Models
+# Modelli di previsione su serie giornaliere GA4, vettorizzati su più serie
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# Stagionalità settimanale dei dati giornalieri
+SEASON_LENGTH = 7
+
+# Serie previste: metrica -> (report, colonna sommata per giorno)
+FORECAST_METRICS = {
+    "conversions": ("conversions", "eventCount"),
+    "sessions": ("traffic", "sessions"),
+}
+
+# Ampiezza relativa dell'intervallo (semi-ampiezza / previsione) per livello di confidenza
+CONFIDENCE_THRESHOLDS = (("HIGH", 0.15), ("MEDIUM", 0.35))
+
+@dataclass
+class ForecastResult:
+    """
+    Previsioni per n serie su un orizzonte di h giorni: array di forma (n, h).
+    """
+    mean: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+
+    @property
+    def confidence_level(self) -> np.ndarray:
+        """
+        HIGH/MEDIUM/LOW per ogni cella, dall'ampiezza relativa dell'intervallo.
+        """
+        half_width = (self.upper - self.lower) / 2
+        relative = half_width / np.maximum(np.abs(self.mean), 1e-9)
+        levels = np.full(self.mean.shape, "LOW", dtype=object)
+        for label, threshold in reversed(CONFIDENCE_THRESHOLDS):
+            levels[relative <= threshold] = label
+        return levels
+
+class ForecastModel(ABC):
+    """
+    Base dei modelli: fit su una matrice (serie x giorni), predict su h giorni.
+
+    Le sottoclassi calcolano in fit le previsioni puntuali e i residui
+    one-step in-sample; l'intervallo è mean ± z * sigma * sqrt(passo).
+    """
+
+    min_history = 2
+
+    def __init__(self, interval: float = 0.8):
+        self.interval = interval
+        self.sigma = None
+
+    @abstractmethod
+    def fit(self, y: np.ndarray) -> "ForecastModel":
+        """
+        Stima il modello su tutte le righe di y e calcola sigma dai residui.
+        """
+
+    @abstractmethod
+    def _point_forecast(self, horizon: int) -> np.ndarray:
+        """
+        Previsioni puntuali di forma (serie, horizon).
+        """
+
+    def predict(self, horizon: int = 1) -> ForecastResult:
+        """
+        Previsioni per i prossimi horizon giorni, con intervallo di previsione.
+        """
+        mean = np.maximum(self._point_forecast(horizon), 0)
+        z = NormalDist().inv_cdf(0.5 + self.interval / 2)
+        spread = z * self.sigma[:, None] * np.sqrt(np.arange(1, horizon + 1))[None, :]
+        return ForecastResult(
+            mean=mean,
+            lower=np.maximum(mean - spread, 0),
+            upper=mean + spread,
+        )
+
+    def _set_sigma(self, residuals: np.ndarray):
+        """
+        Deviazione standard dei residui per serie (ignora i NaN di warm-up).
+        """
+        valid = np.isfinite(residuals).sum(axis=1)
+        sigma = np.sqrt(np.nansum(residuals ** 2, axis=1) / np.maximum(valid - 1, 1))
+        self.sigma = np.where(valid > 1, sigma, 0.0)
+
+class MovingAverageModel(ForecastModel):
+    """
+    Media mobile degli ultimi window giorni, costante sull'orizzonte.
+    """
+
+    def __init__(self, window: int = 7, interval: float = 0.8):
+        super().__init__(interval)
+        self.window = window
+        self.level = None
+
+    def fit(self, y: np.ndarray) -> "MovingAverageModel":
+        y = np.asarray(y, dtype=np.float64)
+        window = min(self.window, y.shape[1])
+        self.level = y[:, -window:].mean(axis=1)
+
+        # Residui one-step: y[t] - media di y[t-window:t], con somme cumulate
+        csum = np.cumsum(np.pad(y, ((0, 0), (1, 0))), axis=1)
+        rolling_mean = (csum[:, window:-1] - csum[:, :-window - 1]) / window
+        self._set_sigma(y[:, window:] - rolling_mean)
+        return self
+
+    def _point_forecast(self, horizon: int) -> np.ndarray:
+        return np.repeat(self.level[:, None], horizon, axis=1)
+
+class HoltWintersModel(ForecastModel):
+    """
+    Holt-Winters additivo con stagionalità settimanale.
+
+    Il ciclo è sui giorni, ma ogni passo aggiorna tutte le serie insieme.
+    """
+
+    min_history = SEASON_LENGTH + 1
+
+    def __init__(self, alpha: float = 0.3, beta: float = 0.05, gamma: float = 0.2,
+                 season_length: int = SEASON_LENGTH, interval: float = 0.8):
+        super().__init__(interval)
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.season_length = season_length
+        self.level = None
+        self.trend = None
+        self.seasonal = None
+        self.n_obs = 0
+
+    def fit(self, y: np.ndarray) -> "HoltWintersModel":
+        y = np.asarray(y, dtype=np.float64)
+        n_series, n_obs = y.shape
+        m = self.season_length
+
+        level = y[:, :m].mean(axis=1)
+        if n_obs >= 2 * m:
+            trend = (y[:, m:2 * m].mean(axis=1) - level) / m
+        else:
+            trend = np.zeros(n_series)
+        seasonal = y[:, :m] - level[:, None]
+
+        residuals = np.full((n_series, n_obs), np.nan)
+        for t in range(m, n_obs):
+            s = seasonal[:, t % m]
+            residuals[:, t] = y[:, t] - (level + trend + s)
+            new_level = self.alpha * (y[:, t] - s) + (1 - self.alpha) * (level + trend)
+            trend = self.beta * (new_level - level) + (1 - self.beta) * trend
+            seasonal[:, t % m] = self.gamma * (y[:, t] - new_level) + (1 - self.gamma) * s
+            level = new_level
+
+        self.level, self.trend, self.seasonal, self.n_obs = level, trend, seasonal, n_obs
+        self._set_sigma(residuals)
+        return self
+
+    def _point_forecast(self, horizon: int) -> np.ndarray:
+        steps = np.arange(1, horizon + 1)
+        season_idx = (self.n_obs + steps - 1) % self.season_length
+        return (self.level[:, None] + self.trend[:, None] * steps[None, :]
+                + self.seasonal[:, season_idx])
+
+class DayOfWeekRegressionModel(ForecastModel):
+    """
+    Regressione lineare con trend e giorno della settimana.
+
+    La matrice di design è comune a tutte le serie: un solo lstsq le stima tutte.
+    """
+
+    min_history = SEASON_LENGTH + 2
+
+    def __init__(self, interval: float = 0.8):
+        super().__init__(interval)
+        self.coef = None
+        self.n_obs = 0
+        self.first_weekday = 0
+
+    def fit(self, y: np.ndarray, first_weekday: int = 0) -> "DayOfWeekRegressionModel":
+        y = np.asarray(y, dtype=np.float64)
+        self.n_obs = y.shape[1]
+        self.first_weekday = first_weekday
+
+        design = self._design(np.arange(self.n_obs))
+        self.coef, *_ = np.linalg.lstsq(design, y.T, rcond=None)
+        residuals = y - (design @ self.coef).T
+        dof = max(self.n_obs - design.shape[1], 1)
+        self.sigma = np.sqrt((residuals ** 2).sum(axis=1) / dof)
+        return self
+
+    def _design(self, t: np.ndarray) -> np.ndarray:
+        weekday = (t + self.first_weekday) % SEASON_LENGTH
+        dummies = (weekday[:, None] == np.arange(1, SEASON_LENGTH)[None, :]).astype(np.float64)
+        return np.column_stack([np.ones(len(t)), t, dummies])
+
+    def _point_forecast(self, horizon: int) -> np.ndarray:
+        t = np.arange(self.n_obs, self.n_obs + horizon)
+        return (self._design(t) @ self.coef).T
+
+MODELS = {
+    "moving_average": MovingAverageModel,
+    "holt_winters": HoltWintersModel,
+    "dow_regression": DayOfWeekRegressionModel,
+}
+
+def get_model(name: str, **params) -> ForecastModel:
+    """
+    Istanzia un modello registrato in MODELS.
+    """
+    try:
+        return MODELS[name](**params)
+    except KeyError:
+        raise ValueError(f"Modello sconosciuto: {name}. Disponibili: {', '.join(MODELS)}")
+
+def forecast_matrix(y: np.ndarray, model_name: str, horizon: int,
+                    first_weekday: int = 0, **params) -> ForecastResult:
+    """
+    Stima il modello su tutte le righe di y in un solo passaggio e prevede horizon giorni.
+
+    Con storico insufficiente per il modello richiesto ripiega sulla media mobile.
+    """
+    model = get_model(model_name, **params)
+    if y.shape[1] < model.min_history:
+        model = MovingAverageModel(interval=model.interval)
+
+    return fit_model(model, y, first_weekday).predict(horizon)
+
+def fit_model(model: ForecastModel, y: np.ndarray, first_weekday: int = 0) -> ForecastModel:
+    """
+    Esegue fit passando first_weekday ai modelli che lo usano.
+    """
+    if isinstance(model, DayOfWeekRegressionModel):
+        return model.fit(y, first_weekday=first_weekday)
+    return model.fit(y)
+
+def align_daily_series(series: Dict[str, pd.Series]) -> pd.DataFrame:
+    """
+    Allinea serie giornaliere su un calendario comune (una riga per serie).
+
+    Ogni serie conserva il proprio intervallo: i giorni assenti al suo interno
+    valgono 0 (GA4 omette le righe a zero), quelli fuori dall'intervallo NaN.
+    Per la stima usare split_by_history, che ritaglia blocchi senza NaN.
+    """
+    series = {key: s for key, s in series.items() if len(s)}
+    if not series:
+        return pd.DataFrame()
+
+    start = min(s.index.min() for s in series.values())
+    end = max(s.index.max() for s in series.values())
+    calendar = pd.date_range(start, end, freq="D")
+    return pd.DataFrame({
+        key: s.reindex(pd.date_range(s.index.min(), s.index.max(), freq="D"), fill_value=0)
+              .reindex(calendar)
+        for key, s in series.items()
+    }).T
+
+def split_by_history(matrix: pd.DataFrame) -> List[pd.DataFrame]:
+    """
+    Raggruppa le righe di align_daily_series per intervallo di storia.
+
+    Ogni blocco contiene le serie con lo stesso primo e ultimo giorno,
+    ritagliate su quei giorni: i modelli si stimano in un solo passaggio
+    per blocco senza troncare né riempire di zeri le serie più lunghe.
+    """
+    if matrix.empty:
+        return []
+    valid = matrix.notna().to_numpy()
+    first = valid.argmax(axis=1)
+    last = valid.shape[1] - 1 - valid[:, ::-1].argmax(axis=1)
+
+    rows_by_span = {}
+    for row, span in enumerate(zip(first, last)):
+        rows_by_span.setdefault(span, []).append(row)
+    return [
+        matrix.iloc[rows, begin:end + 1]
+        for (begin, end), rows in sorted(rows_by_span.items())
+    ]
+
+def report_daily_series(ga4_data: Dict[str, pd.DataFrame]) -> Dict[str, pd.Series]:
+    """
+    Estrae dai report giornalieri le serie definite in FORECAST_METRICS.
+    """
+    series = {}
+    for metric, (report_name, column) in FORECAST_METRICS.items():
+        df = ga4_data.get(report_name)
+        if df is None or df.empty or "date" not in df.columns or column not in df.columns:
+            continue
+        series[metric] = df.groupby("date")[column].sum()
+    return series
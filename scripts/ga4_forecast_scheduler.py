@@ -10,10 +10,14 @@ Version: 1.0
 Date: 2025-11-19
 """
 
+import asyncio
 import os
 import sys
 import logging
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -26,6 +30,16 @@ except ImportError:
     print("Installa con: pip install apscheduler pytz")
     sys.exit(1)
 
+from ga4_alert_delivery import shared_dispatcher
+from ga4_api_client import AsyncGA4Client, GA4Client, REPORT_NAMES
+from ga4_data_store import GA4DataStore
+from ga4_emulator import AsyncEmulatedDataClient, EmulatedDataClient
+from forecast_history import ForecastHistory
+from ga4_forecast_models import (align_daily_series, forecast_matrix, report_daily_series,
+                                 split_by_history)
+from ga4_rate_limit import RetryPolicy, TokenBucketRateLimiter
+from ga4_report_cache import ReportCache
+
 # ============================================================================
 # CONFIGURAZIONE LOGGING
 # ============================================================================
@@ -51,12 +65,39 @@ CONFIG = {
     "scheduler_timezone": "Europe/Rome",  # Timezone italiano
     "forecast_time": "17:30",  # Ora aggiornamento
     "property_id": os.getenv("GA4_PROPERTY_ID", "YOUR_GA4_PROPERTY_ID"),
+    # Elenco property separate da virgola; se assente usa solo property_id
+    "property_ids": [
+        pid.strip()
+        for pid in os.getenv("GA4_PROPERTY_IDS", os.getenv("GA4_PROPERTY_ID", "YOUR_GA4_PROPERTY_ID")).split(",")
+        if pid.strip()
+    ],
+    "max_workers": int(os.getenv("GA4_MAX_WORKERS", "4")),  # Property elaborate in parallelo
     "admin_email": os.getenv("ADMIN_EMAIL", "admin@artax-studio.it"),
+    "alert_window_seconds": 5,  # Alert ravvicinati raggruppati in un'unica email (SMTP_HOST per l'invio)
     "data_retention_days": 180,
+    "data_dir": "data/ga4",
+    "mutable_days": 2,  # Ultimi giorni che GA4 può ancora rielaborare
     "max_retries": 3,
-    "retry_delay_seconds": 30,
+    "retry_base_delay_seconds": 0.5,  # Backoff esponenziale con jitter
+    "retry_max_delay_seconds": 8,
+    "requests_per_second": 5,  # Rate limit per property (rallenta vicino alla quota)
+    "forecast_model": os.getenv("GA4_FORECAST_MODEL", "holt_winters"),  # Vedi ga4_forecast_models.MODELS
+    "forecast_interval": 0.8,  # Copertura dell'intervallo di previsione
+    "forecast_history_path": "forecasts/forecast_history.sqlite",
+    "forecast_retention_days": 730,  # Run di forecast mantenuti nello storico
+    "cache_dir": "cache/ga4",
+    "cache_max_mb": 512,
+    "cache_today_ttl_seconds": 900,
+    "async_fetch": os.getenv("GA4_ASYNC_FETCH", "0") == "1",
+    "max_concurrency": 10,  # Richieste GA4 contemporanee in modalità async
+    # Emulatore locale dell'API (nessuna credenziale né rete): per prove di carico
+    "emulator": os.getenv("GA4_EMULATOR", "0") == "1",
+    "emulator_events": int(os.getenv("GA4_EMULATOR_EVENTS", "1000000")),  # Eventi sintetici per property
 }
 
+# Livelli di confidenza dal meno al più affidabile
+CONFIDENCE_ORDER = ["LOW", "MEDIUM", "HIGH"]
+
 # ============================================================================
 # CLASSE SCHEDULER
 # ============================================================================
@@ -70,185 +111,399 @@ class GA4ForecastScheduler:
         self.config = config
         self.scheduler = BackgroundScheduler()
         self.tz = timezone(config["scheduler_timezone"])
-        self.forecast_dir = Path("forecasts")
-        self.forecast_dir.mkdir(exist_ok=True)
+        self.forecast_history = ForecastHistory(
+            db_path=config["forecast_history_path"],
+            retention_days=config["forecast_retention_days"],
+        )
+        # I forecast_*.json delle versioni precedenti (una sola property) entrano nello storico
+        imported = self.forecast_history.import_legacy_json(config["property_id"])
+        if imported:
+            logger.info(f"[HISTORY] Importati {imported} forecast JSON nello storico")
+        self.report_cache = ReportCache(
+            cache_dir=config["cache_dir"],
+            max_bytes=config["cache_max_mb"] * 1024 ** 2,
+            today_ttl_seconds=config["cache_today_ttl_seconds"],
+            settle_days=config["mutable_days"],
+        )
+        self.data_store = GA4DataStore(
+            data_dir=config["data_dir"],
+            retention_days=config["data_retention_days"],
+            mutable_days=config["mutable_days"],
+        )
+        self.retry_policy = RetryPolicy(
+            max_retries=config["max_retries"],
+            base_delay=config["retry_base_delay_seconds"],
+            max_delay=config["retry_max_delay_seconds"],
+        )
+        # Dispatcher del processo, svuotato all'uscita; None se SMTP_HOST non
+        # è impostato: gli alert vengono solo loggati
+        self.alert_dispatcher = shared_dispatcher(
+            window_seconds=config["alert_window_seconds"],
+        )
+        # Con GA4_EMULATOR=1 i client interrogano l'emulatore invece dell'API;
+        # si genera solo la variante usata (async_fetch), gli eventi sono in memoria
+        self.emulator = None
+        if config["emulator"]:
+            emulator_class = AsyncEmulatedDataClient if config["async_fetch"] else EmulatedDataClient
+            self.emulator = emulator_class(n_events=config["emulator_events"])
+            logger.info(f"[EMULATOR] API GA4 emulata ({config['emulator_events']:,} eventi per property)")
+        self._clients = {}
+        self._rate_limiters = {}
+        self._clients_lock = threading.RLock()
         logger.info(f"[INIT] GA4ForecastScheduler inizializzato")
         
     def forecast_update_job(self):
         """
         Job principale: esegue l'aggiornamento del forecast alle 17:30.
+        Le property configurate vengono elaborate in parallelo su un pool di
+        max_workers thread; il fallimento di una property non blocca le altre.
         """
         try:
             run_time = datetime.now(self.tz).strftime("%Y-%m-%d %H:%M:%S")
+            property_ids = self.config["property_ids"]
             logger.info(f"\n{'='*70}")
             logger.info(f"[JOB_START] Inizio update forecast - {run_time}")
+            logger.info(f"Property: {len(property_ids)} - Worker: {self.config['max_workers']}")
             logger.info(f"{'='*70}")
             
-            # Step 1: Estrai dati da GA4
-            logger.info("[STEP 1/3] Estrazione dati da GA4...")
-            ga4_data = self._fetch_ga4_data()
+            # In modalità async i dati di tutte le property vengono estratti insieme
+            prefetched = {}
+            if self.config["async_fetch"]:
+                logger.info("[PREFETCH] Estrazione asincrona dati da GA4...")
+                prefetched = asyncio.run(self._fetch_ga4_data_async(property_ids))
             
-            if not ga4_data:
-                logger.error("[ERROR] Impossibile estrarre dati da GA4")
-                self._send_alert("GA4 Data Fetch Failed", 
-                               f"Errore nell'estrazione dati GA4 alle {run_time}")
-                return False
+            job_start = time.perf_counter()
+            results = {
+                pid: {"ok": False, "step": "fetch", "run_id": None, "timings": {}}
+                for pid in property_ids
+            }
             
-            logger.info(f"[OK] Estratti {len(ga4_data)} record da GA4")
+            # Step 1: Estrai dati da GA4, una property per worker
+            logger.info("[STEP 1/3] Estrazione dati da GA4...")
+            ga4_data = self._run_stage(
+                property_ids, "fetch",
+                lambda pid: prefetched[pid] if pid in prefetched else self._fetch_ga4_data(pid),
+                results,
+            )
+            logger.info(f"[OK] Dati estratti per {len(ga4_data)}/{len(property_ids)} property")
             
-            # Step 2: Elabora dati
+            # Step 2: Elabora dati - un solo passaggio vettoriale su tutte le serie
             logger.info("[STEP 2/3] Elaborazione dati...")
-            forecast_data = self._process_forecast_data(ga4_data)
-            
-            if not forecast_data:
-                logger.error("[ERROR] Impossibile elaborare i dati")
-                return False
-            
-            logger.info(f"[OK] Elaborati dati per forecast")
+            step_start = time.perf_counter()
+            forecasts = self._process_forecast_data(ga4_data)
+            process_seconds = time.perf_counter() - step_start
+            for pid in ga4_data:
+                results[pid]["step"] = "process"
+                results[pid]["timings"]["process"] = process_seconds
             
             # Step 3: Salva forecast
             logger.info("[STEP 3/3] Salvataggio forecast...")
-            forecast_file = self._save_forecast(forecast_data)
-            
-            if not forecast_file:
-                logger.error("[ERROR] Impossibile salvare il forecast")
-                return False
-            
-            logger.info(f"[OK] Forecast salvato: {forecast_file}")
+            saved = self._run_stage(
+                list(forecasts), "save",
+                lambda pid: self._save_forecast(forecasts[pid], pid),
+                results,
+            )
+            for pid, run_id in saved.items():
+                results[pid].update(ok=True, step="done", run_id=run_id)
+            self._prune_forecast_history()
+            job_seconds = time.perf_counter() - job_start
             
-            # Step 4: Log summary
-            logger.info(f"\n{'='*70}")
-            logger.info(f"[JOB_COMPLETE] Aggiornamento completato con successo")
-            logger.info(f"Timestamp: {run_time}")
-            logger.info(f"Forecast file: {forecast_file}")
-            logger.info(f"{'='*70}\n")
+            self._log_run_summary(results, job_seconds)
             
-            self._send_alert("GA4 Forecast Updated", 
-                           f"Forecast aggiornato alle {run_time}\nFile: {forecast_file}")
+            failed = [pid for pid, r in results.items() if not r["ok"]]
+            if failed:
+                self._send_alert("GA4 Forecast Failed",
+                               f"Forecast non aggiornato alle {run_time} per: {', '.join(failed)}")
+            else:
+                runs = "\n".join(f"{pid}: run {r['run_id']}" for pid, r in results.items())
+                self._send_alert("GA4 Forecast Updated",
+                               f"Forecast aggiornato alle {run_time}\n"
+                               f"Storico: {self.config['forecast_history_path']}\n{runs}")
             
-            return True
+            return not failed
             
         except Exception as e:
             logger.error(f"[EXCEPTION] Errore nel job: {str(e)}", exc_info=True)
             self._send_alert("GA4 Forecast Error", f"Errore: {str(e)}")
             return False
     
-    def _fetch_ga4_data(self):
+    def _run_stage(self, property_ids, step, fn, results):
         """
-        Estrae i dati elaborati da GA4 (ultimi 7 giorni).
-        Ritenta fino a max_retries volte in caso di errore.
-        """
-        retry_count = 0
+        Esegue fn(property_id) sul pool di max_workers thread.
+        
+        Errori e risultati vuoti restano isolati nella property che li ha
+        prodotti; in results vengono registrati fase raggiunta e tempi.
         
-        while retry_count < self.config["max_retries"]:
+        Returns:
+            Dizionario property_id -> risultato, solo per le property riuscite
+        """
+        def timed(pid):
+            step_start = time.perf_counter()
             try:
-                # Import dinamico del client GA4
-                from ga4_api_client import GA4Client
-                
-                client = GA4Client(property_id=self.config["property_id"])
-                
-                # Estrai conversioni ultimi 7 giorni
-                data = {
-                    "conversions": client.get_conversion_report(days_back=7),
-                    "traffic": client.get_traffic_by_source(days_back=7),
-                    "segments": client.get_user_segments_data("all"),
-                    "timestamp": datetime.now(self.tz).isoformat(),
-                }
-                
-                return data
-                
+                return fn(pid)
             except Exception as e:
-                retry_count += 1
-                logger.warning(f"[RETRY {retry_count}/{self.config['max_retries']}] "
-                             f"Errore: {str(e)}")
-                
-                if retry_count < self.config["max_retries"]:
-                    import time
-                    time.sleep(self.config["retry_delay_seconds"])
+                logger.error(f"[EXCEPTION] [{pid}] Errore nella fase {step}: {str(e)}",
+                            exc_info=True)
+                return None
+            finally:
+                results[pid]["timings"][step] = time.perf_counter() - step_start
+        
+        outputs = {}
+        with ThreadPoolExecutor(max_workers=self.config["max_workers"]) as pool:
+            futures = {pool.submit(timed, pid): pid for pid in property_ids}
+            for future in as_completed(futures):
+                pid = futures[future]
+                results[pid]["step"] = step
+                value = future.result()
+                if value:
+                    outputs[pid] = value
                 else:
-                    logger.error("[FAILED] Max retries raggiunto")
-                    return None
+                    logger.error(f"[ERROR] [{pid}] Fase {step} non riuscita")
+        return outputs
     
-    def _process_forecast_data(self, ga4_data):
+    def _log_run_summary(self, results, job_seconds):
         """
-        Processa i dati estratti e genera il forecast.
-        Usa logica semplice per calcolare trend per il giorno seguente.
+        Riepilogo per property: esito e tempi di ogni fase.
+        """
+        logger.info(f"\n{'='*70}")
+        logger.info(f"[JOB_SUMMARY] {len(results)} property in {job_seconds:.2f}s")
+        logger.info(f"{'property':<24}{'esito':<10}{'fetch':>9}{'process':>9}{'save':>9}")
+        for pid in sorted(results):
+            r = results[pid]
+            status = "OK" if r["ok"] else f"KO:{r['step']}"
+            timings = [f"{r['timings'].get(step, 0):>8.2f}s" for step in ("fetch", "process", "save")]
+            logger.info(f"{str(pid):<24}{status:<10}{''.join(timings)}")
+        logger.info(f"{'='*70}\n")
+    
+    def _fetch_ga4_data(self, property_id):
+        """
+        Sincronizza l'archivio locale con GA4 e restituisce lo storico giornaliero.
+        Scarica solo i giorni mancanti o ancora modificabili; lo storico
+        (data_retention_days) viene letto dal disco.
+        I retry (backoff esponenziale con jitter) avvengono nel client, per
+        singolo report: qui si arriva solo a retry esauriti.
         """
         try:
-            conversions = ga4_data.get("conversions", [])
-            traffic = ga4_data.get("traffic", [])
-            
-            # Calcolo media conversioni ultimi 7 giorni
-            avg_conversions = (
-                sum([c.get("conversions", 0) for c in conversions]) / 
-                max(len(conversions), 1)
-            )
+            client = self._get_client(property_id)
             
-            # Calcolo media traffico
-            avg_traffic = (
-                sum([t.get("sessions", 0) for t in traffic]) / 
-                max(len(traffic), 1)
-            )
-            
-            tomorrow = (datetime.now(self.tz) + timedelta(days=1)).date()
+            # Scarica solo i giorni nuovi, in una sola chiamata batch
+            written = self.data_store.sync(client, REPORT_NAMES)
+            logger.info(f"[SYNC] {property_id} - giorni aggiornati per report: {written}")
             
-            forecast = {
-                "forecast_date": str(tomorrow),
-                "predicted_conversions": round(avg_conversions, 2),
-                "predicted_sessions": round(avg_traffic, 2),
-                "confidence_level": "MEDIUM",  # Medium confidence da dati 7gg
-                "data_points_used": len(conversions),
-                "generated_at": datetime.now(self.tz).isoformat(),
-            }
+            data = {name: self.data_store.load(property_id, name) for name in REPORT_NAMES}
+            data["timestamp"] = datetime.now(self.tz).isoformat()
             
-            return forecast
+            return data
             
         except Exception as e:
-            logger.error(f"[ERROR] Errore nel processing: {str(e)}")
+            logger.error(f"[FAILED] [{property_id}] Estrazione fallita dopo i retry: {str(e)}")
             return None
     
-    def _save_forecast(self, forecast_data):
+    def _get_client(self, property_id):
+        """
+        GA4Client della property, creato una sola volta e riusato tra i job.
+        """
+        with self._clients_lock:
+            if property_id not in self._clients:
+                self._clients[property_id] = GA4Client(
+                    property_id=property_id,
+                    client=self.emulator,
+                    cache=self.report_cache,
+                    retry_policy=self.retry_policy,
+                    rate_limiter=self._get_rate_limiter(property_id),
+                )
+            return self._clients[property_id]
+    
+    def _get_rate_limiter(self, property_id):
+        """
+        Rate limiter della property: la quota GA4 è per property, quindi è
+        condiviso tra client sincrono e asincrono.
+        """
+        with self._clients_lock:
+            if property_id not in self._rate_limiters:
+                self._rate_limiters[property_id] = TokenBucketRateLimiter(
+                    rate_per_second=self.config["requests_per_second"],
+                )
+            return self._rate_limiters[property_id]
+    
+    async def _fetch_ga4_data_async(self, property_ids=None):
         """
-        Salva il forecast in JSON con timestamp.
+        Versione asincrona di _fetch_ga4_data: sincronizza tutte le property
+        contemporaneamente con AsyncGA4Client.
+        Un semaforo condiviso limita le richieste in volo a max_concurrency.
+        
+        Returns:
+            Dizionario property_id -> dati (None se la property è fallita)
+        """
+        property_ids = property_ids or self.config["property_ids"]
+        semaphore = asyncio.Semaphore(self.config["max_concurrency"])
+        clients = [
+            AsyncGA4Client(
+                property_id=pid,
+                client=self.emulator,
+                cache=self.report_cache,
+                semaphore=semaphore,
+                retry_policy=self.retry_policy,
+                rate_limiter=self._get_rate_limiter(pid),
+            )
+            for pid in property_ids
+        ]
+        
+        outcomes = await asyncio.gather(
+            *(self.data_store.sync_async(client, REPORT_NAMES) for client in clients),
+            return_exceptions=True,
+        )
+        
+        results = {}
+        for pid, outcome in zip(property_ids, outcomes):
+            if isinstance(outcome, Exception):
+                logger.warning(f"[ASYNC_FETCH] Property {pid} fallita: {outcome}")
+                results[pid] = None
+                continue
+            
+            logger.info(f"[SYNC] {pid} - giorni aggiornati per report: {outcome}")
+            data = {name: self.data_store.load(pid, name) for name in REPORT_NAMES}
+            data["timestamp"] = datetime.now(self.tz).isoformat()
+            results[pid] = data
+        
+        return results
+    
+    def _process_forecast_data(self, ga4_data):
+        """
+        Genera il forecast di domani per tutte le property.
+        
+        Prova prima un'elaborazione unica su tutte le property; se fallisce
+        ripiega su una per property, così una serie anomala non blocca le altre.
+        
+        Args:
+            ga4_data: Dizionario property_id -> dati estratti da _fetch_ga4_data
+            
+        Returns:
+            Dizionario property_id -> forecast (senza le property fallite)
         """
         try:
-            timestamp = datetime.now(self.tz).strftime("%Y-%m-%d_%H-%M-%S")
-            filename = self.forecast_dir / f"forecast_{timestamp}.json"
+            return self._forecast_batch(ga4_data)
+        except Exception as e:
+            logger.warning(f"[PROCESS] Elaborazione unica fallita ({e}), ripiego per property")
+        
+        forecasts = {}
+        for pid, data in ga4_data.items():
+            try:
+                forecasts.update(self._forecast_batch({pid: data}))
+            except Exception as e:
+                logger.error(f"[ERROR] [{pid}] Errore nel processing: {str(e)}", exc_info=True)
+        return forecasts
+    
+    def _forecast_batch(self, ga4_data):
+        """
+        Forecast di domani per le property indicate, in un solo passaggio per blocco.
+        
+        Le serie giornaliere (metriche x property) vengono allineate e
+        raggruppate per intervallo di storia: ogni blocco è stimato con un solo
+        passaggio del modello configurato (forecast_model), senza troncare le
+        serie più lunghe; il livello di confidenza deriva dall'ampiezza
+        dell'intervallo di previsione.
+        
+        Args:
+            ga4_data: Dizionario property_id -> dati estratti da _fetch_ga4_data
             
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(forecast_data, f, indent=2, ensure_ascii=False)
+        Returns:
+            Dizionario property_id -> forecast
+        """
+        series = {}
+        for pid, data in ga4_data.items():
+            for metric, daily in report_daily_series(data).items():
+                series[(pid, metric)] = daily
+        
+        blocks = split_by_history(align_daily_series(series))
+        if not blocks:
+            logger.error("[ERROR] Nessuna serie giornaliera disponibile")
+            return {}
+        
+        tomorrow = (datetime.now(self.tz) + timedelta(days=1)).date()
+        forecasts = {}
+        for block in blocks:
+            last_day = block.columns[-1].date()
+            horizon = max((tomorrow - last_day).days, 1)
             
-            # Mantieni solo gli ultimi 30 forecast
-            self._cleanup_old_forecasts()
+            result = forecast_matrix(
+                block.to_numpy(dtype=float),
+                self.config["forecast_model"],
+                horizon,
+                first_weekday=block.columns[0].weekday(),
+                interval=self.config["forecast_interval"],
+            )
+            levels = result.confidence_level[:, -1]
             
-            return str(filename)
+            for row, (pid, metric) in enumerate(block.index):
+                forecast = forecasts.setdefault(pid, {
+                    "forecast_date": str(tomorrow),
+                    "model": self.config["forecast_model"],
+                    "interval": self.config["forecast_interval"],
+                    "confidence_by_metric": {},
+                    "data_points_used": block.shape[1],
+                    "generated_at": datetime.now(self.tz).isoformat(),
+                })
+                forecast["data_points_used"] = min(forecast["data_points_used"], block.shape[1])
+                forecast[f"predicted_{metric}"] = round(float(result.mean[row, -1]), 2)
+                forecast[f"{metric}_interval"] = [
+                    round(float(result.lower[row, -1]), 2),
+                    round(float(result.upper[row, -1]), 2),
+                ]
+                forecast["confidence_by_metric"][metric] = levels[row]
+        
+        # La confidenza complessiva è quella della metrica meno affidabile
+        for forecast in forecasts.values():
+            by_metric = forecast["confidence_by_metric"].values()
+            forecast["confidence_level"] = min(by_metric, key=CONFIDENCE_ORDER.index)
+        
+        return forecasts
+    
+    def _save_forecast(self, forecast_data, property_id):
+        """
+        Aggiunge il forecast allo storico SQLite.
+        
+        Returns:
+            run_id del forecast salvato, None in caso di errore
+        """
+        try:
+            run_id = self.forecast_history.append(property_id, forecast_data)
+            logger.info(f"[OK] [{property_id}] Forecast salvato nello storico (run {run_id})")
+            return run_id
             
         except Exception as e:
             logger.error(f"[ERROR] Errore nel salvataggio: {str(e)}")
             return None
     
-    def _cleanup_old_forecasts(self):
+    def _prune_forecast_history(self):
         """
-        Mantiene solo gli ultimi 30 file di forecast.
+        Applica la retention dello storico dei forecast (una volta per job).
         """
         try:
-            forecasts = sorted(self.forecast_dir.glob("forecast_*.json"))
-            
-            if len(forecasts) > 30:
-                for old_file in forecasts[:-30]:
-                    old_file.unlink()
-                    logger.info(f"[CLEANUP] Rimosso forecast vecchio: {old_file.name}")
-                    
+            removed = self.forecast_history.prune()
+            if removed:
+                logger.info(f"[CLEANUP] Rimossi {removed} forecast oltre la retention")
+                
         except Exception as e:
             logger.warning(f"[CLEANUP] Errore nella pulizia: {str(e)}")
     
+    def get_forecast_accuracy(self, property_id, days=30):
+        """
+        Forecast vs valori reali archiviati per gli ultimi days giorni.
+        """
+        data = {name: self.data_store.load(property_id, name, days=days) for name in REPORT_NAMES}
+        return self.forecast_history.forecast_vs_actual(
+            property_id, report_daily_series(data), days=days
+        )
+    
     def _send_alert(self, subject, message):
         """
-        Invia alert via email (opzionale - implementa il tuo servizio)
+        Logga l'alert e lo accoda per l'invio email in background (non blocca il job).
         """
         try:
             logger.info(f"[ALERT] {subject}: {message}")
-            # TODO: Integrare con EmailService
+            if self.alert_dispatcher is not None:
+                self.alert_dispatcher.submit([self.config["admin_email"]], subject, text=message)
             
         except Exception as e:
             logger.warning(f"[ALERT_FAILED] Errore invio alert: {str(e)}")
@@ -289,6 +544,9 @@ class GA4ForecastScheduler:
         """
         try:
             self.scheduler.shutdown()
+            # Il dispatcher è condiviso: si attende l'invio, la chiusura avviene all'uscita
+            if self.alert_dispatcher is not None:
+                self.alert_dispatcher.flush(timeout=30)
             logger.info("[SCHEDULER_STOPPED] Scheduler fermato")
         except Exception as e:
             logger.error(f"[ERROR] Errore nell'arresto: {str(e)}")
@@ -4,18 +4,52 @@
 # Gestisce alerts per metriche critiche
 
 import json
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
+import pandas as pd
 import requests
 
+from ga4_alert_delivery import AlertDispatcher, shared_dispatcher
+from ga4_alert_rules import AlertRuleEngine
+from ga4_sessionization import compile_goals, daily_aggregates, read_events, sessionize
+
+# Alert predefiniti: le condizioni sono valutate da ga4_alert_rules
+DEFAULT_ALERTS = [
+    {
+        'name': 'Traffic Drop Alert',
+        'condition': 'sessions_daily < (avg_weekly * 0.70)',
+        'threshold': 70,
+        'severity': 'HIGH'
+    },
+    {
+        'name': 'High Bounce Rate Alert',
+        'condition': 'bounce_rate > 60',
+        'threshold': 60,
+        'severity': 'MEDIUM'
+    },
+    {
+        'name': 'Zero Conversions Alert',
+        'condition': 'daily_conversions == 0 for 2+ days',
+        'threshold': 0,
+        'severity': 'HIGH'
+    },
+    {
+        'name': 'Conversion Spike Alert',
+        'condition': 'daily_conversions > (avg_daily * 1.5)',
+        'threshold': 150,
+        'severity': 'LOW'
+    }
+]
+
 class GA4GoalsManager:
-    def __init__(self, property_id: str, admin_email: str):
+    def __init__(self, property_id: str, admin_email: str,
+                 dispatcher: Optional[AlertDispatcher] = None):
         self.property_id = property_id
         self.admin_email = admin_email
         self.goals_config = self._load_goals_config()
+        # Invio email in background su un dispatcher condiviso da tutti i manager
+        # del processo, svuotato all'uscita (SMTP_HOST non impostato: nessun invio)
+        self.dispatcher = dispatcher if dispatcher is not None else shared_dispatcher()
         
     def _load_goals_config(self) -> Dict:
         """
@@ -78,34 +112,8 @@ class GA4GoalsManager:
         Configura gli alert automatici.
         """
         alerts = [
-            {
-                'name': 'Traffic Drop Alert',
-                'condition': 'sessions_daily < (avg_weekly * 0.70)',
-                'threshold': 70,
-                'enabled': True,
-                'email_recipients': [self.admin_email]
-            },
-            {
-                'name': 'High Bounce Rate Alert',
-                'condition': 'bounce_rate > 60',
-                'threshold': 60,
-                'enabled': True,
-                'email_recipients': [self.admin_email]
-            },
-            {
-                'name': 'Zero Conversions Alert',
-                'condition': 'daily_conversions == 0 for 2+ days',
-                'threshold': 0,
-                'enabled': True,
-                'email_recipients': [self.admin_email]
-            },
-            {
-                'name': 'Conversion Spike Alert',
-                'condition': 'daily_conversions > (avg_daily * 1.5)',
-                'threshold': 150,
-                'enabled': True,
-                'email_recipients': [self.admin_email]
-            }
+            {**alert, 'enabled': True, 'email_recipients': [self.admin_email]}
+            for alert in DEFAULT_ALERTS
         ]
         
         print(f"\n✓ {len(alerts)} alert configurati")
@@ -114,80 +122,125 @@ class GA4GoalsManager:
         
         return alerts
     
-    def check_alert_conditions(self, metrics: Dict) -> List[Dict]:
+    def check_alert_conditions(self, daily_metrics: pd.DataFrame) -> List[Dict]:
         """
-        Verifica le condizioni degli alert.
+        Verifica le condizioni degli alert sull'ultimo giorno della property.
         
         Args:
-            metrics: Dizionario con metriche attuali
+            daily_metrics: Una riga per giorno con date, sessions, conversions e
+                           bounce_rate (in %); i giorni precedenti servono alle
+                           medie mobili e alle condizioni su più giorni
             
         Returns:
-            Lista degli alert attivati
+            Lista degli alert attivati (vedi evaluate_alert_rules)
+        """
+        if 'property_id' not in daily_metrics:
+            daily_metrics = daily_metrics.assign(property_id=self.property_id)
+        return self.evaluate_alert_rules(daily_metrics, latest_only=True)
+    
+    def evaluate_alert_rules(self, daily_metrics: pd.DataFrame,
+                             alerts: Optional[List[Dict]] = None,
+                             latest_only: bool = True) -> List[Dict]:
         """
-        triggered_alerts = []
+        Valuta le condizioni degli alert su metriche giornaliere di più property.
         
-        # Check Traffic Drop
-        if metrics.get('traffic_drop_detected'):
-            triggered_alerts.append({
-                'alert': 'Traffic Drop Alert',
-                'severity': 'HIGH',
-                'value': metrics['current_sessions'],
-                'message': f"Calo del traffico rilevato. Sessioni: {metrics['current_sessions']}"
-            })
+        Le condizioni sono compilate una sola volta e applicate all'intero
+        DataFrame in forma vettoriale (finestre e medie mobili per property).
         
-        # Check High Bounce Rate
-        if metrics.get('bounce_rate', 0) > 60:
-            triggered_alerts.append({
-                'alert': 'High Bounce Rate Alert',
-                'severity': 'MEDIUM',
-                'value': metrics['bounce_rate'],
-                'message': f"Bounce rate elevato: {metrics['bounce_rate']}%"
-            })
+        Args:
+            daily_metrics: Una riga per property e giorno con colonne property_id,
+                           date, sessions, conversions, bounce_rate (in %)
+            alerts: Alert da valutare (default: DEFAULT_ALERTS)
+            latest_only: Valuta solo l'ultimo giorno di ogni property
+            
+        Returns:
+            Lista degli alert attivati con alert, severity, value, message,
+            property_id e date
+        """
+        engine = AlertRuleEngine(alerts or DEFAULT_ALERTS)
+        triggered = engine.evaluate(daily_metrics, latest_only=latest_only)
         
-        # Check Zero Conversions
-        if metrics.get('daily_conversions', 0) == 0:
-            triggered_alerts.append({
-                'alert': 'Zero Conversions Alert',
-                'severity': 'HIGH',
-                'value': 0,
-                'message': "Nessuna conversione rilevata oggi"
-            })
+        return [
+            {
+                'alert': row.alert,
+                'severity': row.severity,
+                'value': row.value,
+                'message': f"{row.message} (valore: {row.value:g}, soglia: {row.limit:g})",
+                'property_id': row.property_id,
+                'date': pd.Timestamp(row.date).strftime('%Y-%m-%d')
+            }
+            for row in triggered.itertuples(index=False)
+        ]
+    
+    def flush_alerts(self, timeout: float = 30.0) -> bool:
+        """
+        Attende l'invio delle email di alert accodate.
+        
+        Returns:
+            True se tutte le email accodate sono state consegnate entro timeout
+        """
+        if self.dispatcher is None:
+            return True
+        failed_before = self.dispatcher.stats['failed_alerts']
+        flushed = self.dispatcher.flush(timeout)
+        return flushed and self.dispatcher.stats['failed_alerts'] == failed_before
+    
+    def daily_metrics_from_export(self, paths, workers: int = 1) -> pd.DataFrame:
+        """
+        Calcola in locale le metriche giornaliere dall'export BigQuery di GA4.
+        
+        Gli eventi grezzi (Parquet o NDJSON) vengono ricostruiti in sessioni
+        con i goal di ga4_goals.json: il risultato contiene bounce_rate,
+        pages_per_session, avg_session_duration e i conteggi dei goal, ed è
+        già nel formato di evaluate_alert_rules.
         
-        return triggered_alerts
+        Args:
+            paths: File, directory o glob dell'export
+            workers: Processi per la sessionizzazione (partizionata per utente)
+        """
+        goals = compile_goals(self.goals_config['goals'])
+        sessions = sessionize(read_events(paths, goals), goals, workers=workers)
+        return daily_aggregates(sessions, property_id=self.property_id)
     
     def send_alert_email(self, alert: Dict) -> bool:
         """
-        Invia email di alert.
+        Accoda l'email di alert per l'invio in background.
+        
+        Gli alert attivati insieme vengono raggruppati in un unico digest per
+        destinatario; la chiamata non attende l'invio (vedi flush_alerts, gli
+        alert in coda vengono comunque inviati prima dell'uscita del processo).
+        
+        Returns:
+            True se l'alert è stato accodato
         """
-        try:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f"[GA4 Alert] {alert['alert']} - {alert['severity']}"
-            msg['From'] = 'ga4-alerts@artax-studio.it'
-            msg['To'] = self.admin_email
-            
-            html = f"""
-            <html>
-              <head></head>
-              <body>
-                <h2 style="color: #d32f2f;">{alert['alert']}</h2>
-                <p><strong>Gravità:</strong> {alert['severity']}</p>
-                <p><strong>Valore:</strong> {alert['value']}</p>
-                <p><strong>Messaggio:</strong> {alert['message']}</p>
-                <p><strong>Timestamp:</strong> {datetime.now().isoformat()}</p>
-                <hr>
-                <p>Accedi a Google Analytics per visualizzare i dettagli completi.</p>
-              </body>
-            </html>
-            """
-            
-            msg.attach(MIMEText(html, 'html'))
-            
-            print(f"✓ Email di alert inviata: {alert['alert']} ({alert['severity']})")
-            return True
-            
-        except Exception as e:
-            print(f"✗ Errore nell'invio dell'email: {e}")
+        if self.dispatcher is None:
+            print(f"✗ SMTP non configurato (SMTP_HOST): alert non inviato: {alert['alert']}")
             return False
+        
+        property_line = (f"<p><strong>Property:</strong> {alert['property_id']}</p>"
+                         if 'property_id' in alert else "")
+        html = f"""
+            <h2 style="color: #d32f2f;">{alert['alert']}</h2>
+            {property_line}
+            <p><strong>Gravità:</strong> {alert['severity']}</p>
+            <p><strong>Valore:</strong> {alert['value']}</p>
+            <p><strong>Messaggio:</strong> {alert['message']}</p>
+            <p><strong>Timestamp:</strong> {datetime.now().isoformat()}</p>
+            <hr>
+            <p>Accedi a Google Analytics per visualizzare i dettagli completi.</p>
+            """
+        
+        queued = self.dispatcher.submit(
+            [self.admin_email],
+            f"[GA4 Alert] {alert['alert']} - {alert['severity']}",
+            html=html,
+            severity=alert['severity'],
+        )
+        if queued:
+            print(f"✓ Email di alert accodata: {alert['alert']} ({alert['severity']})")
+        else:
+            print(f"✗ Coda di invio piena: alert scartato: {alert['alert']}")
+        return queued
     
     def generate_report(self, client) -> Dict:
         """
@@ -201,7 +254,7 @@ class GA4GoalsManager:
             'summary': {
                 'goals_configured': len(self.goals_config['goals']),
                 'funnel_steps': len(self.goals_config['conversion_funnel']['steps']),
-                'alerts_active': 4
+                'alerts_active': len(DEFAULT_ALERTS)
             },
             'metrics': {
                 'sessions_7d': 'N/A',
@@ -239,13 +292,13 @@ if __name__ == "__main__":
     
     # Simula check degli alert
     print("\n4. Verifica Alert Conditions...")
-    metrics = {
-        'traffic_drop_detected': False,
-        'bounce_rate': 35,
-        'daily_conversions': 5,
-        'current_sessions': 125
-    }
-    triggered = manager.check_alert_conditions(metrics)
+    daily_metrics = pd.DataFrame({
+        'date': pd.date_range(end=pd.Timestamp.today().normalize(), periods=14),
+        'sessions': [140] * 13 + [125],
+        'conversions': [4] * 13 + [5],
+        'bounce_rate': [38] * 13 + [35]
+    })
+    triggered = manager.check_alert_conditions(daily_metrics)
     if triggered:
         print(f"  {len(triggered)} alert attivato/i")
     else:
@@ -254,6 +307,7 @@ if __name__ == "__main__":
     # Genera report
     print("\n5. Generazione Report...")
     report = manager.generate_report(None)
+    manager.flush_alerts()
     
     print("\n" + "=" * 60)
     print("COMPLETATO")
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# GA4 Query Planner
+# Unisce report logici compatibili in meno richieste fisiche e ricostruisce le viste in locale
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from google.analytics.data_v1beta.types import (
+    Dimension,
+    Filter,
+    FilterExpression,
+    FilterExpressionList,
+    Metric,
+    RunReportRequest,
+)
+
+from ga4_api_client import DEFAULT_PAGE_SIZE, MAX_BATCH_SIZE, MAX_DIMENSIONS, MAX_METRICS
+
+# Metriche di evento: ogni evento ha un solo valore per ogni dimensione,
+# quindi si sommano tra righe su qualsiasi dimensione
+EVENT_SCOPED_METRICS = {
+    "eventCount",
+    "conversions",
+    "keyEvents",
+    "screenPageViews",
+    "purchaseRevenue",
+    "totalRevenue",
+    "userEngagementDuration",
+}
+
+# Metriche di sessione: si sommano solo su dimensioni con un valore per sessione
+# (sommate su eventName o pagePath conterebbero la sessione una volta per valore)
+SESSION_SCOPED_METRICS = {"sessions", "engagedSessions", "newUsers"}
+
+SESSION_SCOPED_DIMENSIONS = {
+    "source",
+    "medium",
+    "sessionSource",
+    "sessionMedium",
+    "sessionDefaultChannelGroup",
+    "sessionCampaignName",
+    "country",
+    "city",
+    "region",
+    "deviceCategory",
+    "operatingSystem",
+    "browser",
+    "newVsReturning",
+}
+
+# Metriche che si possono sommare tra righe (le altre sono conteggi distinti o rapporti)
+ADDITIVE_METRICS = EVENT_SCOPED_METRICS | SESSION_SCOPED_METRICS
+
+# Campi della richiesta che impediscono l'unione con altre richieste
+_UNMERGEABLE_FIELDS = ("metric_filter", "cohort_spec", "comparisons")
+
+def summable(metrics: List[str], dimensions) -> bool:
+    """
+    True se le metriche si possono sommare eliminando le dimensioni indicate.
+    """
+    if not dimensions:
+        return True
+    if any(m not in ADDITIVE_METRICS for m in metrics):
+        return False
+    if any(m in SESSION_SCOPED_METRICS for m in metrics):
+        return set(dimensions) <= SESSION_SCOPED_DIMENSIONS
+    return True
+
+class UnsupportedFilter(Exception):
+    """
+    Filtro che il planner non sa valutare localmente.
+    """
+
+@dataclass
+class View:
+    """
+    Report logico ricavato da una richiesta fisica.
+    """
+    physical: str
+    dimensions: List[str]
+    metrics: List[str]
+    dimension_filter: Optional[FilterExpression] = None
+    order_bys: list = field(default_factory=list)
+    aggregate: bool = False
+
+@dataclass
+class _Group:
+    dimensions: List[str]
+    metrics: List[str]
+    members: List[str]
+    template: RunReportRequest
+    frozen: bool = False  # Dimensioni fissate da un report con metriche non additive
+    # (dimensioni, metriche) dei membri additivi, ricavati sommando le righe
+    additive_members: List[tuple] = field(default_factory=list)
+
+@dataclass
+class QueryPlan:
+    physical: Dict[str, RunReportRequest]
+    views: Dict[str, View]
+
+    @property
+    def logical_requests(self) -> int:
+        return len(self.views)
+
+    @property
+    def physical_requests(self) -> int:
+        return len(self.physical)
+
+    @property
+    def saved_requests(self) -> int:
+        return self.logical_requests - self.physical_requests
+
+    def summary(self) -> Dict:
+        """
+        Richieste e round-trip (batchRunReports) risparmiati dal piano.
+        """
+        def round_trips(n):
+            return -(-n // MAX_BATCH_SIZE)
+
+        return {
+            "logical_requests": self.logical_requests,
+            "physical_requests": self.physical_requests,
+            "saved_requests": self.saved_requests,
+            "batch_round_trips": round_trips(self.physical_requests),
+            "saved_round_trips": round_trips(self.logical_requests) - round_trips(self.physical_requests),
+        }
+
+def filter_fields(expression: Optional[FilterExpression]) -> Set[str]:
+    """
+    Dimensioni usate da un filtro.
+
+    Raises:
+        UnsupportedFilter: Filtri numerici o tipi di espressione non gestiti
+    """
+    if expression is None:
+        return set()
+    kind = FilterExpression.pb(expression).WhichOneof("expr")
+    if kind in ("and_group", "or_group"):
+        return set().union(*(filter_fields(e) for e in getattr(expression, kind).expressions))
+    if kind == "not_expression":
+        return filter_fields(expression.not_expression)
+    if kind == "filter":
+        if Filter.pb(expression.filter).WhichOneof("one_filter") not in ("string_filter", "in_list_filter"):
+            raise UnsupportedFilter(expression.filter.field_name)
+        return {expression.filter.field_name}
+    raise UnsupportedFilter(kind)
+
+def filter_mask(expression: Optional[FilterExpression], df: pd.DataFrame) -> np.ndarray:
+    """
+    Valuta localmente un filtro su dimensioni con la stessa semantica dell'API
+    (confronti non sensibili alle maiuscole salvo case_sensitive).
+    """
+    if expression is None:
+        return np.ones(len(df), dtype=bool)
+    kind = FilterExpression.pb(expression).WhichOneof("expr")
+    if kind == "and_group":
+        return np.logical_and.reduce([filter_mask(e, df) for e in expression.and_group.expressions])
+    if kind == "or_group":
+        return np.logical_or.reduce([filter_mask(e, df) for e in expression.or_group.expressions])
+    if kind == "not_expression":
+        return ~filter_mask(expression.not_expression, df)
+
+    f = expression.filter
+    values = df[f.field_name].astype(str)
+    if Filter.pb(f).WhichOneof("one_filter") == "in_list_filter":
+        options = list(f.in_list_filter.values)
+        if not f.in_list_filter.case_sensitive:
+            values, options = values.str.lower(), [o.lower() for o in options]
+        return values.isin(options).to_numpy()
+
+    sf = f.string_filter
+    target = sf.value
+    if not sf.case_sensitive:
+        values, target = values.str.lower(), target.lower()
+    match_type = Filter.StringFilter.MatchType
+    if sf.match_type in (match_type.EXACT, match_type.MATCH_TYPE_UNSPECIFIED):
+        return (values == target).to_numpy()
+    if sf.match_type == match_type.BEGINS_WITH:
+        return values.str.startswith(target).to_numpy()
+    if sf.match_type == match_type.ENDS_WITH:
+        return values.str.endswith(target).to_numpy()
+    if sf.match_type == match_type.CONTAINS:
+        return values.str.contains(target, regex=False).to_numpy()
+    flags = 0 if sf.case_sensitive else re.IGNORECASE
+    if sf.match_type == match_type.FULL_REGEXP:
+        return df[f.field_name].astype(str).str.fullmatch(sf.value, flags=flags).to_numpy()
+    return df[f.field_name].astype(str).str.contains(sf.value, flags=flags, regex=True).to_numpy()
+
+def _merge_key(request: RunReportRequest):
+    """
+    Richieste con la stessa chiave interrogano la stessa property sullo stesso periodo.
+    """
+    ranges = tuple((r.start_date, r.end_date, r.name) for r in request.date_ranges)
+    return request.property, ranges, request.currency_code
+
+def _mergeable(request: RunReportRequest) -> bool:
+    if request.limit or request.offset or request.keep_empty_rows or request.metric_aggregations:
+        return False
+    if any(name in request for name in _UNMERGEABLE_FIELDS):
+        return False
+    try:
+        filter_fields(request.dimension_filter if "dimension_filter" in request else None)
+    except UnsupportedFilter:
+        return False
+    return True
+
+def _fits(group: _Group, dimensions: List[str], needed: Set[str], metrics: List[str],
+          additive: bool, max_dimensions: int) -> Optional[List[str]]:
+    """
+    Dimensioni della richiesta fisica se il report può esservi aggiunto, altrimenti None.
+
+    Ogni membro additivo deve restare ricavabile: le dimensioni su cui
+    viene sommato devono essere compatibili con le sue metriche (summable).
+    """
+    if len(set(group.metrics) | set(metrics)) > MAX_METRICS:
+        return None
+    if group.frozen:
+        if additive:
+            merged = group.dimensions if needed <= set(group.dimensions) else None
+        else:
+            merged = group.dimensions if needed <= set(dimensions) == set(group.dimensions) else None
+    elif not additive:
+        # Un report non additivo fissa le dimensioni: tutti i membri devono esservi contenuti
+        merged = dimensions if set(group.dimensions) <= set(dimensions) and needed <= set(dimensions) else None
+    else:
+        merged = list(dict.fromkeys(group.dimensions + dimensions + sorted(needed)))
+        merged = merged if len(merged) <= max_dimensions else None
+    if merged is None:
+        return None
+
+    members = group.additive_members + ([(dimensions, metrics)] if additive else [])
+    if not all(summable(m, set(merged) - set(d)) for d, m in members):
+        return None
+    return merged
+
+def plan_requests(requests: Dict[str, RunReportRequest],
+                  max_dimensions: int = MAX_DIMENSIONS) -> QueryPlan:
+    """
+    Unisce report logici compatibili nel minor numero di richieste fisiche.
+
+    Due report si uniscono se interrogano property e periodo uguali e le
+    loro dimensioni (più quelle usate dai filtri) stanno in una richiesta
+    più ampia. Un report con sole metriche additive (ADDITIVE_METRICS) si
+    ricava sommando le righe della richiesta più ampia (le metriche di
+    sessione solo su dimensioni di sessione, vedi summable); uno con metriche
+    non additive (utenti, rapporti) solo da una richiesta con le sue
+    stesse dimensioni. I filtri su dimensioni vengono riapplicati in locale
+    e la richiesta fisica usa il loro OR. Le richieste con limit, offset,
+    filtri su metriche o filtri non valutabili restano invariate.
+
+    Più dimensioni aumentano la cardinalità: max_dimensions limita la
+    larghezza delle richieste unite (oltre le soglie GA4 raggruppa le
+    righe rare in "(other)").
+
+    Args:
+        requests: Nome report -> RunReportRequest
+        max_dimensions: Dimensioni massime per richiesta fisica
+
+    Returns:
+        QueryPlan con richieste fisiche e viste da ricostruire
+    """
+    groups: Dict[str, _Group] = {}
+    views: Dict[str, View] = {}
+    by_key: Dict[tuple, List[str]] = {}
+
+    def add_group(name, request, dimensions, metrics, frozen, member_dimensions=None):
+        physical = f"q{len(groups)}"
+        group = _Group(list(dimensions), list(metrics), [name], request, frozen)
+        if not frozen:
+            group.additive_members.append((member_dimensions or list(dimensions), list(metrics)))
+        groups[physical] = group
+        return physical
+
+    # Prima i report non additivi: fissano le dimensioni delle richieste fisiche
+    ordered = sorted(requests, key=lambda n: all(m.name in ADDITIVE_METRICS for m in requests[n].metrics))
+    for name in ordered:
+        request = requests[name]
+        dimensions = [d.name for d in request.dimensions]
+        metrics = [m.name for m in request.metrics]
+        dimension_filter = request.dimension_filter if "dimension_filter" in request else None
+        view = View("", dimensions, metrics, dimension_filter, list(request.order_bys))
+        views[name] = view
+
+        if not _mergeable(request):
+            view.physical = add_group(name, request, dimensions, metrics, frozen=True)
+            continue
+
+        needed = set(dimensions) | filter_fields(dimension_filter)
+        additive = all(m in ADDITIVE_METRICS for m in metrics)
+        if not additive and not needed <= set(dimensions):
+            # Il filtro usa dimensioni non richieste: resta lato server
+            view.physical = add_group(name, request, dimensions, metrics, frozen=True)
+            continue
+
+        key = _merge_key(request)
+        for physical in by_key.get(key, []):
+            group = groups[physical]
+            merged = _fits(group, dimensions, needed, metrics, additive, max_dimensions)
+            if merged is not None:
+                group.dimensions = merged
+                group.metrics += [m for m in metrics if m not in group.metrics]
+                group.members.append(name)
+                if additive:
+                    group.additive_members.append((dimensions, metrics))
+                group.frozen = group.frozen or not additive
+                view.physical = physical
+                break
+        else:
+            view.physical = add_group(name, request, dimensions + sorted(needed - set(dimensions)),
+                                      metrics, frozen=not additive, member_dimensions=dimensions)
+            by_key.setdefault(key, []).append(view.physical)
+
+    physical_requests = {}
+    for physical, group in groups.items():
+        member_views = [views[m] for m in group.members]
+        if len(member_views) == 1:
+            # Nessuna unione: la richiesta originale, con filtri e ordinamento lato server
+            physical_requests[physical] = group.template
+            member_views[0].dimension_filter, member_views[0].order_bys = None, []
+            continue
+
+        request = RunReportRequest(
+            property=group.template.property,
+            date_ranges=list(group.template.date_ranges),
+            dimensions=[Dimension(name=d) for d in group.dimensions],
+            metrics=[Metric(name=m) for m in group.metrics],
+        )
+        filters = [v.dimension_filter for v in member_views]
+        if all(f is not None for f in filters):
+            request.dimension_filter = FilterExpression(
+                or_group=FilterExpressionList(expressions=filters)
+            )
+        physical_requests[physical] = request
+        for view in member_views:
+            view.aggregate = set(view.dimensions) != set(group.dimensions)
+
+    return QueryPlan(physical_requests, {name: views[name] for name in requests})
+
+def derive_view(df: pd.DataFrame, view: View) -> pd.DataFrame:
+    """
+    Ricostruisce un report logico dal DataFrame della richiesta fisica.
+    """
+    if view.dimension_filter is not None and len(df):
+        df = df[filter_mask(view.dimension_filter, df)]
+    if view.aggregate:
+        df = df.groupby(view.dimensions, observed=True, sort=False)[view.metrics].sum().reset_index()
+    df = df[view.dimensions + view.metrics]
+
+    if view.order_bys:
+        columns, ascending = [], []
+        for order in view.order_bys:
+            kind = type(order).pb(order).WhichOneof("one_order_by")
+            columns.append(order.metric.metric_name if kind == "metric" else order.dimension.dimension_name)
+            ascending.append(not order.desc)
+        df = df.sort_values(columns, ascending=ascending, kind="stable")
+    return df.reset_index(drop=True)
+
+def run_planned(client, requests: Dict[str, RunReportRequest], page_size: int = DEFAULT_PAGE_SIZE,
+                max_dimensions: int = MAX_DIMENSIONS):
+    """
+    Esegue i report tramite il piano: richieste fisiche con run_reports_batch
+    del client (cache, retry e paginazione invariati), viste in locale.
+
+    Returns:
+        (nome report -> DataFrame, QueryPlan)
+    """
+    plan = plan_requests(requests, max_dimensions)
+    frames = client.run_reports_batch(plan.physical, page_size=page_size)
+    return {name: derive_view(frames[view.physical], view) for name, view in plan.views.items()}, plan
+
+async def run_planned_async(client, requests: Dict[str, RunReportRequest],
+                            page_size: int = DEFAULT_PAGE_SIZE, max_dimensions: int = MAX_DIMENSIONS):
+    """
+    Come run_planned, con AsyncGA4Client.
+    """
+    plan = plan_requests(requests, max_dimensions)
+    frames = await client.run_reports_batch(plan.physical, page_size=page_size)
+    return {name: derive_view(frames[view.physical], view) for name, view in plan.views.items()}, plan
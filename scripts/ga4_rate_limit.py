@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# GA4 Retry & Rate Limiting
+# Backoff esponenziale con jitter e rate limiting basato sulla quota GA4
+
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime
+
+from google.api_core import exceptions as api_exceptions
+
+class QuotaExhausted(api_exceptions.ResourceExhausted):
+    """
+    Quota oraria della property esaurita: inutile ritentare prima del rinnovo.
+    """
+
+# Errori transitori per cui ha senso ritentare
+RETRYABLE_EXCEPTIONS = (
+    api_exceptions.ServerError,
+    api_exceptions.TooManyRequests,
+    api_exceptions.Aborted,
+    ConnectionError,
+    TimeoutError,
+)
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 retryable=RETRYABLE_EXCEPTIONS, sleep=time.sleep):
+        """
+        Politica di retry con backoff esponenziale e "full jitter".
+
+        Il ritardo prima del tentativo n (da 0) è casuale in
+        [0, min(max_delay, base_delay * 2**n)]: i client che falliscono
+        insieme non ritentano tutti nello stesso istante.
+
+        Args:
+            max_retries: Ritentativi dopo il primo tentativo
+            base_delay: Ritardo di base in secondi
+            max_delay: Tetto del ritardo in secondi
+            retryable: Eccezioni considerate transitorie
+            sleep: Funzione di attesa (sostituibile nei test)
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable
+        self.sleep = sleep
+
+    def delay(self, attempt: int) -> float:
+        """
+        Ritardo da attendere dopo il tentativo fallito numero attempt (da 0).
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def is_retryable(self, exc: Exception) -> bool:
+        return isinstance(exc, self.retryable) and not isinstance(exc, QuotaExhausted)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Esegue fn ritentando sugli errori transitori; rilancia l'ultimo errore.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                self.sleep(self.delay(attempt))
+
+    async def call_async(self, fn, *args, **kwargs):
+        """
+        Come call, per coroutine: l'attesa non blocca l'event loop.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+                await asyncio.sleep(self.delay(attempt))
+
+class TokenBucketRateLimiter:
+    def __init__(self, rate_per_second: float = 5.0, capacity: int = 10,
+                 reserve_requests: int = 50):
+        """
+        Token bucket che rallenta quando la quota oraria GA4 si avvicina alla fine.
+
+        Ogni richiesta consuma un token; i token si ricaricano a rate_per_second.
+        update_from_quota legge la PropertyQuota restituita dall'API (con
+        return_property_quota=True) e, quando restano meno di reserve_requests
+        richieste nell'ora, distribuisce quelle rimaste fino allo scadere dell'ora.
+        Allo scadere dell'ora il rate torna a rate_per_second; a quota esaurita
+        acquire solleva QuotaExhausted invece di attendere il rinnovo.
+
+        Args:
+            rate_per_second: Richieste al secondo a regime
+            capacity: Raffica massima consentita
+            reserve_requests: Soglia di richieste residue sotto cui rallentare
+        """
+        self.base_rate = rate_per_second
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.reserve_requests = reserve_requests
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.last_quota = None
+        self.quota_reset_at = None  # time.monotonic() del rinnovo della quota oraria
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Attende (bloccando) finché è disponibile un token.
+        
+        Raises:
+            QuotaExhausted: Quota oraria esaurita fino al rinnovo
+        """
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """
+        Come acquire, senza bloccare l'event loop.
+        """
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def update_from_quota(self, property_quota):
+        """
+        Adegua il rate alla quota oraria residua della property.
+
+        Args:
+            property_quota: PropertyQuota della risposta (ignorata se vuota)
+        """
+        hourly = property_quota.tokens_per_hour if property_quota else None
+        if not hourly or not (hourly.consumed or hourly.remaining):
+            return
+
+        with self._lock:
+            self.last_quota = {"consumed": hourly.consumed, "remaining": hourly.remaining}
+            # Costo medio in token di una richiesta, stimato dall'ultima risposta
+            cost = max(hourly.consumed, 1)
+            requests_left = hourly.remaining / cost
+
+            if requests_left >= self.reserve_requests:
+                self.rate = self.base_rate
+                self.quota_reset_at = None
+                return
+
+            seconds_to_hour_end = _seconds_to_hour_end()
+            self.rate = min(self.base_rate, max(requests_left, 0) / seconds_to_hour_end)
+            self.quota_reset_at = time.monotonic() + seconds_to_hour_end
+
+    def _reserve(self) -> float:
+        """
+        Prende un token se disponibile; altrimenti restituisce i secondi da attendere.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.quota_reset_at is not None and now >= self.quota_reset_at:
+                # Nuova ora: la quota è rinnovata anche senza nuove risposte dell'API
+                self.rate = self.base_rate
+                self.quota_reset_at = None
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            if self.rate <= 0:
+                reset_in = (self.quota_reset_at or now) - now
+                raise QuotaExhausted(f"Quota oraria GA4 esaurita: rinnovo tra {reset_in:.0f}s")
+            return (1 - self.tokens) / self.rate
+
+def _seconds_to_hour_end() -> int:
+    now = datetime.now()
+    return max(3600 - (now.minute * 60 + now.second), 1)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# GA4 Report Cache
+# Cache su disco dei report GA4, indirizzata per contenuto della richiesta
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from google.analytics.data_v1beta.types import RunReportRequest
+
+# Date relative accettate dall'API ("today", "yesterday", "NdaysAgo")
+RELATIVE_DATE_RE = re.compile(r"^(\d+)daysAgo$")
+
+class ReportCache:
+    def __init__(self, cache_dir: str = "cache/ga4", max_bytes: int = 512 * 1024 ** 2,
+                 today_ttl_seconds: int = 900, settle_days: int = 0):
+        """
+        Inizializza la cache dei report.
+
+        Args:
+            cache_dir: Directory in cui salvare i file Parquet e l'indice
+            max_bytes: Dimensione massima della cache; oltre si rimuovono gli LRU
+            today_ttl_seconds: Validità dei report il cui periodo include oggi
+            settle_days: Giorni prima di oggi ancora modificabili da GA4, trattati come oggi
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.today_ttl_seconds = today_ttl_seconds
+        self.settle_days = settle_days
+        self.index_path = self.cache_dir / "index.json"
+        self.index = self._load_index()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @property
+    def stats(self) -> dict:
+        """
+        Contatori di hit/miss/eviction e occupazione corrente.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.index),
+            "bytes": sum(entry["size"] for entry in self.index.values()),
+        }
+
+    @staticmethod
+    def key(request: RunReportRequest) -> str:
+        """
+        Chiave della cache: hash SHA-256 della richiesta serializzata.
+        """
+        payload = RunReportRequest.pb(request).SerializeToString(deterministic=True)
+        return hashlib.sha256(payload).hexdigest()
+
+    def get(self, request: RunReportRequest) -> Optional[pd.DataFrame]:
+        """
+        Restituisce il DataFrame in cache, oppure None se assente o scaduto.
+        """
+        key = self.key(request)
+        with self._lock:
+            entry = self.index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at = entry["expires_at"]
+            if expires_at is not None and expires_at <= time.time():
+                self._remove(key)
+                self._save_index()
+                self.misses += 1
+                return None
+
+            try:
+                df = pd.read_parquet(self._path(key))
+            except (OSError, ValueError):
+                # File mancante o corrotto: trattato come miss
+                self._remove(key)
+                self._save_index()
+                self.misses += 1
+                return None
+
+            entry["last_access"] = time.time()
+            self.hits += 1
+            return df
+
+    def put(self, request: RunReportRequest, df: pd.DataFrame):
+        """
+        Salva il DataFrame in cache e applica l'eviction per dimensione.
+        """
+        key = self.key(request)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+
+        with self._lock:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+            ttl = self._ttl_for(request)
+            now = time.time()
+            self.index[key] = {
+                "size": path.stat().st_size,
+                "expires_at": None if ttl is None else now + ttl,
+                "last_access": now,
+            }
+            self._evict()
+            self._save_index()
+
+    def clear(self):
+        """
+        Svuota completamente la cache.
+        """
+        with self._lock:
+            for key in list(self.index):
+                self._remove(key)
+            self._save_index()
+
+    def _ttl_for(self, request: RunReportRequest) -> Optional[int]:
+        """
+        TTL della voce: i periodi aperti (fine da oggi in poi) usano il TTL breve.
+
+        Solo i periodi chiusi con date ISO non scadono mai: con date relative
+        ("yesterday", "NdaysAgo") la stessa chiave indica un periodo diverso
+        ogni giorno, quindi la voce scade al più tardi alla prossima mezzanotte.
+        """
+        now = datetime.now()
+        today = now.date()
+        first_open_day = today - timedelta(days=self.settle_days)
+        relative = any(
+            _is_relative(value)
+            for date_range in request.date_ranges
+            for value in (date_range.start_date, date_range.end_date)
+        )
+        until_midnight = datetime.combine(today + timedelta(days=1), datetime.min.time()) - now
+        until_midnight = max(int(until_midnight.total_seconds()), 1)
+
+        for date_range in request.date_ranges:
+            if _resolve_date(date_range.end_date, today) >= first_open_day:
+                return min(self.today_ttl_seconds, until_midnight) if relative else self.today_ttl_seconds
+        return until_midnight if relative else None
+
+    def _evict(self):
+        """
+        Rimuove le voci usate meno di recente finché la cache supera max_bytes.
+        """
+        total = sum(entry["size"] for entry in self.index.values())
+        by_access = sorted(self.index, key=lambda k: self.index[k]["last_access"])
+
+        for key in by_access:
+            if total <= self.max_bytes:
+                break
+            total -= self.index[key]["size"]
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        self.index.pop(key, None)
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        # Ignora voci il cui file non esiste più
+        return {k: v for k, v in index.items() if self._path(k).exists()}
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.index_path)
+
+def _is_relative(value: str) -> bool:
+    """
+    True per le date relative dell'API, il cui significato cambia ogni giorno.
+    """
+    return value in ("today", "yesterday") or bool(RELATIVE_DATE_RE.match(value))
+
+def _resolve_date(value: str, today: date) -> date:
+    """
+    Converte una data dell'API (ISO o relativa) in date.
+    """
+    if value == "today":
+        return today
+    if value == "yesterday":
+        return today - timedelta(days=1)
+    match = RELATIVE_DATE_RE.match(value)
+    if match:
+        return today - timedelta(days=int(match.group(1)))
+    return date.fromisoformat(value)
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# GA4 Segments
+# Compila i segmenti di config/utm_and_segments.json in FilterExpression GA4
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from google.analytics.data_v1beta.types import Filter, FilterExpression, FilterExpressionList
+
+SEGMENTS_CONFIG_PATH = os.path.join("config", "utm_and_segments.json")
+
+# Segmento che non applica filtri (usato dallo scheduler)
+ALL_SEGMENTS = "all"
+
+# Colonna aggiunta da label_segments
+SEGMENT_LABEL = "segment"
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """
+    Campo GA4 corrispondente a un campo della configurazione.
+
+    scale converte i valori della configurazione nell'unità dell'API
+    (es. bounce_rate in % -> bounceRate in frazione). values elenca i valori
+    possibili di una dimensione numerica: l'API non accetta NumericFilter
+    sulle dimensioni (stringhe), i confronti diventano un filtro in-list.
+    """
+    api_name: str
+    kind: str  # "dimension" o "metric"
+    scale: float = 1.0
+    values: Tuple[str, ...] = ()
+
+FIELDS = {
+    "event_name": FieldSpec("eventName", "dimension"),
+    "page_path": FieldSpec("pagePath", "dimension"),
+    "country": FieldSpec("country", "dimension"),
+    "city": FieldSpec("city", "dimension"),
+    "device_category": FieldSpec("deviceCategory", "dimension"),
+    "source": FieldSpec("source", "dimension"),
+    "medium": FieldSpec("medium", "dimension"),
+    "session_type": FieldSpec("newVsReturning", "dimension"),
+    "scroll_depth": FieldSpec("customEvent:percent_scrolled", "dimension",
+                              values=("10", "25", "50", "75", "90", "100")),
+    "session_duration": FieldSpec("averageSessionDuration", "metric"),
+    "pages_per_session": FieldSpec("screenPageViewsPerSession", "metric"),
+    "bounce_rate": FieldSpec("bounceRate", "metric", scale=0.01),
+    "sessions": FieldSpec("sessions", "metric"),
+    "users": FieldSpec("totalUsers", "metric"),
+}
+
+# Valori della configurazione che in GA4 hanno un nome diverso
+VALUE_ALIASES = {
+    ("newVsReturning", "returning_user"): "returning",
+    ("newVsReturning", "new_user"): "new",
+}
+
+STRING_OPERATORS = {
+    "equals": Filter.StringFilter.MatchType.EXACT,
+    "begins_with": Filter.StringFilter.MatchType.BEGINS_WITH,
+    "ends_with": Filter.StringFilter.MatchType.ENDS_WITH,
+    "contains": Filter.StringFilter.MatchType.CONTAINS,
+    "matches_regex": Filter.StringFilter.MatchType.FULL_REGEXP,
+}
+
+NUMERIC_OPERATORS = {
+    "greater_than": Filter.NumericFilter.Operation.GREATER_THAN,
+    "greater_than_or_equal": Filter.NumericFilter.Operation.GREATER_THAN_OR_EQUAL,
+    "less_than": Filter.NumericFilter.Operation.LESS_THAN,
+    "less_than_or_equal": Filter.NumericFilter.Operation.LESS_THAN_OR_EQUAL,
+}
+
+# Segmenti storici di GA4Client._get_segment_filter, stesso formato della configurazione
+LEGACY_SEGMENTS = {
+    "high_value_leads": {
+        "name": "High-Value Leads",
+        "conditions": [{"metric": "event_name", "operator": "equals", "value": "form_contact_submitted"}],
+    },
+    "mobile_users": {
+        "name": "Mobile Users",
+        "conditions": [{"metric": "device_category", "operator": "equals", "value": "mobile"}],
+    },
+    "local_traffic": {
+        "name": "Local Traffic",
+        "conditions": [{"metric": "country", "operator": "equals", "value": "Italy"}],
+    },
+}
+
+@dataclass(frozen=True)
+class Condition:
+    field: FieldSpec
+    operator: str
+    value: str
+
+    @property
+    def numeric(self) -> bool:
+        return self.field.kind == "metric" and (
+            self.operator in NUMERIC_OPERATORS or self.operator == "equals"
+        )
+
+    @property
+    def in_list(self) -> bool:
+        """
+        Confronto numerico su una dimensione, risolto sui valori noti (FieldSpec.values).
+        """
+        return self.field.kind == "dimension" and self.operator in NUMERIC_OPERATORS
+
+    def list_values(self) -> List[str]:
+        """
+        Valori della dimensione che soddisfano il confronto numerico.
+        """
+        number = float(self.value)
+        values = np.array([float(v) for v in self.field.values])
+        keep = {
+            "greater_than": values > number,
+            "greater_than_or_equal": values >= number,
+            "less_than": values < number,
+            "less_than_or_equal": values <= number,
+        }[self.operator]
+        return [v for v, k in zip(self.field.values, keep) if k]
+
+    def to_filter(self) -> FilterExpression:
+        """
+        Filtro GA4 della singola condizione.
+        """
+        if self.in_list:
+            return FilterExpression(filter=Filter(
+                field_name=self.field.api_name,
+                in_list_filter=Filter.InListFilter(values=self.list_values()),
+            ))
+        if not self.numeric:
+            return FilterExpression(filter=Filter(
+                field_name=self.field.api_name,
+                string_filter=Filter.StringFilter(
+                    match_type=STRING_OPERATORS[self.operator], value=self.value,
+                ),
+            ))
+
+        operation = NUMERIC_OPERATORS.get(self.operator, Filter.NumericFilter.Operation.EQUAL)
+        number = float(self.value) * self.field.scale
+        return FilterExpression(filter=Filter(
+            field_name=self.field.api_name,
+            numeric_filter=Filter.NumericFilter(
+                operation=operation, value={"double_value": number},
+            ),
+        ))
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Valuta la condizione sulle righe di un report già scaricato.
+        """
+        column = df[self.field.api_name]
+        if self.in_list:
+            return column.astype(str).isin(self.list_values()).to_numpy()
+        if self.numeric:
+            values = pd.to_numeric(column, errors="coerce").to_numpy(dtype=np.float64)
+            number = float(self.value) * self.field.scale
+            with np.errstate(invalid="ignore"):
+                if self.operator == "equals":
+                    return values == number
+                return {
+                    "greater_than": values > number,
+                    "greater_than_or_equal": values >= number,
+                    "less_than": values < number,
+                    "less_than_or_equal": values <= number,
+                }[self.operator]
+
+        text = column.astype(str)
+        if self.operator == "equals":
+            return (text == self.value).to_numpy()
+        if self.operator == "begins_with":
+            return text.str.startswith(self.value).to_numpy()
+        if self.operator == "ends_with":
+            return text.str.endswith(self.value).to_numpy()
+        if self.operator == "contains":
+            return text.str.contains(self.value, regex=False).to_numpy()
+        return text.str.fullmatch(self.value).to_numpy()
+
+@dataclass(frozen=True)
+class Segment:
+    """
+    Segmento compilato: condizioni in AND, separate in filtri su dimensioni e metriche.
+    """
+    key: str
+    name: str
+    conditions: Tuple[Condition, ...]
+    dimension_filter: Optional[FilterExpression] = field(default=None, compare=False)
+    metric_filter: Optional[FilterExpression] = field(default=None, compare=False)
+
+    @property
+    def dimensions(self) -> List[str]:
+        return _unique(c.field.api_name for c in self.conditions if c.field.kind == "dimension")
+
+    @property
+    def metrics(self) -> List[str]:
+        """
+        Metriche filtrate: l'API richiede che siano presenti nella richiesta.
+        """
+        return _unique(c.field.api_name for c in self.conditions if c.field.kind == "metric")
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        result = np.ones(len(df), dtype=bool)
+        for condition in self.conditions:
+            result &= condition.mask(df)
+        return result
+
+def _unique(names) -> List[str]:
+    return list(dict.fromkeys(names))
+
+def _and(filters: List[FilterExpression]) -> Optional[FilterExpression]:
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return filters[0]
+    return FilterExpression(and_group=FilterExpressionList(expressions=filters))
+
+def _or(filters: List[FilterExpression]) -> Optional[FilterExpression]:
+    if len(filters) == 1:
+        return filters[0]
+    return FilterExpression(or_group=FilterExpressionList(expressions=filters))
+
+def compile_condition(segment_key: str, spec: Dict) -> Condition:
+    """
+    Valida e compila una condizione {"metric", "operator", "value"}.
+
+    Raises:
+        ValueError: Campo, operatore o valore non validi
+    """
+    name, operator, value = spec.get("metric"), spec.get("operator"), spec.get("value")
+    if name not in FIELDS:
+        raise ValueError(f"Segmento {segment_key}: campo sconosciuto {name!r}. "
+                         f"Disponibili: {', '.join(sorted(FIELDS))}")
+    if operator not in STRING_OPERATORS and operator not in NUMERIC_OPERATORS:
+        raise ValueError(f"Segmento {segment_key}: operatore sconosciuto {operator!r}")
+
+    field_spec = FIELDS[name]
+    value = str(value)
+    value = VALUE_ALIASES.get((field_spec.api_name, value), value)
+    condition = Condition(field_spec, operator, value)
+
+    if field_spec.kind == "metric" and operator in STRING_OPERATORS and operator != "equals":
+        raise ValueError(f"Segmento {segment_key}: {operator} non applicabile alla metrica {name}")
+    if condition.in_list and not field_spec.values:
+        raise ValueError(f"Segmento {segment_key}: {operator} non applicabile alla dimensione {name}")
+    if condition.numeric or condition.in_list:
+        try:
+            float(value)
+        except ValueError:
+            raise ValueError(f"Segmento {segment_key}: valore non numerico per {name}: {value!r}")
+    if operator == "matches_regex":
+        try:
+            re.compile(value)
+        except re.error as e:
+            raise ValueError(f"Segmento {segment_key}: espressione regolare non valida: {e}")
+    return condition
+
+def compile_segment(key: str, spec: Dict) -> Segment:
+    """
+    Compila un segmento della configurazione nei filtri GA4 (una sola volta).
+    """
+    conditions = tuple(compile_condition(key, c) for c in spec.get("conditions", []))
+    if not conditions:
+        raise ValueError(f"Segmento {key}: nessuna condizione")
+    return Segment(
+        key=key,
+        name=spec.get("name", key),
+        conditions=conditions,
+        dimension_filter=_and([c.to_filter() for c in conditions if c.field.kind == "dimension"]),
+        metric_filter=_and([c.to_filter() for c in conditions if c.field.kind == "metric"]),
+    )
+
+class SegmentCatalog:
+    def __init__(self, definitions: Dict[str, Dict]):
+        """
+        Segmenti compilati e validati al caricamento.
+
+        Args:
+            definitions: Chiave segmento -> {"name", "conditions"}; i segmenti
+                         storici (LEGACY_SEGMENTS) restano disponibili se non ridefiniti
+        """
+        self.segments = {
+            key: compile_segment(key, spec)
+            for key, spec in {**LEGACY_SEGMENTS, **definitions}.items()
+        }
+
+    @property
+    def names(self) -> List[str]:
+        return sorted(self.segments)
+
+    def get(self, name: str) -> Optional[Segment]:
+        """
+        Segmento per chiave; None per "all" (nessun filtro).
+
+        Raises:
+            ValueError: Segmento sconosciuto
+        """
+        if name == ALL_SEGMENTS:
+            return None
+        try:
+            return self.segments[name]
+        except KeyError:
+            raise ValueError(f"Segmento sconosciuto: {name}. "
+                             f"Disponibili: {ALL_SEGMENTS}, {', '.join(self.names)}") from None
+
+    def resolve(self, names: List[str]) -> List[Segment]:
+        """
+        Segmenti richiesti; "all" o lista vuota li include tutti.
+        """
+        if not names or ALL_SEGMENTS in names:
+            return list(self.segments.values())
+        return [self.get(name) for name in names]
+
+@lru_cache(maxsize=8)
+def _load_catalog(path: str, mtime: float) -> SegmentCatalog:
+    with open(path, "r", encoding="utf-8") as f:
+        return SegmentCatalog(json.load(f).get("segments", {}))
+
+def load_segments(path: str = SEGMENTS_CONFIG_PATH) -> SegmentCatalog:
+    """
+    Catalogo dei segmenti di path, ricompilato solo se il file cambia.
+
+    Senza file di configurazione restano disponibili i segmenti storici.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return _legacy_catalog()
+    return _load_catalog(os.path.abspath(path), mtime)
+
+@lru_cache(maxsize=1)
+def _legacy_catalog() -> SegmentCatalog:
+    return SegmentCatalog({})
+
+def combined_filter(segments: List[Segment]) -> Optional[FilterExpression]:
+    """
+    OR dei filtri su dimensioni: basta una richiesta per tutti i segmenti.
+
+    Se anche un solo segmento non filtra le dimensioni servono tutte le righe.
+    """
+    filters = [s.dimension_filter for s in segments]
+    if not filters or any(f is None for f in filters):
+        return None
+    return _or(filters)
+
+def label_segments(df: pd.DataFrame, segments: List[Segment]) -> pd.DataFrame:
+    """
+    Etichetta le righe di un report multi-segmento nella colonna "segment".
+
+    Le condizioni vengono valutate localmente, quindi il report deve
+    contenere i campi di tutte le condizioni (vedi label_reports); una
+    riga che appartiene a più segmenti viene ripetuta, una che non ne
+    soddisfa nessuno viene scartata.
+    """
+    masks = np.column_stack([s.mask(df) for s in segments]) if segments else np.zeros((len(df), 0), bool)
+    which, rows = np.nonzero(masks.T)
+    labeled = df.iloc[rows].reset_index(drop=True)
+    labeled.insert(0, SEGMENT_LABEL, pd.Categorical.from_codes(
+        which, categories=[s.key for s in segments]
+    ))
+    return labeled
+
+def label_reports(reports: List[Tuple[pd.DataFrame, List[Segment]]],
+                  segments: List[Segment], dimensions: List[str]) -> pd.DataFrame:
+    """
+    Etichetta e unisce i report prodotti da GA4Client.build_segment_requests.
+
+    Il report condiviso passa da label_segments e viene riaggregato sulle
+    dimensioni del report (dimensions) sommando le metriche, come un report
+    per segmento; quello di un segmento con richiesta propria è già filtrato
+    dall'API e tutte le sue righe appartengono al segmento.
+    La colonna "segment" è category con le chiavi nell'ordine di segments.
+    """
+    frames = []
+    for df, report_segments in reports:
+        if len(report_segments) == 1 and _own_request(df, report_segments[0]):
+            df = df.copy()
+            df.insert(0, SEGMENT_LABEL, report_segments[0].key)
+        else:
+            df = label_segments(df, report_segments)
+            keys = [SEGMENT_LABEL] + [d for d in dimensions if d in df.columns]
+            if len(keys) < len(df.columns):
+                metrics = [c for c in df.columns
+                           if c not in keys and pd.api.types.is_numeric_dtype(df[c])]
+                df = df.groupby(keys, observed=True, sort=False)[metrics].sum().reset_index()
+        frames.append(df)
+    if not frames:
+        return label_segments(pd.DataFrame(), segments)
+
+    labeled = pd.concat(frames, ignore_index=True)
+    labeled[SEGMENT_LABEL] = pd.Categorical(
+        labeled[SEGMENT_LABEL].astype(str), categories=[s.key for s in segments]
+    )
+    return labeled
+
+def _own_request(df: pd.DataFrame, segment: Segment) -> bool:
+    """
+    True se il report è la richiesta propria del segmento, già filtrata dall'API:
+    il segmento ha condizioni su metriche o il report non ne contiene le dimensioni.
+    """
+    return bool(segment.metrics) or not set(segment.dimensions) <= set(df.columns)
+
+if __name__ == "__main__":
+    catalog = load_segments()
+    print(f"\n✓ {len(catalog.segments)} segmenti compilati")
+    for key in catalog.names:
+        segment = catalog.segments[key]
+        print(f"  - {key}: dimensioni {segment.dimensions}, metriche {segment.metrics}")
@@ -0,0 +1,773 @@
+#!/usr/bin/env python3
+# GA4 Sessionization Engine
+# Ricostruisce sessioni e metriche giornaliere dagli eventi grezzi dell'export BigQuery
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+import pyarrow.parquet as pq
+
+GOALS_CONFIG_PATH = os.path.join("config", "ga4_goals.json")
+
+NOT_SET = "(not set)"
+
+# Inattività che chiude una sessione quando manca ga_session_id (come GA4)
+SESSION_TIMEOUT_SECONDS = 30 * 60
+
+# Soglia di GA4 per una sessione ingaggiata senza il parametro session_engaged
+ENGAGED_SECONDS = 10
+
+# Attributi di sessione: percorsi candidati nell'export, il primo presente vince
+ATTRIBUTES = {
+    "device_category": ("device.category",),
+    "country": ("geo.country",),
+    "city": ("geo.city",),
+    "source": ("collected_traffic_source.manual_source", "traffic_source.source"),
+    "medium": ("collected_traffic_source.manual_medium", "traffic_source.medium"),
+}
+
+# Colonne dell'export lette dal motore (le altre vengono ignorate)
+EXPORT_COLUMNS = ("event_date", "event_timestamp", "event_name", "user_pseudo_id", "event_params",
+                  "device", "geo", "traffic_source", "collected_traffic_source")
+
+# Operatori delle condizioni dei goal di sessione (ga4_goals.json)
+COMPARATORS = {
+    "equals": np.equal,
+    "greater_than": np.greater,
+    "greater_than_or_equal": np.greater_equal,
+    "less_than": np.less,
+    "less_than_or_equal": np.less_equal,
+}
+
+@dataclass
+class EventBatch:
+    """
+    Eventi in forma colonnare: codici interi per le stringhe, microsecondi
+    per i timestamp. Gli array numerici sono passati ai worker così come sono.
+    """
+    arrays: Dict[str, np.ndarray]
+    categories: Dict[str, np.ndarray]
+    has_engaged_flag: bool = False
+
+    def __len__(self) -> int:
+        return len(self.arrays["timestamp"])
+
+@dataclass(frozen=True)
+class EventGoal:
+    """
+    Goal di tipo "event": evento con nome e parametri dati.
+    """
+    key: str
+    event_name: str
+    event_params: Tuple[Tuple[str, str], ...] = ()
+
+@dataclass(frozen=True)
+class SessionGoal:
+    """
+    Goal di tipo "session": condizioni sulle colonne della sessione.
+    """
+    key: str
+    conditions: Tuple[Tuple[str, str, float], ...] = field(default_factory=tuple)
+
+    def mask(self, sessions: pd.DataFrame) -> np.ndarray:
+        result = np.ones(len(sessions), dtype=bool)
+        for column, operator, value in self.conditions:
+            result &= COMPARATORS[operator](sessions[column].to_numpy(), value)
+        return result
+
+def compile_goals(goals_config: Dict) -> List:
+    """
+    Compila la sezione "goals" di ga4_goals.json in EventGoal e SessionGoal.
+
+    Raises:
+        ValueError: Goal di sessione con operatore non supportato
+    """
+    goals = []
+    for key, spec in goals_config.items():
+        if spec.get("type") == "event":
+            params = tuple((name, str(value)) for name, value in spec.get("event_params", {}).items())
+            goals.append(EventGoal(key, spec["event_name"], params))
+        elif spec.get("type") == "session":
+            conditions = []
+            for column, condition in spec.get("conditions", {}).items():
+                if condition["operator"] not in COMPARATORS:
+                    raise ValueError(f"Goal {key}: operatore non supportato {condition['operator']!r}")
+                conditions.append((column, condition["operator"], float(condition["value"])))
+            goals.append(SessionGoal(key, tuple(conditions)))
+    return goals
+
+def load_goals(path: str = GOALS_CONFIG_PATH) -> List:
+    """
+    Goal di ga4_goals.json in forma compilata (lista vuota se il file non esiste).
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return compile_goals(json.load(f).get("goals", {}))
+    except FileNotFoundError:
+        return []
+
+# ============================================================================
+# LETTURA DELL'EXPORT
+# ============================================================================
+
+def _expand_paths(paths) -> List[str]:
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(p for p in glob.glob(os.path.join(path, "*"))
+                            if p.endswith((".parquet", ".json", ".ndjson", ".jsonl", ".json.gz", ".ndjson.gz")))
+        else:
+            files += sorted(glob.glob(path)) or [path]
+    return files
+
+def read_export_table(paths) -> pa.Table:
+    """
+    Legge uno o più file dell'export (Parquet o NDJSON, anche una directory).
+
+    Dai file Parquet si leggono solo le colonne usate, con le stringhe più
+    ripetute già codificate a dizionario.
+    """
+    tables = []
+    for path in _expand_paths(paths):
+        if path.endswith(".parquet"):
+            names = set(pq.read_schema(path).names)
+            tables.append(pq.read_table(
+                path,
+                columns=[c for c in EXPORT_COLUMNS if c in names],
+                read_dictionary=["event_name", "event_date",
+                                 "event_params.list.element.key",
+                                 "event_params.list.element.value.string_value",
+                                 *(p for paths in ATTRIBUTES.values() for p in paths)],
+            ))
+        else:
+            tables.append(pa_json.read_json(path))
+    if not tables:
+        raise FileNotFoundError(f"Nessun file di export trovato in {paths}")
+    if len(tables) == 1:
+        return tables[0]
+    return pa.concat_tables(tables, promote_options="permissive")
+
+def _field(table: pa.Table, path: str) -> Optional[pa.ChunkedArray]:
+    """
+    Colonna annidata ("device.category"); None se assente.
+    """
+    name, *children = path.split(".")
+    if name not in table.column_names:
+        return None
+    array = table.column(name)
+    for child in children:
+        if not pa.types.is_struct(array.type) or array.type.get_field_index(child) < 0:
+            return None
+        array = pc.struct_field(array, child)
+    return array
+
+def _chunked(array) -> pa.ChunkedArray:
+    return array if isinstance(array, pa.ChunkedArray) else pa.chunked_array([array])
+
+def _encode(array) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Codici interi e categorie di una colonna di stringhe; i null diventano "(not set)".
+    """
+    array = _chunked(array)
+    if pa.types.is_dictionary(array.type) and array.num_chunks > 1:
+        # Dizionari grandi per ogni chunk (es. user_pseudo_id): unificarli costa
+        # più che ricodificare la colonna intera
+        if sum(len(chunk.dictionary) for chunk in array.chunks) > len(array) // 8:
+            array = pc.cast(array, array.type.value_type)
+    if not pa.types.is_dictionary(array.type):
+        if not pa.types.is_string(array.type):
+            array = pc.cast(array, pa.string())
+        array = pa.chunked_array([pc.dictionary_encode(array.combine_chunks())])
+    array = array.unify_dictionaries()
+    if array.num_chunks == 0:
+        return np.zeros(0, dtype=np.int32), np.array([NOT_SET], dtype=object)
+
+    dictionary = array.chunk(0).dictionary
+    if not pa.types.is_string(dictionary.type):
+        dictionary = pc.cast(dictionary, pa.string())
+    categories = dictionary.to_numpy(zero_copy_only=False).astype(object)
+    missing = len(categories)
+    codes = np.concatenate([
+        pc.fill_null(chunk.indices, missing).to_numpy(zero_copy_only=False) for chunk in array.chunks
+    ]).astype(np.int32)
+    if array.null_count:
+        categories = np.append(categories, NOT_SET)
+    if pd.Index(categories).has_duplicates:
+        # Dizionari con valori ripetuti (es. condivisi tra più parametri): un codice per valore
+        categories, remap = np.unique(categories.astype(str), return_inverse=True)
+        codes = remap.ravel().astype(np.int32)[codes]
+        categories = categories.astype(object)
+    return codes, categories
+
+def _to_int64(array, default: int) -> np.ndarray:
+    """
+    Interi dell'export (BigQuery li serializza come stringhe in JSON).
+    """
+    array = _chunked(array)
+    if not pa.types.is_integer(array.type):
+        array = pc.cast(array, pa.int64())
+    return pc.fill_null(pc.cast(array, pa.int64()), default).to_numpy()
+
+class _Params:
+    """
+    event_params appiattiti: per ogni chiave gli eventi che la contengono e i valori.
+    """
+    def __init__(self, table: pa.Table):
+        params = _field(table, "event_params")
+        self.n_events = table.num_rows
+        if params is None:
+            self.key_codes = np.zeros(0, dtype=np.int32)
+            self.keys = np.array([], dtype=object)
+            return
+        params = params.combine_chunks() if isinstance(params, pa.ChunkedArray) else params
+        self.parent = pc.list_parent_indices(params).to_numpy()
+        flat = pc.list_flatten(params)
+        self.key_codes, self.keys = _encode(pc.struct_field(flat, "key"))
+        self.values = pc.struct_field(flat, "value")
+
+    def rows(self, key: str) -> Optional[np.ndarray]:
+        matches = np.flatnonzero(self.keys == key)
+        if not len(matches):
+            return None
+        return np.flatnonzero(self.key_codes == matches[0])
+
+    def _value(self, name: str, rows: np.ndarray):
+        if self.values.type.get_field_index(name) < 0:
+            return None
+        return pc.struct_field(self.values, name).take(pa.array(rows))
+
+    def integer(self, key: str, default: int = -1) -> Optional[np.ndarray]:
+        rows = self.rows(key)
+        if rows is None:
+            return None
+        out = np.full(self.n_events, default, dtype=np.int64)
+        values = self._value("int_value", rows)
+        if values is None or values.null_count == len(values):
+            values = self._value("string_value", rows)
+        out[self.parent[rows]] = _to_int64(values, default)
+        return out
+
+    def string(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        rows = self.rows(key)
+        if rows is None:
+            return None
+        values = self._value("string_value", rows)
+        if values is None or values.null_count:
+            # Valori numerici (es. scroll_depth come int_value) convertiti in stringa
+            values = [v for v in (self._value(name, rows) for name in
+                                  ("string_value", "int_value", "double_value", "float_value")) if v is not None]
+            values = pc.coalesce(*[pc.cast(v, pa.string()) for v in values])
+        codes, categories = _encode(values)
+        missing = _code(categories, NOT_SET)
+        if missing < 0:
+            missing = len(categories)
+            categories = np.append(categories, NOT_SET)
+        out = np.full(self.n_events, missing, dtype=np.int32)
+        out[self.parent[rows]] = codes
+        return out, categories
+
+def _page_paths(locations: np.ndarray) -> np.ndarray:
+    """
+    page_location -> percorso della pagina (senza schema, host e query string).
+    """
+    paths = pc.replace_substring_regex(pa.array(locations.astype(str)), r"^[a-z]+://[^/]*", "")
+    paths = pc.replace_substring_regex(paths, r"[?#].*$", "")
+    return np.array([p or "/" for p in paths.to_pylist()], dtype=object)
+
+def events_from_table(table: pa.Table, goal_params=()) -> EventBatch:
+    """
+    Converte la tabella dell'export in EventBatch.
+
+    Args:
+        table: Tabella con il layout dell'export BigQuery di GA4
+        goal_params: Parametri degli eventi usati dai goal (estratti come stringhe)
+    """
+    arrays, categories = {}, {}
+    n = table.num_rows
+
+    arrays["user"], categories["user"] = _encode(_field(table, "user_pseudo_id"))
+    arrays["event"], categories["event"] = _encode(_field(table, "event_name"))
+    arrays["timestamp"] = _to_int64(_field(table, "event_timestamp"), 0)
+
+    date = _field(table, "event_date")
+    if date is None:
+        # Senza event_date il giorno è ricavato dal timestamp (UTC)
+        days = pd.to_datetime(arrays["timestamp"], unit="us").strftime("%Y%m%d")
+        date = pa.array(np.asarray(days, dtype=object))
+    arrays["date"], categories["date"] = _encode(date)
+
+    for name, candidates in ATTRIBUTES.items():
+        column = next((c for c in (_field(table, path) for path in candidates) if c is not None), None)
+        if column is None:
+            arrays[name], categories[name] = np.zeros(n, dtype=np.int32), np.array([NOT_SET], dtype=object)
+        else:
+            arrays[name], categories[name] = _encode(column)
+
+    params = _Params(table)
+    session_id = params.integer("ga_session_id")
+    arrays["session_id"] = session_id if session_id is not None else np.full(n, -1, dtype=np.int64)
+    session_number = params.integer("ga_session_number")
+    arrays["session_number"] = session_number if session_number is not None else np.full(n, -1, dtype=np.int64)
+    engagement = params.integer("engagement_time_msec", default=0)
+    arrays["engagement_msec"] = engagement if engagement is not None else np.zeros(n, dtype=np.int64)
+
+    engaged = params.string("session_engaged")
+    if engaged is not None:
+        codes, values = engaged
+        arrays["engaged"] = np.isin(values, ("1", "true"))[codes]
+    else:
+        arrays["engaged"] = np.zeros(n, dtype=bool)
+
+    location = params.string("page_location")
+    if location is not None:
+        codes, values = location
+        paths = _page_paths(values)
+        paths[values == NOT_SET] = NOT_SET
+        unique_paths, remap = np.unique(paths.astype(str), return_inverse=True)
+        arrays["page"] = remap.ravel().astype(np.int32)[codes]
+        categories["page"] = unique_paths.astype(object)
+        arrays["has_page"] = values[codes] != NOT_SET
+    else:
+        arrays["page"] = np.zeros(n, dtype=np.int32)
+        categories["page"] = np.array([NOT_SET], dtype=object)
+        arrays["has_page"] = np.zeros(n, dtype=bool)
+
+    for key in dict.fromkeys(goal_params):
+        values = params.string(key)
+        if values is None:
+            arrays[f"param:{key}"], categories[f"param:{key}"] = (
+                np.zeros(n, dtype=np.int32), np.array([NOT_SET], dtype=object))
+        else:
+            arrays[f"param:{key}"], categories[f"param:{key}"] = values
+
+    return EventBatch(arrays, categories, has_engaged_flag=engaged is not None)
+
+def read_events(paths, goals: Optional[List] = None) -> EventBatch:
+    """
+    Legge l'export e lo converte in EventBatch con i parametri richiesti dai goal.
+    """
+    goals = load_goals() if goals is None else goals
+    goal_params = [name for g in goals if isinstance(g, EventGoal) for name, _ in g.event_params]
+    return events_from_table(read_export_table(paths), goal_params)
+
+# ============================================================================
+# SESSIONIZZAZIONE
+# ============================================================================
+
+def _code(categories: np.ndarray, value: str) -> int:
+    """
+    Codice di una categoria (univoco dopo _encode); -1 se il valore non compare negli eventi.
+    """
+    matches = np.flatnonzero(categories == value)
+    return int(matches[0]) if len(matches) else -1
+
+def _compile_event_goals(batch: EventBatch, goals: List) -> List[Tuple[str, int, List[Tuple[str, int]]]]:
+    """
+    Goal di tipo evento tradotti in codici interi, validi in tutti i worker.
+    """
+    compiled = []
+    for goal in goals:
+        if not isinstance(goal, EventGoal):
+            continue
+        missing = [name for name, _ in goal.event_params if f"param:{name}" not in batch.arrays]
+        if missing:
+            raise ValueError(f"Goal {goal.key}: parametri {missing} non estratti (usa read_events con i goal)")
+        params = [(f"param:{name}", _code(batch.categories[f"param:{name}"], value))
+                  for name, value in goal.event_params]
+        compiled.append((goal.key, _code(batch.categories["event"], goal.event_name), params))
+    return compiled
+
+def _session_order(user: np.ndarray, session_id: np.ndarray, timestamp: np.ndarray) -> np.ndarray:
+    """
+    Ordine per (utente, sessione, timestamp).
+
+    Gli export sono quasi ordinati nel tempo: un solo argsort stabile sulla
+    chiave (utente, sessione) basta se poi i timestamp di ogni sessione
+    risultano crescenti; altrimenti si ricorre a lexsort.
+    """
+    low = session_id.min()
+    if user.max() < 2 ** 31 and session_id.max() - low < 2 ** 32:
+        key = (user.astype(np.int64) << 32) | (session_id - low)
+        order = np.argsort(key, kind="stable")
+        key, timestamp_sorted = key[order], timestamp[order]
+        if not np.any((key[1:] == key[:-1]) & (timestamp_sorted[1:] < timestamp_sorted[:-1])):
+            return order
+    return np.lexsort((timestamp, session_id, user))
+
+def _sessionize_arrays(arrays: Dict[str, np.ndarray], event_goals, page_view_code: int,
+                       first_visit_code: int, timeout_us: int) -> Dict[str, np.ndarray]:
+    """
+    Nucleo numerico: ordina gli eventi per (utente, sessione, timestamp) e
+    aggrega ogni sessione con operazioni su segmenti contigui (reduceat).
+
+    Dove manca ga_session_id le sessioni sono separate dall'inattività.
+    """
+    n = len(arrays["timestamp"])
+    if n == 0:
+        return {}
+    order = _session_order(arrays["user"], arrays["session_id"], arrays["timestamp"])
+    user = arrays["user"][order]
+    session_id = arrays["session_id"][order]
+    timestamp = arrays["timestamp"][order]
+
+    boundary = np.empty(n, dtype=bool)
+    boundary[0] = True
+    np.not_equal(user[1:], user[:-1], out=boundary[1:])
+    boundary[1:] |= session_id[1:] != session_id[:-1]
+    boundary[1:] |= (session_id[1:] < 0) & (np.diff(timestamp) > timeout_us)
+    starts = np.flatnonzero(boundary)
+    ends = np.r_[starts[1:], n] - 1
+    first = order[starts]
+
+    event = arrays["event"][order]
+    page_view = event == page_view_code
+    out = {
+        "user": user[starts],
+        "session_id": np.where(session_id[starts] >= 0, session_id[starts], timestamp[starts] // 1_000_000),
+        "start": timestamp[starts],
+        "end": timestamp[ends],
+        "events": np.diff(np.r_[starts, n]),
+        "page_views": np.add.reduceat(page_view.astype(np.int32), starts),
+        "engagement_msec": np.add.reduceat(arrays["engagement_msec"][order], starts),
+        "engaged_flag": np.logical_or.reduceat(arrays["engaged"][order], starts),
+        "is_new": np.logical_or.reduceat(
+            (event == first_visit_code) | (arrays["session_number"][order] == 1), starts
+        ),
+        "date": arrays["date"][first],
+    }
+    for name in ATTRIBUTES:
+        out[name] = arrays[name][first]
+
+    # Pagina di atterraggio: prima page_view della sessione
+    positions = np.where(page_view & arrays["has_page"][order], np.arange(n), n)
+    landing = np.minimum.reduceat(positions, starts)
+    has_landing = landing <= ends
+    out["landing_page"] = np.where(has_landing, arrays["page"][order][np.minimum(landing, n - 1)], -1)
+
+    for key, event_code, params in event_goals:
+        match = event == event_code
+        for column, value_code in params:
+            match &= arrays[column][order] == value_code
+        out[f"goal:{key}"] = np.add.reduceat(match.astype(np.int32), starts)
+    return out
+
+# Eventi condivisi con i worker creati via fork (ereditati senza copia)
+_FORK_ARRAYS: Dict[str, np.ndarray] = {}
+
+def _partition(arrays: Dict[str, np.ndarray], index: int, partitions: int) -> Dict[str, np.ndarray]:
+    """
+    Eventi degli utenti della partizione (hash moltiplicativo del codice utente).
+    """
+    bucket = (arrays["user"].astype(np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32) % np.uint64(partitions)
+    rows = np.flatnonzero(bucket == index)
+    return {name: values[rows] for name, values in arrays.items()}
+
+def _sessionize_partition(index: int, partitions: int, args) -> Dict[str, np.ndarray]:
+    return _sessionize_arrays(_partition(_FORK_ARRAYS, index, partitions), *args)
+
+def _sessionize_partition_arrays(arrays, args) -> Dict[str, np.ndarray]:
+    return _sessionize_arrays(arrays, *args)
+
+def sessionize(batch: EventBatch, goals: Optional[List] = None, workers: int = 1,
+               timeout_seconds: int = SESSION_TIMEOUT_SECONDS) -> pd.DataFrame:
+    """
+    Una riga per sessione.
+
+    Le sessioni sono identificate da (user_pseudo_id, ga_session_id); gli
+    attributi (device, geo, fonte) sono quelli del primo evento. Con
+    workers > 1 gli eventi sono partizionati per utente e ogni partizione
+    è elaborata da un processo separato: nessuna sessione attraversa due
+    partizioni, quindi i risultati si concatenano senza ricalcoli.
+
+    Args:
+        batch: Eventi letti con read_events
+        goals: Goal compilati (default: load_goals())
+        workers: Processi da usare
+        timeout_seconds: Inattività che chiude una sessione senza ga_session_id
+
+    Returns:
+        DataFrame con date, user_pseudo_id, ga_session_id, session_start,
+        session_duration (s), engagement_time (s), pages_per_session, events,
+        engaged, bounce, is_new, landing_page, attributi di sessione,
+        conversions e una colonna per goal
+    """
+    goals = load_goals() if goals is None else goals
+    args = (
+        _compile_event_goals(batch, goals),
+        _code(batch.categories["event"], "page_view"),
+        _code(batch.categories["event"], "first_visit"),
+        timeout_seconds * 1_000_000,
+    )
+
+    if workers <= 1 or len(batch) == 0:
+        parts = [_sessionize_arrays(batch.arrays, *args)]
+    elif "fork" in multiprocessing.get_all_start_methods():
+        global _FORK_ARRAYS
+        _FORK_ARRAYS = batch.arrays
+        try:
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as pool:
+                parts = list(pool.map(_sessionize_partition, range(workers), [workers] * workers,
+                                      [args] * workers))
+        finally:
+            _FORK_ARRAYS = {}
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(_sessionize_partition_arrays,
+                                  [_partition(batch.arrays, i, workers) for i in range(workers)],
+                                  [args] * workers))
+
+    parts = [p for p in parts if p]
+    if not parts:
+        return _sessions_frame({}, batch, goals)
+    merged = {name: np.concatenate([p[name] for p in parts]) for name in parts[0]}
+    return _sessions_frame(merged, batch, goals)
+
+def _categorical(codes: np.ndarray, categories: np.ndarray) -> pd.Categorical:
+    categories = pd.Index(categories)
+    if categories.has_duplicates:
+        # Categorie duplicate (es. stesso percorso da URL diversi): rinumera
+        unique, remap = np.unique(categories.astype(str), return_inverse=True)
+        codes = np.where(codes >= 0, remap.ravel()[np.maximum(codes, 0)], -1)
+        categories = pd.Index(unique)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def _sessions_frame(s: Dict[str, np.ndarray], batch: EventBatch, goals: List) -> pd.DataFrame:
+    if not s:
+        columns = ["date", "user_pseudo_id", "ga_session_id", "session_start", "session_duration",
+                   "engagement_time", "pages_per_session", "events", "engaged", "bounce", "is_new",
+                   "landing_page", *ATTRIBUTES, "conversions", *(g.key for g in goals)]
+        return pd.DataFrame(columns=columns)
+
+    dates = pd.to_datetime(pd.Series(batch.categories["date"]), format="%Y%m%d", errors="coerce").to_numpy()
+    sessions = pd.DataFrame({
+        "date": dates[s["date"]],
+        "user_pseudo_id": _categorical(s["user"], batch.categories["user"]),
+        "ga_session_id": s["session_id"],
+        "session_start": pd.to_datetime(s["start"], unit="us"),
+        "session_duration": (s["end"] - s["start"]) / 1e6,
+        "engagement_time": s["engagement_msec"] / 1e3,
+        "pages_per_session": s["page_views"],
+        "events": s["events"],
+    })
+
+    event_goals = [g for g in goals if isinstance(g, EventGoal)]
+    conversions = np.zeros(len(sessions), dtype=np.int64)
+    for goal in event_goals:
+        conversions += s[f"goal:{goal.key}"]
+
+    if batch.has_engaged_flag:
+        engaged = s["engaged_flag"]
+    else:
+        engaged = ((s["engagement_msec"] >= ENGAGED_SECONDS * 1000) | (s["page_views"] >= 2)
+                   | (conversions > 0))
+    sessions["engaged"] = engaged
+    sessions["bounce"] = ~engaged
+    sessions["is_new"] = s["is_new"]
+    sessions["landing_page"] = _categorical(s["landing_page"], batch.categories["page"])
+    for name in ATTRIBUTES:
+        sessions[name] = _categorical(s[name], batch.categories[name])
+    sessions["conversions"] = conversions
+
+    for goal in goals:
+        if isinstance(goal, EventGoal):
+            sessions[goal.key] = s[f"goal:{goal.key}"]
+        else:
+            sessions[goal.key] = goal.mask(sessions)
+    return sessions
+
+def daily_aggregates(sessions: pd.DataFrame, property_id: Optional[str] = None) -> pd.DataFrame:
+    """
+    Metriche giornaliere dalle sessioni, nel formato di evaluate_alert_rules.
+
+    Args:
+        sessions: Output di sessionize
+        property_id: Se indicato aggiunge la colonna property_id
+
+    Returns:
+        DataFrame per giorno con sessions, users, new_users, page_views,
+        engaged_sessions, bounce_rate (in %), avg_session_duration,
+        pages_per_session, conversions e i totali dei goal
+    """
+    goal_columns = [c for c in sessions.columns[sessions.columns.get_loc("conversions") + 1:]]
+    grouped = sessions.groupby("date", sort=True)
+    daily = grouped.agg(
+        sessions=("ga_session_id", "size"),
+        users=("user_pseudo_id", "nunique"),
+        new_users=("is_new", "sum"),
+        page_views=("pages_per_session", "sum"),
+        engaged_sessions=("engaged", "sum"),
+        avg_session_duration=("session_duration", "mean"),
+        conversions=("conversions", "sum"),
+    )
+    daily.insert(5, "bounce_rate", 100 * (1 - daily["engaged_sessions"] / daily["sessions"]))
+    daily.insert(7, "pages_per_session", daily["page_views"] / daily["sessions"])
+    if goal_columns:
+        daily = daily.join(grouped[goal_columns].sum().astype(np.int64))
+    daily = daily.reset_index()
+    if property_id is not None:
+        daily.insert(0, "property_id", property_id)
+    return daily
+
+# ============================================================================
+# EXPORT SINTETICO E BENCHMARK
+# ============================================================================
+
+# Segnaposto per i parametri interi assenti nell'export sintetico
+INT_NULL = np.iinfo(np.int64).min
+
+def _dictionary(codes: np.ndarray, values) -> pa.DictionaryArray:
+    return pa.DictionaryArray.from_arrays(pa.array(codes.astype(np.int32)), pa.array(list(values), pa.string()))
+
+def synthetic_export(n_events: int = 1_000_000, days: int = 90, seed: int = 0) -> pa.Table:
+    """
+    Tabella nel layout dell'export BigQuery generata dagli eventi di ga4_emulator.
+
+    Ogni evento porta ga_session_id, ga_session_number e session_engaged;
+    page_view e service_page_view hanno page_location, user_engagement
+    engagement_time_msec e gli eventi personalizzati i loro parametri.
+    """
+    from ga4_emulator import NOT_SET as EMULATOR_NOT_SET, generate_events, load_events_config
+
+    ds = generate_events(load_events_config(), n_events, days, seed=seed)
+    rng = np.random.default_rng(seed)
+    n, n_sessions = ds.n_events, ds.n_sessions
+
+    # Timestamp: la sessione inizia in un momento casuale del giorno, eventi equidistanti
+    duration = np.minimum(ds.session_duration, 3600.0)
+    session_day = np.zeros(n_sessions, dtype=np.int64)
+    session_day[ds.session] = ds.day
+    day_start = (pd.Timestamp(ds.start_date).value // 1000) + session_day * 86_400_000_000
+    start = day_start + (rng.random(n_sessions) * (86_400 - duration) * 1e6).astype(np.int64)
+    counts = np.bincount(ds.session, minlength=n_sessions)
+    first = np.r_[0, np.cumsum(counts)[:-1]]
+    rank = np.arange(n) - first[ds.session]
+    step = (duration * 1e6 / np.maximum(counts - 1, 1)).astype(np.int64)
+    timestamp = start[ds.session] + rank * step[ds.session]
+
+    names = ds.categories["eventName"]
+    event = ds.codes["eventName"]
+    ga_session_id = start // 1_000_000
+    # Sessioni dello stesso utente iniziate nello stesso secondo: id distinti come in GA4
+    pair = (ds.session_user.astype(np.int64) << 32) | (ga_session_id - ga_session_id.min())
+    duplicate = np.ones(n_sessions, dtype=bool)
+    duplicate[np.unique(pair, return_index=True)[1]] = False
+    ga_session_id[duplicate] += 1
+
+    # event_params: (evento, chiave, valore) come codici interi, poi raggruppati per evento
+    key_names, string_names = [], []
+    rows, keys, strings, ints = [], [], [], []
+
+    def add(key, event_rows, string_codes=None, string_values=None, int_values=None):
+        m = len(event_rows)
+        rows.append(event_rows)
+        keys.append(np.full(m, len(key_names), dtype=np.int32))
+        key_names.append(key)
+        if string_codes is not None:
+            strings.append(string_codes.astype(np.int32) + len(string_names))
+            string_names.extend(string_values)
+        else:
+            strings.append(np.full(m, -1, dtype=np.int32))
+        ints.append(int_values if int_values is not None else np.full(m, INT_NULL, dtype=np.int64))
+
+    all_rows = np.arange(n)
+    add("ga_session_id", all_rows, int_values=ga_session_id[ds.session])
+    add("ga_session_number", all_rows, int_values=np.where(ds.session_new, 1, 2)[ds.session])
+    add("session_engaged", all_rows, ds.session_engaged[ds.session], ["0", "1"])
+
+    engagement_rows = np.flatnonzero(names[event] == "user_engagement")
+    add("engagement_time_msec", engagement_rows,
+        int_values=(ds.session_duration[ds.session[engagement_rows]] * 1000).astype(np.int64))
+
+    page_rows = np.flatnonzero(np.isin(names[event], ("page_view", "service_page_view")))
+    add("page_location", page_rows, ds.codes["pagePath"][page_rows],
+        ["https://www.example.it" + p for p in ds.categories["pagePath"]])
+
+    for key in ds.codes:
+        if key.startswith("customEvent:"):
+            param_rows = np.flatnonzero(ds.codes[key] != 0)
+            add(key.split(":", 1)[1], param_rows, ds.codes[key][param_rows], ds.categories[key])
+
+    param_event = np.concatenate(rows)
+    order = np.argsort(param_event, kind="stable")
+    del rows
+    string_codes = np.concatenate(strings)[order]
+    int_values = np.concatenate(ints)[order]
+    value = pa.StructArray.from_arrays(
+        [pa.DictionaryArray.from_arrays(pa.array(string_codes, mask=string_codes < 0),
+                                        pa.array(string_names, pa.string())),
+         pa.array(int_values, mask=int_values == INT_NULL),
+         pa.nulls(len(order), pa.float64()), pa.nulls(len(order), pa.float64())],
+        ["string_value", "int_value", "float_value", "double_value"],
+    )
+    element = pa.StructArray.from_arrays([_dictionary(np.concatenate(keys)[order], key_names), value],
+                                         ["key", "value"])
+    offsets = np.r_[0, np.cumsum(np.bincount(param_event, minlength=n))].astype(np.int32)
+    event_params = pa.ListArray.from_arrays(pa.array(offsets), element)
+
+    users = np.unique(ds.session_user)
+    user_codes = np.searchsorted(users, ds.session_user[ds.session])
+    user_names = [f"{u}.{1600000000 + u % 99991}" for u in users]
+
+    def attribute(name):
+        codes = ds.codes[name].astype(np.int32)
+        missing = np.flatnonzero(ds.categories[name] == EMULATOR_NOT_SET)
+        return pa.DictionaryArray.from_arrays(pa.array(codes, mask=np.isin(codes, missing)),
+                                              pa.array(list(ds.categories[name]), pa.string()))
+
+    return pa.table({
+        "event_date": _dictionary(ds.codes["date"], ds.categories["date"]),
+        "event_timestamp": pa.array(timestamp),
+        "event_name": _dictionary(event, names),
+        "event_params": event_params,
+        "user_pseudo_id": _dictionary(user_codes, user_names),
+        "device": pa.StructArray.from_arrays([attribute("deviceCategory")], ["category"]),
+        "geo": pa.StructArray.from_arrays([attribute("country"), attribute("city")], ["country", "city"]),
+        "traffic_source": pa.StructArray.from_arrays([attribute("source"), attribute("medium")],
+                                                     ["source", "medium"]),
+    })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark della sessionizzazione su un export sintetico")
+    parser.add_argument("--events", type=int, default=10_000_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--path", default="/tmp/ga4_export_bench.parquet")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        start = time.perf_counter()
+        # Senza schema Arrow, come i file prodotti da BigQuery
+        pq.write_table(synthetic_export(args.events, args.days), args.path, store_schema=False)
+        print(f"\nExport sintetico scritto in {args.path} ({time.perf_counter() - start:.1f}s)")
+
+    start = time.perf_counter()
+    batch = read_events(args.path)
+    read_seconds = time.perf_counter() - start
+    print(f"\nLettura: {len(batch):,} eventi in {read_seconds:.2f}s")
+
+    for workers in sorted({1, args.workers}):
+        start = time.perf_counter()
+        sessions = sessionize(batch, workers=workers)
+        seconds = time.perf_counter() - start
+        rate = len(batch) / (read_seconds + seconds) * 60
+        print(f"  worker={workers:2d}  {len(sessions):,} sessioni in {seconds:.2f}s  "
+              f"({rate / 1e6:.1f}M eventi/minuto inclusa la lettura)")
+
+    start = time.perf_counter()
+    daily = daily_aggregates(sessions, property_id="bench")
+    print(f"  Aggregati giornalieri: {len(daily)} giorni in {time.perf_counter() - start:.2f}s")
+    print(daily.tail(3).to_string(index=False))
@@ -0,0 +1,138 @@
+"""Risk Metrics Engine
+Metriche di rischio incrementali (drawdown, Sharpe, Sortino, volatilità) e serie rolling
+"""
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+ROLLING_WINDOWS = (30, 90, 252)
+
+class RiskMetricsEngine:
+    """Stato corrente delle metriche di rischio di una equity curve.
+
+    update aggiunge un punto in O(1): picco, drawdown, media e varianza dei
+    rendimenti (Welford) e semi-varianza negativa sono aggiornati senza
+    rileggere lo storico. update_many aggiunge un blocco di punti con le
+    stesse formule vettorizzate, unendo gli stati (Chan et al.).
+    """
+
+    def __init__(self, periods_per_year=TRADING_DAYS, risk_free_rate=0.0):
+        self.periods_per_year = periods_per_year
+        # Rendimento privo di rischio per periodo
+        self.risk_free = risk_free_rate / periods_per_year
+        self.last_equity = None
+        self.peak = None
+        self.drawdown = 0.0
+        self.max_drawdown = 0.0
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside_sq = 0.0
+
+    def update(self, equity):
+        """Aggiunge un nuovo valore di equity (O(1))"""
+        equity = float(equity)
+        if self.last_equity is not None:
+            excess = equity / self.last_equity - 1 - self.risk_free
+            self.count += 1
+            delta = excess - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (excess - self.mean)
+            if excess < 0:
+                self.downside_sq += excess * excess
+
+        self.last_equity = equity
+        self.peak = equity if self.peak is None else max(self.peak, equity)
+        self.drawdown = 1 - equity / self.peak
+        self.max_drawdown = max(self.max_drawdown, self.drawdown)
+        return self
+
+    def update_many(self, equity):
+        """Aggiunge un blocco di valori di equity in un solo passaggio vettoriale"""
+        equity = np.asarray(equity, dtype=np.float64)
+        if equity.size == 0:
+            return self
+
+        if self.last_equity is None:
+            previous, current = equity[:-1], equity[1:]
+        else:
+            previous, current = np.concatenate(([self.last_equity], equity[:-1])), equity
+        excess = current / previous - 1 - self.risk_free
+
+        if excess.size:
+            n = excess.size
+            block_mean = excess.mean()
+            block_m2 = ((excess - block_mean) ** 2).sum()
+            total = self.count + n
+            delta = block_mean - self.mean
+            self.m2 += block_m2 + delta * delta * self.count * n / total
+            self.mean += delta * n / total
+            self.count = total
+            self.downside_sq += (np.minimum(excess, 0) ** 2).sum()
+
+        start_peak = -np.inf if self.peak is None else self.peak
+        peaks = np.maximum(np.maximum.accumulate(equity), start_peak)
+        drawdowns = 1 - equity / peaks
+        self.last_equity = float(equity[-1])
+        self.peak = float(peaks[-1])
+        self.drawdown = float(drawdowns[-1])
+        self.max_drawdown = max(self.max_drawdown, float(drawdowns.max()))
+        return self
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    @property
+    def downside_deviation(self):
+        return np.sqrt(self.downside_sq / self.count) if self.count else 0.0
+
+    @property
+    def volatility(self):
+        """Volatilità annualizzata dei rendimenti"""
+        return self.std * np.sqrt(self.periods_per_year)
+
+    @property
+    def sharpe(self):
+        """Sharpe ratio annualizzato"""
+        std = self.std
+        return self.mean / std * np.sqrt(self.periods_per_year) if std > 0 else 0.0
+
+    @property
+    def sortino(self):
+        """Sortino ratio annualizzato (semi-deviazione dei rendimenti negativi)"""
+        downside = self.downside_deviation
+        return self.mean / downside * np.sqrt(self.periods_per_year) if downside > 0 else 0.0
+
+    def snapshot(self):
+        """Metriche correnti come dizionario di float"""
+        return {
+            'Sharpe': float(self.sharpe),
+            'Sortino': float(self.sortino),
+            'Volatility': float(self.volatility),
+            'Max_Drawdown': float(self.max_drawdown),
+            'Current_Drawdown': float(self.drawdown),
+            'Peak': float(self.peak) if self.peak is not None else None,
+            'Observations': self.count,
+        }
+
+def rolling_metrics(equity, windows=ROLLING_WINDOWS, periods_per_year=TRADING_DAYS):
+    """Serie rolling per la dashboard, calcolate con finestre vettoriali.
+
+    Returns:
+        DataFrame con Drawdown (dal massimo storico) e, per ogni finestra w,
+        Sharpe_w (annualizzato) e Drawdown_w (dal massimo degli ultimi w giorni)
+    """
+    equity = pd.Series(equity, dtype='float64')
+    returns = equity.pct_change()
+    out = pd.DataFrame(index=equity.index)
+    out['Drawdown'] = 1 - equity / equity.cummax()
+
+    for window in windows:
+        rolling = returns.rolling(window, min_periods=window)
+        std = rolling.std()
+        out[f'Sharpe_{window}'] = (rolling.mean() / std.where(std > 0)) * np.sqrt(periods_per_year)
+        out[f'Drawdown_{window}'] = 1 - equity / equity.rolling(window, min_periods=1).max()
+
+    return out
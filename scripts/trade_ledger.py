@@ -0,0 +1,219 @@
+"""Trade Ledger
+Registro dei singoli trade su array NumPy strutturato, con metriche vettoriali
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+# Un record per trade: 41 byte, nessun oggetto Python per riga
+TRADE_DTYPE = np.dtype([
+    ('timestamp', 'datetime64[ns]'),
+    ('side', 'i1'),      # 1 = long, -1 = short
+    ('entry', 'f8'),
+    ('exit', 'f8'),
+    ('points', 'f8'),
+    ('pct', 'f8'),       # Rendimento del trade in frazione (0.01 = 1%)
+])
+
+SIDE_CODES = {'long': 1, 'buy': 1, '1': 1, 'short': -1, 'sell': -1, '-1': -1}
+
+class TradeLedger:
+    """Registro dei trade ordinato per timestamp.
+
+    Tutte le metriche sono calcolate sulle colonne dell'array strutturato,
+    senza cicli sui trade.
+    """
+
+    def __init__(self, trades):
+        trades = np.asarray(trades, dtype=TRADE_DTYPE)
+        order = np.argsort(trades['timestamp'], kind='stable')
+        self.trades = trades[order]
+
+    def __len__(self):
+        return len(self.trades)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Costruisce il ledger da un DataFrame con colonne timestamp, side, entry, exit.
+
+        points e pct, se assenti, sono ricavati da entry/exit e dal lato.
+        """
+        trades = np.empty(len(df), dtype=TRADE_DTYPE)
+        trades['timestamp'] = pd.to_datetime(df['timestamp']).to_numpy(dtype='datetime64[ns]')
+
+        side = df['side']
+        if side.dtype.kind in 'iuf':
+            trades['side'] = np.sign(side.to_numpy())
+        else:
+            codes = side.astype(str).str.lower().map(SIDE_CODES)
+            if codes.isna().any():
+                bad = side[codes.isna()].unique()[:5]
+                raise ValueError(f"Valori di side non riconosciuti: {list(bad)}")
+            trades['side'] = codes.to_numpy()
+
+        trades['entry'] = df['entry'].to_numpy(dtype=np.float64)
+        trades['exit'] = df['exit'].to_numpy(dtype=np.float64)
+        points = (trades['exit'] - trades['entry']) * trades['side']
+        trades['points'] = df['points'].to_numpy(dtype=np.float64) if 'points' in df else points
+        trades['pct'] = df['pct'].to_numpy(dtype=np.float64) if 'pct' in df else points / trades['entry']
+        return cls(trades)
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_frame(pd.read_csv(path, engine='pyarrow'))
+
+    @classmethod
+    def from_parquet(cls, path):
+        return cls.from_frame(pd.read_parquet(path))
+
+    @classmethod
+    def synthetic(cls, n_trades, winrate=0.6625, avg_pct_trade=0.001674, seed=None,
+                  start='2010-01-01', span_days=3650):
+        """Ledger sintetico coerente con le metriche aggregate di TradingSystemMetrics.
+
+        Le perdite valgono in media metà del trade medio, come nella simulazione
+        dell'equity curve.
+        """
+        rng = np.random.default_rng(seed)
+        trades = np.empty(n_trades, dtype=TRADE_DTYPE)
+
+        offsets = np.sort(rng.integers(0, span_days * 86400 * 10**9, n_trades))
+        trades['timestamp'] = np.datetime64(start, 'ns') + offsets.astype('timedelta64[ns]')
+        trades['side'] = np.where(rng.random(n_trades) < 0.5, 1, -1)
+        trades['entry'] = rng.uniform(15000, 25000, n_trades)
+
+        wins = rng.random(n_trades) < winrate
+        magnitude = rng.exponential(avg_pct_trade, n_trades)
+        trades['pct'] = np.where(wins, magnitude, -0.5 * magnitude)
+        trades['points'] = trades['pct'] * trades['entry']
+        trades['exit'] = trades['entry'] + trades['points'] * trades['side']
+        return cls(trades)
+
+    def to_frame(self):
+        return pd.DataFrame({name: self.trades[name] for name in TRADE_DTYPE.names})
+
+    def to_parquet(self, path):
+        self.to_frame().to_parquet(path, index=False)
+
+    def metrics(self):
+        """Metriche di sistema calcolate dai trade.
+
+        Returns:
+            dict di valori numerici: win rate, media vincite/perdite,
+            profit factor, expectancy, rendimento totale e max drawdown
+        """
+        pct = self.trades['pct']
+        points = self.trades['points']
+        n = len(pct)
+        if n == 0:
+            return {'Total_Trades': 0}
+
+        wins = pct > 0
+        losses = pct < 0
+        n_wins = int(np.count_nonzero(wins))
+        n_losses = int(np.count_nonzero(losses))
+        gross_win = pct[wins].sum()
+        gross_loss = -pct[losses].sum()
+        avg_win = gross_win / n_wins if n_wins else 0.0
+        avg_loss = gross_loss / n_losses if n_losses else 0.0
+        win_rate = n_wins / n
+
+        # Drawdown in scala logaritmica: nessun overflow anche con milioni di trade
+        log_equity = np.cumsum(np.log1p(pct))
+        log_peak = np.maximum(np.maximum.accumulate(log_equity), 0.0)
+        with np.errstate(over='ignore'):
+            total_return = np.expm1(log_equity[-1])
+
+        return {
+            'Total_Trades': n,
+            'Winning_Trades': n_wins,
+            'Losing_Trades': n_losses,
+            'Winrate': win_rate,
+            'Avg_Win': float(avg_win),
+            'Avg_Loss': float(avg_loss),
+            'Avg_Pct_Trade': float(pct.mean()),
+            'Avg_Points': float(points.mean()),
+            'Profit_Factor': float(gross_win / gross_loss) if gross_loss > 0 else float('inf'),
+            # Rendimento atteso per trade: p(win) * media vincite - p(loss) * media perdite
+            'Expectancy': float(win_rate * avg_win - (n_losses / n) * avg_loss),
+            'Total_Return': float(total_return),
+            'Max_Drawdown': float(-np.expm1(log_equity - log_peak).min()),
+        }
+
+    def equity_curve(self, initial_balance=10000.0):
+        """Equity dopo ogni trade, con reinvestimento (prodotto cumulato)"""
+        return initial_balance * np.cumprod(1 + self.trades['pct'])
+
+    def daily_equity(self, initial_balance=10000.0):
+        """Equity a fine giornata nel formato usato dalle dashboard.
+
+        Returns:
+            DataFrame con colonne Date, Equity, Daily_Return (%); vuoto senza trade
+        """
+        if not len(self):
+            return pd.DataFrame({
+                'Date': np.array([], dtype='datetime64[ns]'),
+                'Equity': np.array([], dtype=np.float64),
+                'Daily_Return': np.array([], dtype=np.float64),
+            })
+        equity = self.equity_curve(initial_balance)
+        days = self.trades['timestamp'].astype('datetime64[D]')
+        # Ultimo trade di ogni giorno (timestamp ordinati)
+        last_of_day = np.flatnonzero(np.append(days[1:] != days[:-1], True))
+        day_equity = equity[last_of_day]
+        previous = np.concatenate(([initial_balance], day_equity[:-1]))
+
+        return pd.DataFrame({
+            'Date': days[last_of_day].astype('datetime64[ns]'),
+            'Equity': day_equity,
+            'Daily_Return': (day_equity / previous - 1) * 100
+        })
+
+    def trade_distribution(self):
+        """Distribuzione win/loss nel formato di TradingSystemMetrics.generate_trade_distribution"""
+        if not len(self):
+            return {'Winning_Trades': 0, 'Losing_Trades': 0, 'Avg_Win': "0.00%", 'Avg_Loss': "0.00%"}
+        m = self.metrics()
+        return {
+            'Winning_Trades': m['Winning_Trades'],
+            'Losing_Trades': m['Losing_Trades'],
+            'Avg_Win': f"{m['Avg_Win']*100:.2f}%",
+            'Avg_Loss': f"{-m['Avg_Loss']*100:.2f}%"
+        }
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del trade ledger su dati sintetici")
+    parser.add_argument('--trades', type=int, default=5_000_000, help="Numero di trade sintetici")
+    parser.add_argument('--seed', type=int, default=42)
+    # Con milioni di trade reinvestiti lo 0.17% medio farebbe esplodere l'equity
+    parser.add_argument('--avg-pct', type=float, default=1e-5, help="Rendimento medio per trade")
+    parser.add_argument('--parquet', help="Misura anche scrittura/lettura Parquet su questo file")
+    args = parser.parse_args()
+
+    ledger, t_build = _timed(TradeLedger.synthetic, args.trades,
+                               avg_pct_trade=args.avg_pct, seed=args.seed)
+    metrics, t_metrics = _timed(ledger.metrics)
+    daily, t_daily = _timed(ledger.daily_equity)
+
+    print(f"\n=== TRADE LEDGER BENCHMARK ({len(ledger):,} trade) ===")
+    print(f"Memoria ledger:   {ledger.trades.nbytes / 1024**2:.1f} MB")
+    print(f"Generazione:      {t_build:.3f}s")
+    print(f"Metriche:         {t_metrics:.3f}s")
+    print(f"Equity giornaliera: {t_daily:.3f}s ({len(daily):,} giorni)")
+
+    if args.parquet:
+        _, t_write = _timed(ledger.to_parquet, args.parquet)
+        _, t_read = _timed(TradeLedger.from_parquet, args.parquet)
+        print(f"Parquet scrittura/lettura: {t_write:.3f}s / {t_read:.3f}s")
+
+    print("\nMetriche:")
+    for key, value in metrics.items():
+        print(f"{key}: {value}")
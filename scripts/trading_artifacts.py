@@ -0,0 +1,100 @@
+"""Trading Artifacts
+Produzione e lettura di export versionati per la dashboard (producer/consumer)
+"""
+
+import argparse
+import os
+import shutil
+import time
+from datetime import datetime
+
+from trading_system_metrics import TradingSystemMetrics, load_exported_data
+
+ARTIFACT_DIR = os.path.join('trading_data', 'artifacts')
+LATEST_FILE = 'LATEST'
+
+def publish_artifacts(system=None, artifact_dir=ARTIFACT_DIR, fmt='feather', days=500,
+                      seed=None, keep=5):
+    """Genera un nuovo export e lo pubblica come versione più recente.
+
+    L'export viene scritto in una directory temporanea, rinominata
+    atomicamente in <artifact_dir>/<versione>; solo dopo il puntatore
+    LATEST viene sostituito (anch'esso con rename). I lettori vedono
+    sempre una versione completa e mai modificata.
+
+    Returns:
+        Nome della versione pubblicata
+    """
+    system = system or TradingSystemMetrics()
+    os.makedirs(artifact_dir, exist_ok=True)
+
+    version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    tmp_dir = os.path.join(artifact_dir, f'.tmp-{version}')
+    system.export_data(tmp_dir, fmt=fmt, days=days, seed=seed, force=True)
+    os.rename(tmp_dir, os.path.join(artifact_dir, version))
+
+    tmp_pointer = os.path.join(artifact_dir, f'.{LATEST_FILE}.tmp')
+    with open(tmp_pointer, 'w') as f:
+        f.write(version)
+    os.replace(tmp_pointer, os.path.join(artifact_dir, LATEST_FILE))
+
+    prune_artifacts(artifact_dir, keep)
+    return version
+
+def latest_version(artifact_dir=ARTIFACT_DIR):
+    """Versione indicata da LATEST, oppure None se non è stato pubblicato nulla"""
+    try:
+        with open(os.path.join(artifact_dir, LATEST_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def load_artifacts(version, artifact_dir=ARTIFACT_DIR):
+    """Legge una versione pubblicata: (equity_df, metrics, trade_dist, export_info)"""
+    return load_exported_data(os.path.join(artifact_dir, version))
+
+def prune_artifacts(artifact_dir=ARTIFACT_DIR, keep=5):
+    """Rimuove le versioni più vecchie, mantenendo le ultime keep e quella corrente.
+
+    Le versioni precedenti restano per le sessioni che le stanno ancora leggendo.
+    """
+    current = latest_version(artifact_dir)
+    versions = sorted(
+        name for name in os.listdir(artifact_dir)
+        if not name.startswith('.') and os.path.isdir(os.path.join(artifact_dir, name))
+    )
+    for name in versions[:-keep] if keep > 0 else versions:
+        if name != current:
+            shutil.rmtree(os.path.join(artifact_dir, name), ignore_errors=True)
+
+    # Directory temporanee di export interrotti
+    for name in os.listdir(artifact_dir):
+        path = os.path.join(artifact_dir, name)
+        if name.startswith('.tmp-') and time.time() - os.path.getmtime(path) > 3600:
+            shutil.rmtree(path, ignore_errors=True)
+
+def run_refresh(interval_seconds=3600, **publish_kwargs):
+    """Job di refresh: pubblica una nuova versione ogni interval_seconds"""
+    while True:
+        start = time.perf_counter()
+        version = publish_artifacts(**publish_kwargs)
+        print(f"[REFRESH] Pubblicata versione {version} in {time.perf_counter() - start:.2f}s")
+        time.sleep(interval_seconds)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Refresh degli artifact della trading dashboard")
+    parser.add_argument('--once', action='store_true', help="Pubblica una sola versione ed esce")
+    parser.add_argument('--interval', type=int, default=3600, help="Secondi tra due refresh")
+    parser.add_argument('--artifact-dir', default=ARTIFACT_DIR)
+    parser.add_argument('--format', choices=['feather', 'parquet', 'csv'], default='feather')
+    parser.add_argument('--days', type=int, default=500)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--keep', type=int, default=5, help="Versioni da mantenere")
+    args = parser.parse_args()
+
+    kwargs = dict(artifact_dir=args.artifact_dir, fmt=args.format, days=args.days,
+                  seed=args.seed, keep=args.keep)
+    if args.once:
+        print(f"[REFRESH] Pubblicata versione {publish_artifacts(**kwargs)}")
+    else:
+        run_refresh(args.interval, **kwargs)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# Trading Metrics Benchmark
+# Misura le prestazioni delle simulazioni di TradingSystemMetrics
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from downsampling import downsample_frame, target_points
+from trading_system_metrics import TradingSystemMetrics
+
+def legacy_equity_curve(system: TradingSystemMetrics, initial_balance=10000, days=500,
+                        seed=None) -> pd.DataFrame:
+    """
+    Simulazione giorno per giorno originale, usata come riferimento.
+
+    Rispetto all'originale simula un passo per ogni data (l'originale ne
+    produceva days - 1 per days date) e usa lo stesso generatore della
+    versione vettoriale, così i risultati sono confrontabili.
+    """
+    rng = np.random.default_rng(seed)
+    n_trades_by_day = rng.poisson(system.trades / days, size=days)
+    dates = pd.date_range(end=pd.Timestamp.now(), periods=days, freq='D')
+
+    equity = [initial_balance]
+    daily_returns = []
+    for day in range(days):
+        n_trades = max(1, int(n_trades_by_day[day]))
+        wins = int(n_trades * system.winrate)
+        losses = n_trades - wins
+
+        day_pnl = 0
+        for _ in range(wins):
+            day_pnl += equity[-1] * system.avg_pct_trade
+        for _ in range(losses):
+            day_pnl += equity[-1] * system.avg_pct_trade * -0.5
+
+        new_equity = equity[-1] + day_pnl
+        daily_returns.append((day_pnl / equity[-1]) * 100)
+        equity.append(max(new_equity, equity[-1] * 0.97))
+
+    return pd.DataFrame({'Date': dates, 'Equity': equity[1:], 'Daily_Return': daily_returns})
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def bench_equity(sizes=(500, 10_000, 100_000), seed: int = 42) -> dict:
+    """
+    Confronta la simulazione vettoriale con quella giorno per giorno.
+
+    Returns:
+        Dizionario "<giorni>" -> tempi e massimo scarto relativo tra le equity
+    """
+    system = TradingSystemMetrics()
+    results = {}
+
+    for days in sizes:
+        legacy, legacy_seconds = _timed(legacy_equity_curve, system, days=days, seed=seed)
+        vectorized, vectorized_seconds = _timed(system.generate_equity_curve, days=days, seed=seed)
+        rel_diff = np.abs(vectorized['Equity'].to_numpy() / legacy['Equity'].to_numpy() - 1).max()
+        results[str(days)] = {
+            "legacy_seconds": round(legacy_seconds, 4),
+            "vectorized_seconds": round(vectorized_seconds, 4),
+            "max_rel_diff": float(rel_diff),
+        }
+
+    return results
+
+def bench_paths(sizes=(1_000, 10_000), days: int = 500, seed: int = 42,
+                processes: int = 4) -> dict:
+    """
+    Misura simulate_paths in-process e con il pool di processi.
+
+    Returns:
+        Dizionario "<percorsi>" -> tempi per modalità e mediana dell'equity finale
+    """
+    system = TradingSystemMetrics()
+    results = {}
+
+    for n_paths in sizes:
+        serial, serial_seconds = _timed(system.simulate_paths, n_paths, days, seed)
+        pooled, pooled_seconds = _timed(system.simulate_paths, n_paths, days, seed,
+                                        processes=processes)
+        results[str(n_paths)] = {
+            "serial_seconds": round(serial_seconds, 3),
+            "pool_seconds": round(pooled_seconds, 3),
+            "same_result": bool(np.array_equal(serial["final_equity"], pooled["final_equity"])),
+            "final_equity_p50": round(serial["summary"]["final_equity"]["p50"], 2),
+        }
+
+    return results
+
+def _equity_figure(df) -> go.Figure:
+    """Grafico equity come nelle dashboard (linea con area sotto)"""
+    fig = go.Figure(go.Scatter(x=df['Date'], y=df['Equity'], mode='lines', fill='tozeroy'))
+    fig.update_layout(template='plotly_white', height=500)
+    return fig
+
+def bench_downsample(sizes=(1_000, 100_000, 1_000_000), n_out: int = None) -> dict:
+    """
+    Payload e tempo di serializzazione del grafico equity, con e senza downsampling.
+
+    Il tempo misurato è quello di costruzione e serializzazione JSON della
+    figura, cioè il lavoro fatto ad ogni rerun prima dell'invio al browser;
+    il rendering nel browser cresce con il numero di punti allo stesso modo.
+
+    Returns:
+        Dizionario "<punti>" -> payload (KB) e tempi per full/lttb/minmax
+    """
+    n_out = n_out or target_points()
+    rng = np.random.default_rng(0)
+    results = {}
+
+    for n_points in sizes:
+        df = pd.DataFrame({
+            'Date': pd.date_range('2000-01-01', periods=n_points, freq='min'),
+            'Equity': 10000 * np.exp(np.cumsum(rng.normal(0.00001, 0.001, n_points))),
+        })
+        results[str(n_points)] = {}
+        for mode in ('full', 'lttb', 'minmax'):
+            start = time.perf_counter()
+            chart_df = df if mode == 'full' else downsample_frame(df, 'Date', 'Equity', n_out, method=mode)
+            downsample_seconds = time.perf_counter() - start
+            payload = _equity_figure(chart_df).to_json()
+            total_seconds = time.perf_counter() - start
+            results[str(n_points)][mode] = {
+                "points": len(chart_df),
+                "payload_kb": round(len(payload) / 1024, 1),
+                "downsample_seconds": round(downsample_seconds, 4),
+                "total_seconds": round(total_seconds, 4),
+            }
+
+    return results
+
+BENCHMARKS = {
+    "downsample": bench_downsample,
+    "equity": bench_equity,
+    "paths": bench_paths,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark delle simulazioni di trading")
+    parser.add_argument("benchmark", nargs="?", choices=sorted(BENCHMARKS), default="equity")
+    parser.add_argument("--sizes", type=int, nargs="+", help="Dimensioni da misurare")
+    args = parser.parse_args()
+
+    kwargs = {"sizes": args.sizes} if args.sizes else {}
+    results = BENCHMARKS[args.benchmark](**kwargs)
+    print(f"\nBenchmark: {args.benchmark}")
+    for size, values in results.items():
+        print(f"  {size}: {values}")
@@ -7,9 +7,108 @@ import numpy as np
 import json
 from datetime import datetime, timedelta
 import os
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow as pa
+import pyarrow.feather as pa_feather
+import pyarrow.parquet as pq
+
+from risk_metrics import RiskMetricsEngine
+
+# Formati di export -> file dell'equity curve
+EXPORT_FORMATS = {
+    'csv': 'equity_curve.csv',
+    'parquet': 'equity_curve.parquet',
+    'feather': 'equity_curve.feather',
+}
+
+# Percentili delle bande di equity restituite da simulate_paths
+PATH_PERCENTILES = (5, 25, 50, 75, 95)
+
+def _day_factors(n_trades, winrate, avg_pct_trade):
+    """Fattore moltiplicativo giornaliero dato il numero di trade del giorno"""
+    # Risultati trade (winrate vincenti), le perdite valgono metà del trade medio
+    wins = np.floor(n_trades * winrate)
+    losses = n_trades - wins
+    return 1 + avg_pct_trade * (wins - 0.5 * losses)
+
+# Bin per data degli istogrammi da cui simulate_paths ricava le bande
+BAND_BINS = 2048
+
+# Ampiezza della griglia delle bande in deviazioni standard attorno alla media
+BAND_SIGMAS = 8
+
+def _band_grid(trades, winrate, avg_pct_trade, days, bins=BAND_BINS):
+    """Griglia comune degli istogrammi per data, in log(equity / iniziale).
+    
+    Media e varianza del log-fattore giornaliero vengono dalla distribuzione
+    di Poisson dei trade; la griglia di ogni data copre media ± BAND_SIGMAS
+    deviazioni standard (i valori oltre finiscono nei bin estremi, senza
+    effetto sui percentili interni).
+    
+    Returns:
+        (inizio, ampiezza del bin) per data, array di lunghezza days
+    """
+    lam = trades / days
+    counts = np.arange(int(lam + 12 * np.sqrt(lam) + 12) + 1)
+    pmf = np.exp(counts * np.log(max(lam, 1e-300)) - lam
+                 - np.cumsum(np.log(np.maximum(counts, 1))))
+    pmf[1] += pmf[0]  # Almeno un trade al giorno
+    pmf[0] = 0
+    log_factor = np.log(np.maximum(_day_factors(counts, winrate, avg_pct_trade), 0.97))
+    mu = (pmf * log_factor).sum()
+    sigma = np.sqrt((pmf * (log_factor - mu) ** 2).sum())
+    
+    t = np.arange(1, days + 1)
+    half = np.maximum(BAND_SIGMAS * sigma * np.sqrt(t), 1e-9)
+    return t * mu - half, 2 * half / bins
+
+def _simulate_chunk(trades, winrate, avg_pct_trade, initial_balance, days, n_paths, seed,
+                    grid_start, grid_width, bins=BAND_BINS):
+    """Simula un blocco di percorsi: istogramma per data e statistiche per percorso.
+    
+    L'equity del blocco non viene restituita: resta solo l'istogramma
+    (days x bins) del log-rendimento, sommabile tra blocchi.
+    """
+    rng = np.random.default_rng(seed)
+    n_trades = np.maximum(rng.poisson(trades / days, size=(n_paths, days)), 1)
+    
+    # I fattori dipendono solo dal numero di trade: tabella indicizzata per conteggio
+    factor_table = np.maximum(_day_factors(np.arange(n_trades.max() + 1), winrate, avg_pct_trade), 0.97)
+    log_growth = np.cumsum(np.log(factor_table)[n_trades], axis=1)
+    equity = initial_balance * np.exp(log_growth)
+    
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_balance)
+    max_drawdown = (1 - equity / peak).max(axis=1)
+    final_equity = equity[:, -1].copy()  # Copia: la vista terrebbe in vita tutto il blocco
+    cagr = (final_equity / initial_balance) ** (365 / days) - 1
+    
+    bin_idx = np.clip(((log_growth - grid_start) / grid_width).astype(np.int64), 0, bins - 1)
+    bin_idx += np.arange(days) * bins
+    hist = np.bincount(bin_idx.ravel(), minlength=days * bins).reshape(days, bins)
+    
+    return hist, final_equity, max_drawdown, cagr
+
+def _hist_percentiles(hist, grid_start, grid_width, percentiles):
+    """Percentili per data da istogrammi (days x bins), interpolando nel bin"""
+    cdf = np.cumsum(hist, axis=1)
+    total = cdf[:, -1:]
+    rows = np.arange(len(hist))
+    out = np.empty((len(hist), len(percentiles)))
+    for j, q in enumerate(percentiles):
+        target = total[:, 0] * q / 100
+        k = np.minimum((cdf < target[:, None]).sum(axis=1), hist.shape[1] - 1)
+        before = np.where(k > 0, cdf[rows, np.maximum(k - 1, 0)], 0)
+        frac = (target - before) / np.maximum(hist[rows, k], 1)
+        out[:, j] = grid_start + (k + frac) * grid_width
+    return out
 
 class TradingSystemMetrics:
-    def __init__(self):
+    def __init__(self, ledger=None):
+        """Metriche aggregate del sistema; con un TradeLedger sono calcolate dai trade reali"""
+        self.ledger = ledger
         self.trades = 1529
         self.winrate = 0.6625
         self.avg_pct_trade = 0.001674
@@ -19,49 +118,122 @@ class TradingSystemMetrics:
         self.max_drawdown = 0.0312
         self.signal_tomorrow = "FLAT"
         
-    def generate_equity_curve(self, initial_balance=10000, days=500):
-        """Genera equity curve simulata basata sulle metriche del sistema"""
+        if ledger is not None and len(ledger):
+            m = ledger.metrics()
+            self.trades = m['Total_Trades']
+            self.winrate = m['Winrate']
+            self.avg_pct_trade = m['Avg_Pct_Trade']
+            self.avg_points = m['Avg_Points']
+            self.total_return = m['Total_Return']
+            self.max_drawdown = m['Max_Drawdown']
+            timestamps = ledger.trades['timestamp']
+            years = (timestamps[-1] - timestamps[0]) / np.timedelta64(365, 'D')
+            self.cagr = (1 + self.total_return) ** (1 / years) - 1 if years > 0 else 0.0
+        
+    def generate_equity_curve(self, initial_balance=10000, days=500, seed=None):
+        """Genera equity curve simulata basata sulle metriche del sistema.
+        
+        Simulazione vettoriale: un passo per ogni data, equity come prodotto
+        cumulato dei fattori giornalieri. Con seed fisso il risultato è
+        riproducibile.
+        """
         dates = pd.date_range(end=datetime.now(), periods=days, freq='D')
+        rng = np.random.default_rng(seed)
+        
+        # Distribuzione trade: ~3 trade al giorno, almeno 1
+        n_trades = np.maximum(rng.poisson(self.trades / days, size=days), 1)
+        
+        day_factor = _day_factors(n_trades, self.winrate, self.avg_pct_trade)
         
-        # Distribuzione trade: ~3 trade al giorno
-        trades_per_day = self.trades / days
-        equity = [initial_balance]
-        
-        daily_returns = []
-        for day in range(1, days):
-            # Numero trade del giorno
-            n_trades = max(1, int(np.random.poisson(trades_per_day)))
-            
-            # Risultati trade (66.25% vincenti)
-            wins = int(n_trades * self.winrate)
-            losses = n_trades - wins
-            
-            # P&L giornaliero
-            day_pnl = 0
-            for _ in range(wins):
-                pnl_trade = equity[-1] * self.avg_pct_trade
-                day_pnl += pnl_trade
-            
-            for _ in range(losses):
-                pnl_trade = equity[-1] * self.avg_pct_trade * -0.5
-                day_pnl += pnl_trade
-            
-            new_equity = equity[-1] + day_pnl
-            daily_returns.append((day_pnl / equity[-1]) * 100)
-            equity.append(max(new_equity, equity[-1] * 0.97))  # Max drawdown limiter
+        # Max drawdown limiter: al massimo -3% al giorno
+        factors = np.concatenate(([float(initial_balance)], np.maximum(day_factor, 0.97)))
+        equity = np.cumprod(factors)[1:]
         
         df = pd.DataFrame({
             'Date': dates,
-            'Equity': equity[1:],
-            'Daily_Return': daily_returns
+            'Equity': equity,
+            'Daily_Return': (day_factor - 1) * 100
         })
         
         return df
     
+    def simulate_paths(self, n_paths=10000, days=500, seed=None, initial_balance=10000,
+                       chunk_size=2000, processes=None):
+        """Simulazione Monte Carlo di n_paths equity curve indipendenti.
+        
+        I percorsi sono generati a blocchi di chunk_size, così la memoria
+        temporanea resta limitata; le bande percentili si ricavano da
+        istogrammi per data sommati tra blocchi (precisione di un bin, vedi
+        _band_grid) e solo le distribuzioni per percorso restano intere.
+        Con processes > 1 i blocchi sono distribuiti su un pool di
+        processi. Ogni blocco ha un seed derivato da seed
+        (SeedSequence.spawn): il risultato non dipende da processes.
+        
+        Returns:
+            dict con 'bands' (DataFrame percentili per data), le distribuzioni
+            per percorso 'final_equity', 'max_drawdown', 'cagr' e un 'summary'
+        """
+        dates = pd.date_range(end=datetime.now(), periods=days, freq='D')
+        sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        grid_start, grid_width = _band_grid(self.trades, self.winrate, self.avg_pct_trade, days)
+        args = [
+            (self.trades, self.winrate, self.avg_pct_trade, initial_balance, days, size, chunk_seed,
+             grid_start, grid_width)
+            for size, chunk_seed in zip(sizes, seeds)
+        ]
+        
+        # Le bande si accumulano come istogrammi per data: la memoria non
+        # cresce con n_paths (nessuna matrice n_paths x days)
+        hist = np.zeros((days, BAND_BINS), dtype=np.int64)
+        per_path = ([], [], [])
+        
+        def accumulate(chunk):
+            np.add(hist, chunk[0], out=hist)
+            for values, part in zip(per_path, chunk[1:]):
+                values.append(part)
+        
+        if processes and processes > 1:
+            # Al massimo 2 blocchi in volo per processo: gli istogrammi non si accumulano
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                pending = deque()
+                for chunk_args in args:
+                    pending.append(pool.submit(_simulate_chunk, *chunk_args))
+                    if len(pending) >= 2 * processes:
+                        accumulate(pending.popleft().result())
+                while pending:
+                    accumulate(pending.popleft().result())
+        else:
+            for chunk_args in args:
+                accumulate(_simulate_chunk(*chunk_args))
+        
+        distributions = {
+            name: np.concatenate(values)
+            for name, values in zip(('final_equity', 'max_drawdown', 'cagr'), per_path)
+        }
+        
+        log_bands = _hist_percentiles(hist, grid_start, grid_width, PATH_PERCENTILES)
+        bands = pd.DataFrame(
+            initial_balance * np.exp(log_bands),
+            index=dates,
+            columns=[f'p{q}' for q in PATH_PERCENTILES]
+        )
+        bands.index.name = 'Date'
+        
+        summary = {
+            name: {
+                'mean': float(values.mean()),
+                **{f'p{q}': float(v) for q, v in zip(PATH_PERCENTILES, np.percentile(values, PATH_PERCENTILES))}
+            }
+            for name, values in distributions.items()
+        }
+        
+        return {'bands': bands, **distributions, 'summary': summary}
+    
     def calculate_metrics(self, equity_df):
         """Calcola metriche dal dataframe equity curve"""
         equity = equity_df['Equity'].values
-        daily_returns = equity_df['Daily_Return'].values
+        risk = RiskMetricsEngine().update_many(equity)
         
         metrics = {
             'Total_Trades': self.trades,
@@ -70,8 +242,10 @@ class TradingSystemMetrics:
             'Avg_Points': f"{self.avg_points:.2f}",
             'CAGR': f"{self.cagr*100:.2f}%",
             'Total_Return': f"{self.total_return*100:.2f}%",
-            'Max_Drawdown': f"{self.max_drawdown*100:.2f}%",
-            'Sharpe_Ratio': f"{np.mean(daily_returns) / np.std(daily_returns):.2f}",
+            'Max_Drawdown': f"{risk.max_drawdown*100:.2f}%",
+            'Sharpe_Ratio': f"{risk.sharpe:.2f}",
+            'Sortino_Ratio': f"{risk.sortino:.2f}",
+            'Volatility': f"{risk.volatility*100:.2f}%",
             'Latest_Equity': f"{equity[-1]:,.2f}",
             'Signal_Tomorrow': self.signal_tomorrow
         }
@@ -80,6 +254,9 @@ class TradingSystemMetrics:
     
     def generate_trade_distribution(self):
         """Genera distribuzione dei trade"""
+        if self.ledger is not None:
+            return self.ledger.trade_distribution()
+        
         # Generazione casuale ma realistica dei win/loss
         total_pnl = self.trades * self.avg_pct_trade * 100
         winning_trades = int(self.trades * self.winrate)
@@ -92,13 +269,68 @@ class TradingSystemMetrics:
             'Avg_Loss': f"{(-total_pnl / losing_trades / 2):.2f}%" if losing_trades > 0 else "0%"
         }
     
-    def export_data(self, output_dir='trading_data'):
-        """Esporta tutti i dati in JSON"""
+    def fingerprint(self, days=500, initial_balance=10000, seed=None, fmt='csv'):
+        """Impronta degli input dell'export: stessi input, stessi dati esportati.
+        
+        Restituisce None quando l'output non è riproducibile (simulazione senza seed).
+        """
+        if self.ledger is None and seed is None:
+            return None
+        
+        inputs = {
+            'params': [self.trades, self.winrate, self.avg_pct_trade, self.avg_points,
+                       self.cagr, self.total_return, self.max_drawdown, self.signal_tomorrow],
+            'days': days,
+            'initial_balance': initial_balance,
+            'seed': seed,
+            'format': fmt,
+            # L'equity simulata termina oggi: cambia data, cambia curva
+            'as_of': datetime.now().date().isoformat(),
+        }
+        if self.ledger is not None:
+            inputs['ledger'] = hashlib.sha256(self.ledger.trades.tobytes()).hexdigest()
+        
+        payload = json.dumps(inputs, sort_keys=True, default=str).encode()
+        return hashlib.sha256(payload).hexdigest()
+    
+    def export_data(self, output_dir='trading_data', fmt='csv', days=500, initial_balance=10000,
+                    seed=None, force=False):
+        """Esporta equity curve e metriche.
+        
+        fmt: 'csv', 'parquet' o 'feather' (colonne tipizzate, Feather non compresso
+        per la lettura memory-mapped). Se l'impronta degli input coincide con
+        quella dell'ultimo export, i dati vengono riletti dal disco invece di
+        essere rigenerati.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato non supportato: {fmt}. Disponibili: {', '.join(EXPORT_FORMATS)}")
         os.makedirs(output_dir, exist_ok=True)
         
+        fingerprint = self.fingerprint(days, initial_balance, seed, fmt)
+        if fingerprint is not None and not force:
+            try:
+                cached = load_exported_data(output_dir)
+                if cached[3].get('fingerprint') == fingerprint:
+                    return cached[:3]
+            except (OSError, ValueError, KeyError):
+                pass
+        
         # Genera equity curve
-        equity_df = self.generate_equity_curve()
-        equity_df.to_csv(f'{output_dir}/equity_curve.csv', index=False)
+        if self.ledger is not None:
+            equity_df = self.ledger.daily_equity(initial_balance)
+        else:
+            equity_df = self.generate_equity_curve(initial_balance, days, seed)
+        # Scrittura su file temporaneo e os.replace: chi legge con memory map
+        # (Feather) continua a vedere il file precedente, mai uno a metà
+        equity_path = os.path.join(output_dir, EXPORT_FORMATS[fmt])
+        tmp_equity_path = equity_path + '.tmp'
+        if fmt == 'csv':
+            equity_df.to_csv(tmp_equity_path, index=False)
+        elif fmt == 'parquet':
+            equity_df.to_parquet(tmp_equity_path, index=False)
+        else:
+            equity_df.to_feather(tmp_equity_path, compression='uncompressed')
+        os.replace(tmp_equity_path, equity_path)
         
         # Calcola metriche
         metrics = self.calculate_metrics(equity_df)
@@ -109,21 +341,50 @@ class TradingSystemMetrics:
         # JSON export
         output_data = {
             'timestamp': datetime.now().isoformat(),
+            'fingerprint': fingerprint,
+            'equity_file': EXPORT_FORMATS[fmt],
             'metrics': metrics,
             'trade_distribution': trade_dist,
             'equity_stats': {
-                'Initial': 10000,
+                'Initial': initial_balance,
                 'Final': float(equity_df['Equity'].iloc[-1]),
                 'Peak': float(equity_df['Equity'].max()),
                 'Trough': float(equity_df['Equity'].min())
             }
         }
         
-        with open(f'{output_dir}/trading_metrics.json', 'w') as f:
+        # Scrittura atomica: il JSON viene sostituito solo a export completo
+        tmp_path = os.path.join(output_dir, 'trading_metrics.json.tmp')
+        with open(tmp_path, 'w') as f:
             json.dump(output_data, f, indent=2)
+        os.replace(tmp_path, os.path.join(output_dir, 'trading_metrics.json'))
         
         return equity_df, metrics, trade_dist
 
+def load_exported_data(output_dir='trading_data'):
+    """Rilegge l'ultimo export senza rigenerare nulla.
+    
+    Feather e Parquet sono letti con memory map (pyarrow); il CSV con
+    i tipi delle colonne ripristinati.
+    
+    Returns:
+        (equity_df, metrics, trade_dist, export_info)
+    """
+    with open(os.path.join(output_dir, 'trading_metrics.json')) as f:
+        info = json.load(f)
+    
+    equity_file = info.get('equity_file', EXPORT_FORMATS['csv'])
+    equity_path = os.path.join(output_dir, equity_file)
+    if equity_file.endswith('.feather'):
+        with pa.memory_map(equity_path) as source:
+            equity_df = pa_feather.read_table(source, memory_map=True).to_pandas()
+    elif equity_file.endswith('.parquet'):
+        equity_df = pq.read_table(equity_path, memory_map=True).to_pandas()
+    else:
+        equity_df = pd.read_csv(equity_path, parse_dates=['Date'])
+    
+    return equity_df, info['metrics'], info['trade_distribution'], info
+
 if __name__ == '__main__':
     system = TradingSystemMetrics()
     equity_df, metrics, trade_dist = system.export_data()
@@ -0,0 +1,5 @@
+# Gli script si importano tra loro per nome di modulo: scripts/ va nel path
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
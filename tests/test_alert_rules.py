@@ -0,0 +1,80 @@
+# Test di AlertRuleEngine e GA4GoalsManager.check_alert_conditions
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ga4_alert_rules import AlertRuleEngine, compile_condition
+from ga4_goals_automation import GA4GoalsManager
+
+TRAFFIC_DROP = {'name': 'Traffic Drop Alert', 'condition': 'sessions_daily < (avg_weekly * 0.70)',
+                'severity': 'HIGH'}
+ZERO_CONVERSIONS = {'name': 'Zero Conversions Alert', 'condition': 'daily_conversions == 0 for 2+ days',
+                    'severity': 'HIGH'}
+
+def _daily(property_id, sessions=None, conversions=None, bounce_rate=None):
+    n = len(next(v for v in (sessions, conversions, bounce_rate) if v is not None))
+    return pd.DataFrame({
+        'property_id': property_id,
+        'date': pd.date_range('2026-01-01', periods=n),
+        'sessions': sessions if sessions is not None else [100.0] * n,
+        'conversions': conversions if conversions is not None else [1.0] * n,
+        'bounce_rate': bounce_rate if bounce_rate is not None else [40.0] * n,
+    })
+
+def _hits(alert, daily, latest_only=False):
+    triggered = AlertRuleEngine([alert]).evaluate(daily, latest_only=latest_only)
+    return list(zip(triggered['property_id'], triggered['date'].dt.strftime('%m-%d')))
+
+def test_avg_weekly_uses_previous_seven_days():
+    condition = compile_condition(TRAFFIC_DROP['condition'])
+    assert (condition.column, condition.baseline_window, condition.factor) == ('sessions', 7, 0.7)
+
+    daily = _daily('p', sessions=[100.0] * 7 + [60.0, 75.0])
+    triggered = AlertRuleEngine([TRAFFIC_DROP]).evaluate(daily)
+
+    # Giorno 8: 60 < 0.7 * 100; giorno 9: media (6 * 100 + 60) / 7, 75 non scende sotto il 70%
+    assert triggered['date'].dt.strftime('%m-%d').tolist() == ['01-08']
+    np.testing.assert_allclose(triggered['limit'], [70.0])
+
+def test_avg_weekly_needs_full_history():
+    daily = _daily('p', sessions=[100.0] * 5 + [10.0])
+
+    assert _hits(TRAFFIC_DROP, daily) == []
+
+def test_avg_weekly_does_not_mix_properties():
+    daily = pd.concat([_daily('a', sessions=[1000.0] * 8), _daily('b', sessions=[100.0] * 7 + [80.0])])
+
+    assert _hits(TRAFFIC_DROP, daily) == []
+
+def test_consecutive_days_condition():
+    daily = _daily('p', conversions=[3.0, 0.0, 0.0, 0.0, 2.0, 0.0])
+
+    assert _hits(ZERO_CONVERSIONS, daily) == [('p', '01-03'), ('p', '01-04')]
+
+def test_consecutive_days_restart_for_each_property():
+    daily = pd.concat([_daily('a', conversions=[1.0, 0.0]), _daily('b', conversions=[0.0, 1.0])])
+
+    assert _hits(ZERO_CONVERSIONS, daily) == []
+
+def test_latest_only_reports_last_day_of_each_property():
+    daily = pd.concat([_daily('a', conversions=[0.0, 0.0, 0.0]),
+                       _daily('b', conversions=[0.0, 0.0, 1.0])])
+
+    assert _hits(ZERO_CONVERSIONS, daily, latest_only=True) == [('a', '01-03')]
+
+def test_invalid_condition_is_rejected():
+    with pytest.raises(ValueError, match="Media sconosciuta"):
+        compile_condition('sessions < avg_yearly')
+
+def test_check_alert_conditions_evaluates_latest_day():
+    manager = GA4GoalsManager('1', 'admin@example.com')
+    daily = _daily('1', sessions=[100.0] * 7 + [50.0], conversions=[2.0] * 6 + [0.0, 0.0],
+                   bounce_rate=[40.0] * 7 + [65.0]).drop(columns='property_id')
+
+    triggered = manager.check_alert_conditions(daily)
+
+    assert {a['alert'] for a in triggered} == {'Traffic Drop Alert', 'High Bounce Rate Alert',
+                                               'Zero Conversions Alert'}
+    assert {a['property_id'] for a in triggered} == {'1'}
+    assert {a['date'] for a in triggered} == {'2026-01-08'}
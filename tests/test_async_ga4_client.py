@@ -0,0 +1,137 @@
+# Test di AsyncGA4Client su AsyncFakeDataClient (nessuna chiamata di rete)
+
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+from google.analytics.data_v1beta.types import DateRange, Dimension, Metric, RunReportRequest
+from google.api_core.exceptions import ServiceUnavailable
+
+from ga4_api_client import AsyncGA4Client, ReportFetchError
+from ga4_fake_client import AsyncFakeDataClient
+from ga4_rate_limit import RetryPolicy
+
+def _request(name: str = "sessionSource") -> RunReportRequest:
+    return RunReportRequest(
+        property="properties/1",
+        dimensions=[Dimension(name=name)],
+        metrics=[Metric(name="sessions")],
+        date_ranges=[DateRange(start_date="2024-01-01", end_date="2024-01-07")],
+    )
+
+def _client(fake, **kwargs) -> AsyncGA4Client:
+    kwargs.setdefault("retry_policy", RetryPolicy(max_retries=2, base_delay=0))
+    return AsyncGA4Client("1", client=fake, **kwargs)
+
+def test_gather_reports_respects_max_concurrency():
+    fake = AsyncFakeDataClient(rows_per_report=5, latency_seconds=0.01)
+    client = _client(fake, max_concurrency=3)
+    requests = {f"r{i}": _request(f"dim{i}") for i in range(12)}
+
+    frames = asyncio.run(client.gather_reports(requests))
+
+    assert fake.max_in_flight == 3
+    assert fake.run_report_calls == 12
+    assert all(len(df) == 5 for df in frames.values())
+
+def test_shared_semaphore_limits_all_properties():
+    async def run():
+        semaphore = asyncio.Semaphore(2)
+        fakes = [AsyncFakeDataClient(rows_per_report=1, latency_seconds=0.01) for _ in range(4)]
+        clients = [_client(fake, semaphore=semaphore) for fake in fakes]
+        in_flight = 0
+        peak = 0
+
+        async def tracked(client):
+            nonlocal in_flight, peak
+            original = client.client.run_report
+
+            async def run_report(request):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                try:
+                    return await original(request)
+                finally:
+                    in_flight -= 1
+
+            client.client.run_report = run_report
+            return await client.gather_reports({"a": _request(), "b": _request("medium")})
+
+        await asyncio.gather(*(tracked(c) for c in clients))
+        return peak
+
+    assert asyncio.run(run()) == 2
+
+def test_transient_failures_are_retried():
+    fake = AsyncFakeDataClient(rows_per_report=3, transient_failures=2)
+    client = _client(fake)
+
+    df = asyncio.run(client.fetch_report(_request()))
+
+    assert len(df) == 3
+    assert fake.failed_calls == 2
+    assert fake.run_report_calls == 3
+
+def test_retries_exhausted_raise():
+    fake = AsyncFakeDataClient(transient_failures=10)
+    client = _client(fake)
+
+    with pytest.raises(ServiceUnavailable):
+        asyncio.run(client.fetch_report(_request()))
+    assert fake.run_report_calls == 3
+
+def test_failing_property_does_not_block_others():
+    async def run():
+        semaphore = asyncio.Semaphore(4)
+        fakes = {
+            "ok1": AsyncFakeDataClient(rows_per_report=2),
+            "broken": AsyncFakeDataClient(transient_failures=100),
+            "ok2": AsyncFakeDataClient(rows_per_report=2),
+        }
+        clients = {pid: _client(fake, semaphore=semaphore) for pid, fake in fakes.items()}
+        outcomes = await asyncio.gather(
+            *(c.run_reports_batch({"a": _request(), "b": _request("medium")})
+              for c in clients.values()),
+            return_exceptions=True,
+        )
+        return dict(zip(clients, outcomes))
+
+    outcomes = asyncio.run(run())
+
+    assert isinstance(outcomes["broken"], ReportFetchError)
+    assert set(outcomes["broken"].errors) == {"a", "b"}
+    for pid in ("ok1", "ok2"):
+        assert set(outcomes[pid]) == {"a", "b"}
+        assert all(len(df) == 2 for df in outcomes[pid].values())
+
+class _ThreadRecordingCache:
+    """
+    Cache in memoria che registra il thread di ogni get/put.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.threads = []
+
+    def get(self, request):
+        self.threads.append(threading.current_thread())
+        return self.data.get(RunReportRequest.to_json(request))
+
+    def put(self, request, df):
+        self.threads.append(threading.current_thread())
+        self.data[RunReportRequest.to_json(request)] = df
+
+def test_cache_io_runs_off_the_event_loop():
+    fake = AsyncFakeDataClient(rows_per_report=4)
+    cache = _ThreadRecordingCache()
+    client = _client(fake, cache=cache)
+
+    first = asyncio.run(client.fetch_report(_request()))
+    second = asyncio.run(client.fetch_report(_request()))
+
+    pd.testing.assert_frame_equal(first, second)
+    assert fake.run_report_calls == 1
+    assert len(cache.threads) == 3
+    assert threading.main_thread() not in cache.threads
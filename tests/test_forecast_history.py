@@ -0,0 +1,68 @@
+# Test della retention di ForecastHistory con timestamp in fusi orari diversi
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from forecast_history import ForecastHistory
+
+def _forecast(generated_at: datetime) -> dict:
+    return {
+        "forecast_date": "2026-01-02",
+        "generated_at": generated_at.isoformat(),
+        "predicted_sessions": 100.0,
+        "sessions_interval": [90.0, 110.0],
+    }
+
+def test_prune_compares_instants_not_strings(tmp_path):
+    history = ForecastHistory(str(tmp_path / "history.sqlite"), retention_days=1)
+    now = datetime(2026, 1, 10, 12, 0, tzinfo=timezone.utc)
+    # Stesso istante meno di un giorno fa, ma con offset che ordina la stringa prima del cutoff
+    recent = (now - timedelta(hours=20)).astimezone(timezone(timedelta(hours=-8)))
+    old = (now - timedelta(days=2)).astimezone(timezone(timedelta(hours=9)))
+    history.append("1", _forecast(recent))
+    history.append("1", _forecast(old))
+
+    assert history.prune(now=now) == 1
+    assert history.latest("1")["generated_at"] == recent.isoformat()
+
+def test_latest_run_ordered_by_instant(tmp_path):
+    history = ForecastHistory(str(tmp_path / "history.sqlite"), retention_days=None)
+    first = datetime(2026, 1, 1, 10, 0, tzinfo=timezone(timedelta(hours=2)))
+    # Successivo di un'ora ma con stringa ISO minore
+    second = (first + timedelta(hours=1)).astimezone(timezone.utc)
+    history.append("1", _forecast(second))
+    history.append("1", _forecast(first))
+
+    assert history.latest("1")["generated_at"] == second.isoformat()
+    assert history.query("1")["generated_at"].tolist() == [second.isoformat()]
+
+def test_max_runs_applies_per_property(tmp_path):
+    history = ForecastHistory(str(tmp_path / "history.sqlite"), retention_days=None, max_runs=2)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for hours in range(3):
+        history.append("busy", _forecast(start + timedelta(hours=hours)))
+    history.append("quiet", _forecast(start - timedelta(days=30)))
+
+    assert history.prune() == 1
+    kept = history._conn.execute(
+        "SELECT property_id, generated_at FROM forecast_runs ORDER BY property_id, generated_ts"
+    ).fetchall()
+    assert kept == [("busy", (start + timedelta(hours=1)).isoformat()),
+                    ("busy", (start + timedelta(hours=2)).isoformat()),
+                    ("quiet", (start - timedelta(days=30)).isoformat())]
+
+def test_legacy_json_is_imported_once(tmp_path):
+    legacy = {"forecast_date": "2025-11-20", "predicted_conversions": 3.5,
+              "predicted_sessions": 120.0, "confidence_level": "MEDIUM",
+              "data_points_used": 7, "generated_at": "2025-11-19T17:30:00+01:00"}
+    (tmp_path / "forecast_2025-11-19_17-30-00.json").write_text(json.dumps(legacy), encoding="utf-8")
+    history = ForecastHistory(str(tmp_path / "history.sqlite"), retention_days=None)
+
+    assert history.import_legacy_json("1") == 1
+    assert history.import_legacy_json("1") == 0
+    history.close()
+
+    latest = ForecastHistory(str(tmp_path / "history.sqlite"), retention_days=None).latest("1")
+    assert latest["generated_at"] == legacy["generated_at"]
+    assert latest["predicted_sessions"] == 120.0
+    assert latest["predicted_conversions"] == 3.5
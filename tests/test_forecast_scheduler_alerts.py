@@ -0,0 +1,58 @@
+# Test della consegna degli alert dello scheduler su un server SMTP locale (aiosmtpd)
+
+import email
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+
+import ga4_alert_delivery
+
+class RecordingHandler:
+    """
+    Handler aiosmtpd che conserva i messaggi ricevuti.
+    """
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append((envelope.rcpt_tos, email.message_from_bytes(envelope.content)))
+        return '250 Message accepted for delivery'
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+@pytest.fixture
+def smtp_sink(monkeypatch):
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    monkeypatch.setenv('SMTP_HOST', '127.0.0.1')
+    monkeypatch.setenv('SMTP_PORT', str(controller.port))
+    monkeypatch.setenv('SMTP_STARTTLS', '0')
+    monkeypatch.setattr(ga4_alert_delivery, '_shared', None)
+    yield handler
+    if ga4_alert_delivery._shared is not None:
+        ga4_alert_delivery._shared.close()
+    controller.stop()
+
+def test_scheduler_alerts_go_through_shared_dispatcher(smtp_sink, tmp_path, monkeypatch):
+    # Lo scheduler crea logs/, forecasts/ e cache relative alla directory corrente
+    monkeypatch.chdir(tmp_path)
+    from ga4_forecast_scheduler import CONFIG, GA4ForecastScheduler
+
+    scheduler = GA4ForecastScheduler({**CONFIG, "alert_window_seconds": 0.1,
+                                      "admin_email": "admin@example.com"})
+    assert scheduler.alert_dispatcher is ga4_alert_delivery.shared_dispatcher()
+
+    scheduler.scheduler.start()
+    scheduler._send_alert("[GA4 Alert] Forecast fallito", "property 1: timeout")
+    scheduler.stop()
+
+    assert len(smtp_sink.messages) == 1
+    recipients, message = smtp_sink.messages[0]
+    assert recipients == ["admin@example.com"]
+    assert message['Subject'] == "[GA4 Alert] Forecast fallito"
+    assert "property 1: timeout" in message.get_payload(0).get_payload(decode=True).decode()
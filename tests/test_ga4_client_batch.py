@@ -0,0 +1,91 @@
+# Test di GA4Client.run_reports_batch su FakeDataClient
+
+import pytest
+from google.analytics.data_v1beta.types import DateRange, Dimension, Metric, RunReportRequest
+from google.api_core.exceptions import InvalidArgument, ServiceUnavailable
+
+from ga4_api_client import MAX_BATCH_SIZE, GA4Client, ReportFetchError
+from ga4_fake_client import FakeDataClient
+from ga4_rate_limit import RetryPolicy
+
+def _request(name: str) -> RunReportRequest:
+    return RunReportRequest(
+        property="properties/1",
+        dimensions=[Dimension(name=name)],
+        metrics=[Metric(name="sessions")],
+        date_ranges=[DateRange(start_date="2024-01-01", end_date="2024-01-07")],
+    )
+
+def _requests(n: int):
+    return {f"r{i}": _request(f"dim{i}") for i in range(n)}
+
+class RecordingFakeClient(FakeDataClient):
+    """
+    FakeDataClient che registra la dimensione di ogni batch; i batch possono
+    fallire sempre e i report con le dimensioni indicate falliscono da soli.
+    """
+
+    def __init__(self, failing_batches: bool = False, failing_dimensions=(), **kwargs):
+        super().__init__(**kwargs)
+        self.failing_batches = failing_batches
+        self.failing_dimensions = set(failing_dimensions)
+        self.batch_sizes = []
+
+    def batch_run_reports(self, request):
+        self.batch_sizes.append(len(request.requests))
+        if self.failing_batches:
+            self.batch_calls += 1
+            raise ServiceUnavailable("Batch non disponibile")
+        return super().batch_run_reports(request)
+
+    def run_report(self, request):
+        if request.dimensions[0].name in self.failing_dimensions:
+            self.run_report_calls += 1
+            raise InvalidArgument("Report non valido")
+        return super().run_report(request)
+
+def _client(fake) -> GA4Client:
+    return GA4Client("1", client=fake, retry_policy=RetryPolicy(max_retries=1, base_delay=0))
+
+def test_requests_are_split_into_batches_of_five():
+    fake = RecordingFakeClient(rows_per_report=3)
+
+    frames = _client(fake).run_reports_batch(_requests(12))
+
+    assert MAX_BATCH_SIZE == 5
+    assert fake.batch_sizes == [5, 5, 2]
+    assert fake.run_report_calls == 0
+    assert list(frames) == [f"r{i}" for i in range(12)]
+    assert all(len(df) == 3 for df in frames.values())
+    assert frames["r7"]["dim7"].tolist() == ["dim7_0", "dim7_1", "dim7_2"]
+
+def test_truncated_batch_reports_continue_with_run_report():
+    fake = RecordingFakeClient(rows_per_report=25)
+
+    frames = _client(fake).run_reports_batch(_requests(2), page_size=10)
+
+    assert fake.batch_sizes == [2]
+    # Prima pagina dal batch, le altre due per report con runReport
+    assert fake.run_report_calls == 4
+    assert [len(df) for df in frames.values()] == [25, 25]
+
+def test_failed_batch_falls_back_to_single_reports():
+    fake = RecordingFakeClient(failing_batches=True, rows_per_report=4)
+
+    frames = _client(fake).run_reports_batch(_requests(7))
+
+    # Ogni batch viene ritentato una volta, poi i suoi report partono uno alla volta
+    assert fake.batch_sizes == [5, 5, 2, 2]
+    assert fake.run_report_calls == 7
+    assert list(frames) == [f"r{i}" for i in range(7)]
+    assert all(len(df) == 4 for df in frames.values())
+
+def test_fallback_keeps_reports_that_succeed():
+    fake = RecordingFakeClient(failing_batches=True, failing_dimensions={"dim1"}, rows_per_report=2)
+
+    with pytest.raises(ReportFetchError) as excinfo:
+        _client(fake).run_reports_batch(_requests(3))
+
+    assert set(excinfo.value.errors) == {"r1"}
+    assert isinstance(excinfo.value.errors["r1"], InvalidArgument)
+    assert set(excinfo.value.partial_results) == {"r0", "r2"}
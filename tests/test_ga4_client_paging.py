@@ -0,0 +1,64 @@
+# Test della paginazione di GA4Client.fetch_report su FakeDataClient
+
+import pandas as pd
+import pytest
+from google.analytics.data_v1beta.types import DateRange, Dimension, Metric, RunReportRequest
+
+from ga4_api_client import GA4Client
+from ga4_fake_client import FakeDataClient
+
+def _request(limit: int = 0) -> RunReportRequest:
+    return RunReportRequest(
+        property="properties/1",
+        dimensions=[Dimension(name="sessionSource")],
+        metrics=[Metric(name="sessions")],
+        date_ranges=[DateRange(start_date="2024-01-01", end_date="2024-01-07")],
+        limit=limit,
+    )
+
+def _pages(rows: int, page_size: int, limit: int = 0):
+    fake = FakeDataClient(rows_per_report=rows)
+    client = GA4Client("1", client=fake)
+    pages = list(client.fetch_report(_request(limit), chunked=True, page_size=page_size))
+    return pages, fake
+
+@pytest.mark.parametrize("rows, page_size, expected", [
+    (25, 10, [10, 10, 5]),
+    (9, 10, [9]),
+    (11, 10, [10, 1]),
+])
+def test_chunked_pages_split_at_page_size(rows, page_size, expected):
+    pages, fake = _pages(rows, page_size)
+
+    assert [len(p) for p in pages] == expected
+    assert fake.run_report_calls == len(expected)
+    values = pd.concat(pages)["sessionSource"].tolist()
+    assert values == [f"sessionSource_{i}" for i in range(rows)]
+
+def test_exact_multiple_of_page_size_stops_without_empty_page():
+    pages, fake = _pages(30, 10)
+
+    assert [len(p) for p in pages] == [10, 10, 10]
+    assert fake.run_report_calls == 3
+
+def test_request_limit_caps_total_rows():
+    pages, fake = _pages(30, 10, limit=15)
+
+    assert [len(p) for p in pages] == [10, 5]
+    assert fake.run_report_calls == 2
+
+def test_empty_report_yields_one_empty_page():
+    pages, fake = _pages(0, 10)
+
+    assert len(pages) == 1
+    assert pages[0].empty
+    assert fake.run_report_calls == 1
+
+def test_chunked_and_full_report_match():
+    fake = FakeDataClient(rows_per_report=23)
+    client = GA4Client("1", client=fake)
+
+    chunked = pd.concat(client.fetch_report(_request(), chunked=True, page_size=10), ignore_index=True)
+    full = client.fetch_report(_request(), page_size=10)
+
+    pd.testing.assert_frame_equal(chunked, full)
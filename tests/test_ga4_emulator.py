@@ -0,0 +1,106 @@
+# Test di EmulatedDataClient contro aggregati calcolati a mano sugli eventi generati
+
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from google.analytics.data_v1beta.types import (DateRange, Dimension, Filter, FilterExpression,
+                                                FilterExpressionList, Metric, NumericValue,
+                                                OrderBy, RunReportRequest)
+
+from ga4_emulator import EmulatedDataClient
+
+EVENTS_CONFIG = Path(__file__).resolve().parent.parent / "config" / "ga4_events.json"
+PROPERTY = "properties/1"
+
+@pytest.fixture(scope="module")
+def emulator():
+    return EmulatedDataClient(str(EVENTS_CONFIG), n_events=30_000, days=20, end_date=date(2026, 1, 20))
+
+@pytest.fixture(scope="module")
+def events(emulator) -> pd.DataFrame:
+    # Un evento per riga con le categorie decodificate
+    ds = emulator.dataset(PROPERTY)
+    frame = pd.DataFrame({name: ds.categories[name][codes] for name, codes in ds.codes.items()
+                          if not name.startswith("customEvent:")})
+    frame["session"] = ds.session
+    frame["user"] = ds.session_user[ds.session]
+    return frame
+
+def _request(dimensions, metrics, **kwargs) -> RunReportRequest:
+    return RunReportRequest(
+        property=PROPERTY,
+        dimensions=[Dimension(name=d) for d in dimensions],
+        metrics=[Metric(name=m) for m in metrics],
+        date_ranges=[DateRange(start_date="2026-01-01", end_date="2026-01-20")],
+        **kwargs,
+    )
+
+def _run(emulator, request):
+    response = emulator.run_report(request)
+    dimensions = [h.name for h in response.dimension_headers]
+    metrics = [h.name for h in response.metric_headers]
+    rows = [[v.value for v in row.dimension_values] + [int(v.value) for v in row.metric_values]
+            for row in response.rows]
+    return pd.DataFrame(rows, columns=dimensions + metrics), response.row_count
+
+def _expected(frame: pd.DataFrame, by) -> pd.DataFrame:
+    return frame.groupby(by).agg(eventCount=("session", "size"), sessions=("session", "nunique"),
+                                 totalUsers=("user", "nunique")).reset_index()
+
+def _string(field, value) -> FilterExpression:
+    return FilterExpression(filter=Filter(field_name=field, string_filter=Filter.StringFilter(value=value)))
+
+def test_group_by_session_source_has_one_row_per_source(emulator, events):
+    df, row_count = _run(emulator, _request(["sessionSource"], ["eventCount", "sessions", "totalUsers"]))
+    expected = _expected(events, "source").rename(columns={"source": "sessionSource"})
+
+    assert df["sessionSource"].is_unique
+    assert row_count == len(expected) == events["source"].nunique()
+    pd.testing.assert_frame_equal(df.sort_values("sessionSource").reset_index(drop=True), expected)
+
+def test_group_by_pair_components_matches_pair_grouping(emulator, events):
+    df, _ = _run(emulator, _request(["sessionSource", "sessionMedium"], ["sessions"]))
+    expected = events.groupby(["source", "medium"])["session"].nunique()
+
+    assert df.set_index(["sessionSource", "sessionMedium"])["sessions"].sort_index().tolist() \
+        == expected.tolist()
+
+def test_dimension_filters(emulator, events):
+    dimension_filter = FilterExpression(and_group=FilterExpressionList(expressions=[
+        _string("sessionSource", "google"),
+        FilterExpression(not_expression=FilterExpression(filter=Filter(
+            field_name="deviceCategory", in_list_filter=Filter.InListFilter(values=["tablet"])))),
+    ]))
+    df, _ = _run(emulator, _request(["sessionMedium"], ["eventCount", "sessions", "totalUsers"],
+                                    dimension_filter=dimension_filter))
+    subset = events[(events["source"] == "google") & (events["deviceCategory"] != "tablet")]
+    expected = _expected(subset, "medium").rename(columns={"medium": "sessionMedium"})
+
+    assert sorted(expected["sessionMedium"]) == ["cpc", "organic"]
+    pd.testing.assert_frame_equal(df.sort_values("sessionMedium").reset_index(drop=True), expected)
+
+def test_metric_filter_keeps_matching_rows(emulator, events):
+    threshold = int(events.groupby("city")["session"].nunique().median())
+    metric_filter = FilterExpression(filter=Filter(field_name="sessions", numeric_filter=Filter.NumericFilter(
+        operation=Filter.NumericFilter.Operation.GREATER_THAN, value=NumericValue(int64_value=threshold))))
+    df, row_count = _run(emulator, _request(["city"], ["sessions"], metric_filter=metric_filter))
+    expected = events.groupby("city")["session"].nunique()
+    expected = expected[expected > threshold]
+
+    assert row_count == len(expected) > 0
+    assert df.set_index("city")["sessions"].sort_index().to_dict() == expected.to_dict()
+
+def test_order_by_limit_and_offset(emulator, events):
+    order_bys = [OrderBy(metric=OrderBy.MetricOrderBy(metric_name="sessions"), desc=True),
+                 OrderBy(dimension=OrderBy.DimensionOrderBy(dimension_name="city"))]
+    full, _ = _run(emulator, _request(["city"], ["sessions"], order_bys=order_bys))
+    page, row_count = _run(emulator, _request(["city"], ["sessions"], order_bys=order_bys,
+                                               limit=3, offset=2))
+    expected = (events.groupby("city")["session"].nunique().rename("sessions").reset_index()
+                .sort_values(["sessions", "city"], ascending=[False, True]).reset_index(drop=True))
+
+    pd.testing.assert_frame_equal(full, expected)
+    assert row_count == len(expected)
+    pd.testing.assert_frame_equal(page, expected.iloc[2:5].reset_index(drop=True))
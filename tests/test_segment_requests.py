@@ -0,0 +1,107 @@
+# Test di GA4Client.build_segment_requests e label_reports
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from google.analytics.data_v1beta.types import Dimension, Metric
+
+import ga4_api_client
+from ga4_api_client import GA4Client
+from ga4_emulator import EmulatedDataClient
+from ga4_segments import SegmentCatalog, combined_filter, label_reports
+
+EVENTS_CONFIG = Path(__file__).resolve().parent.parent / "config" / "ga4_events.json"
+
+def _condition(field, value, operator="equals"):
+    return {"metric": field, "operator": operator, "value": value}
+
+CATALOG = SegmentCatalog({
+    "italy": {"conditions": [_condition("country", "Italy")]},
+    "north": {"conditions": [_condition("country", "Italy"),
+                             _condition("city", "(Torino|Milano|Genova)", "matches_regex")]},
+    "rome": {"conditions": [_condition("city", "Roma")]},
+    "mobile": {"conditions": [_condition("device_category", "mobile")]},
+    "leads": {"conditions": [_condition("event_name", "form_contact_submitted")]},
+    "engaged": {"conditions": [_condition("country", "Italy"),
+                               _condition("session_duration", "60", "greater_than")]},
+})
+KEYS = ["italy", "north", "rome", "mobile", "leads", "engaged"]
+
+@pytest.fixture(scope="module")
+def emulator():
+    return EmulatedDataClient(str(EVENTS_CONFIG), n_events=60_000, days=30)
+
+def _client(emulator, catalog=CATALOG) -> GA4Client:
+    return GA4Client("1", client=emulator, segments=catalog)
+
+def _sorted(df: pd.DataFrame, columns) -> pd.DataFrame:
+    return df[columns].astype({"country": str, "city": str}).sort_values(["country", "city"]) \
+        .reset_index(drop=True)
+
+def test_only_session_scoped_dimension_segments_share_a_request(emulator):
+    requests = _client(emulator).build_segment_requests(KEYS)
+
+    groups = [[s.key for s in group] for _, group in requests]
+    assert groups == [["italy", "north", "rome"], ["mobile"], ["leads"], ["engaged"]]
+
+    shared = requests[0][0]
+    assert [d.name for d in shared.dimensions] == ["country", "city"]
+    assert "metric_filter" not in shared
+    engaged = requests[-1][0]
+    assert "metric_filter" in engaged and "dimension_filter" in engaged
+
+def test_segments_data_matches_per_segment_reports(emulator):
+    client = _client(emulator)
+    combined = client.get_segments_data(KEYS)
+    columns = ["country", "city", "users", "sessions"]
+
+    for key in KEYS:
+        expected = client.fetch_report(client.build_segment_request(key))
+        actual = combined[combined["segment"] == key]
+        assert not expected.empty
+        pd.testing.assert_frame_equal(_sorted(actual, columns), _sorted(expected, columns),
+                                      check_dtype=False)
+
+def test_shared_report_is_reaggregated_to_report_dimensions(emulator):
+    # Con sole metriche di sessione l'unione delle dimensioni si riaggrega per somma
+    client = _client(emulator)
+    segments = CATALOG.resolve(["italy", "mobile"])
+    request = client.build_segment_request("all")
+    request.metrics = [Metric(name="sessions")]
+    request.dimensions = [Dimension(name=d) for d in ("country", "city", "deviceCategory")]
+    request.dimension_filter = combined_filter(segments)
+
+    labeled = label_reports([(client.fetch_report(request), segments)], segments,
+                            ["country", "city"])
+
+    columns = ["country", "city", "sessions"]
+    for segment in segments:
+        expected = client.build_segment_request(segment.key)
+        expected.metrics = [Metric(name="sessions")]
+        expected = client.fetch_report(expected)
+        actual = labeled[labeled["segment"] == segment.key]
+        pd.testing.assert_frame_equal(_sorted(actual, columns), _sorted(expected, columns),
+                                      check_dtype=False)
+
+def test_shared_request_over_dimension_limit_is_rejected(emulator, monkeypatch):
+    # Le dimensioni del report stanno oggi nel limite: si abbassa il limite
+    monkeypatch.setattr(ga4_api_client, "MAX_DIMENSIONS", 1)
+
+    with pytest.raises(ValueError, match="al massimo 1"):
+        _client(emulator).build_segment_requests(["italy"])
+    assert len(_client(emulator).build_segment_requests(["mobile"])) == 1
+
+def test_numeric_condition_on_dimension_becomes_in_list():
+    catalog = SegmentCatalog({
+        "deep": {"conditions": [_condition("scroll_depth", "75", "greater_than_or_equal")]},
+    })
+    segment = catalog.get("deep")
+
+    string_filter = segment.dimension_filter.filter
+    assert "numeric_filter" not in string_filter
+    assert list(string_filter.in_list_filter.values) == ["75", "90", "100"]
+
+def test_numeric_condition_on_free_text_dimension_is_rejected():
+    with pytest.raises(ValueError, match="non applicabile alla dimensione"):
+        SegmentCatalog({"bad": {"conditions": [_condition("country", "3", "greater_than")]}})
@@ -0,0 +1,104 @@
+# Test di sessionize e daily_aggregates su un piccolo export costruito a mano
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from ga4_sessionization import compile_goals, daily_aggregates, events_from_table, sessionize
+
+START = 1767308400  # 2026-01-01 23:00:00 UTC
+SESSION_ID = START
+
+# Dizionario dei valori stringa condiviso tra i parametri, con "100" ripetuto
+# come nei file in cui più chiavi puntano allo stesso dizionario
+STRINGS = ["100", "75", "100", "https://www.example.it/blog/post?utm_source=x",
+           "https://www.example.it/", "https://www.example.it/servizi", "https://www.example.it/blog"]
+
+# (utente, secondi da START, evento, data, ga_session_id, page_location, scroll_depth)
+# come indici in STRINGS
+EVENTS = [
+    ("u1", 0, "session_start", "20260101", SESSION_ID, None, None),
+    ("u1", 5, "page_view", "20260101", SESSION_ID, 3, None),
+    ("u1", 60, "blog_engagement", "20260101", SESSION_ID, None, 2),
+    ("u1", 70, "form_contact_submitted", "20260101", SESSION_ID, None, None),
+    # u2 senza ga_session_id: 3500 s di inattività aprono una seconda sessione
+    ("u2", 100, "page_view", "20260101", None, 4, None),
+    ("u2", 400, "page_view", "20260101", None, 5, None),
+    ("u2", 3900, "page_view", "20260102", None, 6, None),
+    ("u2", 3910, "blog_engagement", "20260102", None, None, 1),
+    ("u3", 4000, "page_view", "20260102", SESSION_ID + 4000, 4, None),
+    ("u3", 4010, "blog_engagement", "20260102", SESSION_ID + 4000, None, 0),
+]
+
+GOALS = compile_goals({
+    "contact_form_submission": {"type": "event", "event_name": "form_contact_submitted"},
+    "blog_post_read": {"type": "event", "event_name": "blog_engagement",
+                       "event_params": {"scroll_depth": "100"}},
+    "long_session": {"type": "session",
+                     "conditions": {"session_duration": {"operator": "greater_than", "value": 60}}},
+})
+
+def _export() -> pa.Table:
+    keys, string_codes, int_values, offsets = [], [], [], [0]
+    for _, _, _, _, session_id, location, scroll in EVENTS:
+        for key, string_code, int_value in (("ga_session_id", None, session_id),
+                                            ("page_location", location, None),
+                                            ("scroll_depth", scroll, None)):
+            if string_code is None and int_value is None:
+                continue
+            keys.append(key)
+            string_codes.append(string_code)
+            int_values.append(int_value)
+        offsets.append(len(keys))
+
+    value = pa.StructArray.from_arrays(
+        [pa.DictionaryArray.from_arrays(pa.array(string_codes, pa.int32()), pa.array(STRINGS)),
+         pa.array(int_values, pa.int64())],
+        ["string_value", "int_value"],
+    )
+    element = pa.StructArray.from_arrays([pa.array(keys), value], ["key", "value"])
+    n = len(EVENTS)
+    return pa.table({
+        "event_date": [e[3] for e in EVENTS],
+        "event_timestamp": [(START + e[1]) * 1_000_000 for e in EVENTS],
+        "event_name": [e[2] for e in EVENTS],
+        "event_params": pa.ListArray.from_arrays(pa.array(offsets, pa.int32()), element),
+        "user_pseudo_id": [e[0] for e in EVENTS],
+        "device": pa.StructArray.from_arrays([pa.array(["mobile"] * n)], ["category"]),
+        "geo": pa.StructArray.from_arrays([pa.array(["Italy"] * n), pa.array(["Torino"] * n)],
+                                          ["country", "city"]),
+    })
+
+@pytest.fixture(scope="module")
+def sessions() -> pd.DataFrame:
+    batch = events_from_table(_export(), goal_params=["scroll_depth"])
+    return sessionize(batch, GOALS).sort_values("session_start").reset_index(drop=True)
+
+def test_sessions_split_by_id_and_inactivity(sessions):
+    assert sessions["user_pseudo_id"].astype(str).tolist() == ["u1", "u2", "u2", "u3"]
+    assert sessions["session_duration"].tolist() == [70.0, 300.0, 10.0, 10.0]
+    assert sessions["pages_per_session"].tolist() == [1, 2, 1, 1]
+    assert sessions["ga_session_id"].tolist()[::3] == [SESSION_ID, SESSION_ID + 4000]
+    assert sessions["landing_page"].astype(str).tolist() == ["/blog/post", "/", "/blog", "/"]
+
+def test_goals_match_repeated_dictionary_values(sessions):
+    assert sessions["blog_post_read"].tolist() == [1, 0, 0, 1]
+    assert sessions["contact_form_submission"].tolist() == [1, 0, 0, 0]
+    assert sessions["long_session"].tolist() == [True, True, False, False]
+    assert sessions["conversions"].tolist() == [2, 0, 0, 1]
+
+def test_daily_aggregates(sessions):
+    daily = daily_aggregates(sessions, property_id="1")
+
+    assert daily["date"].dt.strftime("%Y%m%d").tolist() == ["20260101", "20260102"]
+    assert daily["property_id"].tolist() == ["1", "1"]
+    assert daily["sessions"].tolist() == [2, 2]
+    assert daily["users"].tolist() == [2, 2]
+    assert daily["page_views"].tolist() == [3, 2]
+    assert daily["engaged_sessions"].tolist() == [2, 1]
+    np.testing.assert_allclose(daily["bounce_rate"], [0.0, 50.0])
+    np.testing.assert_allclose(daily["avg_session_duration"], [185.0, 10.0])
+    assert daily["conversions"].tolist() == [2, 1]
+    assert daily["blog_post_read"].tolist() == [1, 1]
+    assert daily["long_session"].tolist() == [2, 0]
@@ -0,0 +1,40 @@
+# Test di TradeLedger su ledger vuoti e con un solo trade
+
+import numpy as np
+import pandas as pd
+
+from trade_ledger import TRADE_DTYPE, TradeLedger
+
+def _single_trade() -> TradeLedger:
+    return TradeLedger.from_frame(pd.DataFrame({
+        'timestamp': ['2026-01-05 10:30'],
+        'side': ['long'],
+        'entry': [20000.0],
+        'exit': [20200.0],
+    }))
+
+def test_empty_ledger_daily_equity_is_empty_frame():
+    daily = TradeLedger(np.empty(0, dtype=TRADE_DTYPE)).daily_equity()
+
+    assert daily.empty
+    assert list(daily.columns) == ['Date', 'Equity', 'Daily_Return']
+    assert daily['Date'].dtype == 'datetime64[ns]'
+
+def test_empty_ledger_trade_distribution_has_no_trades():
+    distribution = TradeLedger(np.empty(0, dtype=TRADE_DTYPE)).trade_distribution()
+
+    assert distribution == {'Winning_Trades': 0, 'Losing_Trades': 0,
+                            'Avg_Win': "0.00%", 'Avg_Loss': "0.00%"}
+
+def test_single_trade_daily_equity():
+    daily = _single_trade().daily_equity(initial_balance=10000.0)
+
+    assert daily['Date'].tolist() == [pd.Timestamp('2026-01-05')]
+    np.testing.assert_allclose(daily['Equity'], [10100.0])
+    np.testing.assert_allclose(daily['Daily_Return'], [1.0])
+
+def test_single_trade_distribution():
+    distribution = _single_trade().trade_distribution()
+
+    assert (distribution['Winning_Trades'], distribution['Losing_Trades']) == (1, 0)
+    assert distribution['Avg_Win'] == "1.00%"
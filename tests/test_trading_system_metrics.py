@@ -0,0 +1,31 @@
+# Test della simulazione vettoriale dell'equity contro la versione giorno per giorno
+
+import numpy as np
+import pytest
+
+from trading_bench import legacy_equity_curve
+from trading_system_metrics import TradingSystemMetrics
+
+@pytest.mark.parametrize("days, seed", [(1, 0), (500, 42), (5_000, 7)])
+def test_equity_curve_matches_day_by_day_simulation(days, seed):
+    system = TradingSystemMetrics()
+
+    vectorized = system.generate_equity_curve(initial_balance=10000, days=days, seed=seed)
+    legacy = legacy_equity_curve(system, initial_balance=10000, days=days, seed=seed)
+
+    assert len(vectorized) == len(legacy) == days
+    # Il ciclo somma il P&L un trade alla volta: stessi valori a meno dell'arrotondamento
+    np.testing.assert_allclose(vectorized['Equity'], legacy['Equity'], rtol=1e-12)
+    np.testing.assert_allclose(vectorized['Daily_Return'], legacy['Daily_Return'], rtol=1e-9, atol=1e-12)
+    assert (vectorized['Date'].dt.normalize() == legacy['Date'].dt.normalize()).all()
+
+def test_daily_floor_matches_day_by_day_simulation():
+    # Trade medio fortemente negativo: il limite del -3% giornaliero scatta ogni giorno
+    system = TradingSystemMetrics()
+    system.avg_pct_trade = -0.05
+
+    vectorized = system.generate_equity_curve(days=50, seed=1)
+    legacy = legacy_equity_curve(system, days=50, seed=1)
+
+    np.testing.assert_allclose(vectorized['Equity'], legacy['Equity'], rtol=1e-12)
+    np.testing.assert_allclose(vectorized['Equity'].iloc[0], 10000 * 0.97)